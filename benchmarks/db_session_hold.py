@@ -0,0 +1,169 @@
+# benchmarks/db_session_hold.py
+"""
+Сколько соединений с БД держат хендлеры: обычная сессия на апдейт против LazySession
+(bot_welcome/middlewares/db_middleware.py): соединение берется только при первом запросе к БД,
+а шаг с чтением отдает его в пул явным release() перед ответами в Telegram.
+
+Смешанная нагрузка: приветствия без БД, шаги с чтением и ответом в Telegram, шаги с записью.
+Telegram имитируется задержкой; нужна доступная БД из .env (DATABASE_URL):
+
+    python -m benchmarks.db_session_hold --updates 2000 --concurrency 200 --telegram-ms 80
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot, Dispatcher, F, Router
+from aiogram.client.session.base import BaseSession
+from aiogram.types import Message, TelegramObject
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from bot_welcome.middlewares.db_middleware import DBSessionMiddleware, LazySession
+from core.db import AsyncSessionLocal, engine
+
+FAKE_TOKEN = "123456:benchmark"
+
+
+class SimulatedTelegramSession(BaseSession):
+    """HTTP-сессия бота без сети: каждый запрос к Bot API "длится" latency секунд."""
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+
+    async def make_request(self, bot, method, timeout=None):
+        await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+        return True
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+class EagerDBSessionMiddleware(BaseMiddleware):
+    """Прежнее поведение: одна AsyncSession на весь апдейт, соединение занято до конца хендлера."""
+
+    def __init__(self, session_pool: async_sessionmaker):
+        super().__init__()
+        self.session_pool = session_pool
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with self.session_pool() as session:
+            data["session"] = session
+            return await handler(event, data)
+
+
+def build_router() -> Router:
+    router = Router()
+
+    @router.message(F.text == "greeting")
+    async def greeting(message: Message):
+        await message.answer("Добро пожаловать!")
+
+    @router.message(F.text == "read")
+    async def read_step(message: Message, session: AsyncSession):
+        await session.execute(select(text("1")))
+        if isinstance(session, LazySession):
+            # Работа с БД закончена: соединение не держится на время запросов к Telegram
+            await session.release()
+        await message.answer("Шаг анкеты")
+        await message.answer("Клавиатура")
+
+    @router.message(F.text == "write")
+    async def write_step(message: Message, session: AsyncSession):
+        await session.execute(select(text("1")))
+        await session.commit()
+        await message.answer("Сохранено")
+
+    return router
+
+
+def make_update(update_id: int, kind: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": update_id, "type": "private"},
+            "from": {"id": update_id, "is_bot": False, "first_name": "Candidate"},
+            "text": kind,
+        },
+    }
+
+
+async def run(lazy: bool, updates: list, concurrency: int, telegram_latency: float) -> Dict[str, float]:
+    session = SimulatedTelegramSession(telegram_latency)
+    bot = Bot(FAKE_TOKEN, session=session)
+
+    dp = Dispatcher()
+    middleware = DBSessionMiddleware if lazy else EagerDBSessionMiddleware
+    dp.update.outer_middleware(middleware(session_pool=AsyncSessionLocal))
+    dp.include_router(build_router())
+
+    samples = []
+    done = asyncio.Event()
+
+    async def sample():
+        while not done.is_set():
+            samples.append(engine.pool.checkedout())
+            await asyncio.sleep(0.002)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def feed(update):
+        async with semaphore:
+            await dp.feed_raw_update(bot, update)
+
+    sampler = asyncio.create_task(sample())
+    started = time.perf_counter()
+    await asyncio.gather(*(feed(u) for u in updates))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await sampler
+
+    return {
+        "updates/s": len(updates) / elapsed,
+        "avg connections held": statistics.fmean(samples),
+        "peak connections held": max(samples),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--telegram-ms", type=float, default=80)
+    parser.add_argument("--mix", default="greeting:3,read:5,write:2", help="вид апдейта:вес")
+    args = parser.parse_args()
+
+    kinds, weights = zip(*((k, int(w)) for k, w in (item.split(":") for item in args.mix.split(","))))
+    random.seed(1)
+    updates = [make_update(i, random.choices(kinds, weights)[0]) for i in range(args.updates)]
+
+    # Прогрев пула
+    async with engine.connect() as connection:
+        await connection.execute(select(text("1")))
+
+    print(f"{args.updates} updates, mix {args.mix}, concurrency {args.concurrency}, telegram {args.telegram_ms} ms, "
+          f"pool {engine.pool.size()}+{engine.pool._max_overflow}")
+    for lazy in (False, True):
+        result = await run(lazy, updates, args.concurrency, args.telegram_ms / 1000)
+        name = "lazy " if lazy else "eager"
+        print(name, "  ".join(f"{key}: {value:.1f}" for key, value in result.items()))
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+# benchmarks/render.py
+"""
+Время отрисовки сообщений MarkdownV2: core/render.py (replace только встретившихся спецсимволов,
+шаблоны разобраны заранее) против однопроходного str.translate, прежних escape_input / escape_markdown_v2
+(цикл replace по каждому спецсимволу) и f-строки карточки QC-чата. Карточка — настоящий шаблон
+APPLICATION_CARD из bot_3_qc/handlers/recruiter.py. К БД и Telegram бенчмарк не обращается:
+
+    python -m benchmarks.render --iterations 20000
+"""
+import argparse
+import time
+
+from bot_3_qc.handlers.recruiter import APPLICATION_CARD
+from core.render import SPECIAL_CHARS, escape
+
+# Однопроходное экранирование таблицей str.translate — для сравнения
+_TRANSLATE_TABLE = str.maketrans({char: "\\" + char for char in SPECIAL_CHARS})
+
+
+def translate_escape(text):
+    return str(text).strip().translate(_TRANSLATE_TABLE)
+
+# Прежние реализации — для сравнения
+_OLD_SPECIAL_CHARS = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
+
+
+def old_escape_input(text):
+    if text is None:
+        return "Н/Д"
+    text = str(text)
+    for char in _OLD_SPECIAL_CHARS:
+        text = text.replace(char, f'\\{char}')
+    return text.strip()
+
+
+def old_escape_markdown_v2(text):
+    if not text:
+        return "Н\\/Д"
+    text = text.replace('*', '').replace('_', '').replace('`', '')
+    for char in _OLD_SPECIAL_CHARS:
+        text = text.replace(char, f'\\{char}')
+    return text.strip()
+
+
+FIELDS = {
+    "id": 12345,
+    "vacancy_title": "Senior Python-разработчик (FastAPI, asyncio)",
+    "full_name": "Иванов Иван Иванович",
+    "level": "Senior",
+    "skills": "Python 3.11, FastAPI, PostgreSQL, Redis, Docker, k8s, CI/CD",
+    "tags": "python, fastapi, postgresql, redis, docker, kubernetes, ci/cd",
+    "years": "6.5 г.",
+    "email": "ivan.ivanov+jobs@example.com",
+    "phone": "+7 (999) 123-45-67",
+    "telegram": "@ivan_ivanov",
+    "experience": "6 лет backend-разработки: высоконагруженные API, интеграции, миграции БД.",
+    "resume": "https://example.com/resumes/ab/abcdef0123456789.pdf",
+    "status": "NEW",
+}
+
+def old_card(fields: dict) -> str:
+    e = old_escape_input
+    return (
+        f"🚨 *НОВЫЙ ОТКЛИК* ID: {fields['id']}\n"
+        f"*💼 Вакансия:* {e(fields['vacancy_title'])}\n"
+        f"*👤 Кандидат:* {e(fields['full_name'])}\n"
+        f"*🎯 Уровень:* {e(fields['level'])}\n"
+        f"*✨ Скиллы:* {e(fields['skills'])}\n"
+        f"*🏷 Теги:* {e(fields['tags'])}\n"
+        f"*⏳ Стаж \\(оценка\\):* {e(fields['years'])}\n\n"
+        f"*📞 Контакты:*\n"
+        f"  • Email: {e(fields['email'])}\n"
+        f"  • Телефон: {e(fields['phone'])}\n"
+        f"  • TG: {e(fields['telegram'])}\n\n"
+        f"*📝 Опыт:* {e(fields['experience'])}\n"
+        f"*📎 Резюме:* {e(fields['resume'])}\n"
+        f"*🔄 Статус:* {e(fields['status'])}"
+    )
+
+
+def measure(function, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    # На тексте без "\" новая и прежняя карточки совпадают посимвольно
+    assert APPLICATION_CARD.render(**FIELDS) == old_card(FIELDS)
+
+    text = FIELDS["experience"]
+    assert escape(text) == translate_escape(text)
+
+    print(f"{'case':<16} {'render, us':>11} {'translate, us':>14} {'old, us':>9}")
+    for name, value in (("escape (ru)", text), ("escape (latin)", FIELDS["skills"]), ("escape (email)", FIELDS["email"])):
+        new_us = measure(lambda: escape(value), args.iterations)
+        translate_us = measure(lambda: translate_escape(value), args.iterations)
+        old_us = measure(lambda: old_escape_input(value), args.iterations)
+        print(f"{name:<16} {new_us:>11.2f} {translate_us:>14.2f} {old_us:>9.2f}")
+
+    old_user_us = measure(lambda: old_escape_markdown_v2(text), args.iterations)
+    print(f"{'escape (user)':<16} {measure(lambda: escape(text), args.iterations):>11.2f} {'':>14} {old_user_us:>9.2f}")
+    card_us = measure(lambda: APPLICATION_CARD.render(**FIELDS), args.iterations)
+    print(f"{'QC card':<16} {card_us:>11.2f} {'':>14} {measure(lambda: old_card(FIELDS), args.iterations):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
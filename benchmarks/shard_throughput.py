@@ -0,0 +1,133 @@
+# benchmarks/shard_throughput.py
+"""
+Пропускная способность шардированной обработки апдейтов (core/sharding.py) в зависимости от числа процессов.
+
+Хендлер имитирует шаг анкеты: немного CPU (рендер/валидация) и ожидание I/O (БД, Telegram).
+Запуск из корня проекта (нужен .env, как для ботов; к Telegram и БД бенчмарк не обращается):
+
+    python -m benchmarks.shard_throughput --shards 1,2,4 --updates 20000 --users 1000
+"""
+import argparse
+import asyncio
+import functools
+import hashlib
+import multiprocessing
+import time
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message, Update
+
+from core.sharding import ShardedFrontend, consume_shard, dump_update
+
+# Токен нужного формата; запросов к API нет
+FAKE_TOKEN = "123456:benchmark"
+
+
+def build_dispatcher(cpu_rounds: int, io_ms: float) -> Dispatcher:
+    router = Router()
+
+    @router.message()
+    async def step(message: Message):
+        digest = message.text.encode()
+        for _ in range(cpu_rounds):
+            digest = hashlib.sha256(digest).digest()
+        await asyncio.sleep(io_ms / 1000)
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+def bench_worker(index: int, shard_queue, results, cpu_rounds: int, io_ms: float):
+    async def run():
+        bot = Bot(FAKE_TOKEN)
+        dp = build_dispatcher(cpu_rounds, io_ms)
+        results.put(("ready", index))
+        processed = await consume_shard(bot, dp, shard_queue, concurrency=100)
+        results.put(("done", processed))
+
+    asyncio.run(run())
+
+
+def make_update(update_id: int, user_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Candidate"},
+            "text": f"answer {update_id}",
+        },
+    }
+
+
+def make_callback(update_id: int, user_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": {"id": user_id, "is_bot": False, "first_name": "Candidate"},
+            "chat_instance": "benchmark",
+            "data": "init_apply",
+            "message": {"message_id": update_id - 1, "date": 0, "chat": {"id": user_id, "type": "private"}},
+        },
+    }
+
+
+def check_routing(shards: int, users: int):
+    """Сообщение и нажатие кнопки одного пользователя (после разбора в Update, как в polling) — в одном шарде."""
+    frontend = ShardedFrontend(bench_worker, shards)
+    for user_id in range(10_000, 10_000 + users):
+        message = dump_update(Update.model_validate(make_update(2 * user_id, user_id)))
+        callback = dump_update(Update.model_validate(make_callback(2 * user_id + 1, user_id)))
+        assert frontend.shard_for(message) == frontend.shard_for(callback) == user_id % shards, user_id
+
+
+async def measure(shards: int, updates: int, users: int, cpu_rounds: int, io_ms: float) -> float:
+    results = multiprocessing.get_context("spawn").Queue()
+    worker = functools.partial(bench_worker, results=results, cpu_rounds=cpu_rounds, io_ms=io_ms)
+    frontend = ShardedFrontend(worker, shards)
+    frontend.start()
+
+    loop = asyncio.get_running_loop()
+    for _ in range(shards):  # процессы стартуют через spawn; время импорта не меряем
+        await loop.run_in_executor(None, results.get)
+
+    payload = [make_update(i, 10_000 + i % users) for i in range(updates)]
+    started = time.perf_counter()
+    for update in payload:
+        await frontend.route(update)
+    await frontend.stop(timeout=300)
+
+    processed = 0
+    for _ in range(shards):
+        _, count = await loop.run_in_executor(None, results.get)
+        processed += count
+    elapsed = time.perf_counter() - started
+    assert processed == updates, f"processed {processed} of {updates}"
+    return updates / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shards", default="1,2,4")
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--cpu-rounds", type=int, default=2000, help="sha256 на апдейт (~1 мс CPU на 2000)")
+    parser.add_argument("--io-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{args.updates} updates, {args.users} users, cpu_rounds={args.cpu_rounds}, io={args.io_ms}ms")
+    for shards in (int(s) for s in args.shards.split(",")):
+        check_routing(shards, min(args.users, 100))
+
+    baseline = None
+    for shards in (int(s) for s in args.shards.split(",")):
+        rate = await measure(shards, args.updates, args.users, args.cpu_rounds, args.io_ms)
+        baseline = baseline or rate
+        print(f"shards={shards:<3} {rate:10.0f} updates/s  x{rate / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+# benchmarks/skill_matcher.py
+"""
+Время определения направления по навыкам анкеты: автомат Ахо — Корасик (core/text_matcher.py)
+против поиска каждой фразы словаря отдельным регулярным выражением.
+
+Словарь — начальное наполнение skill_synonyms плюс --extra синтетических фраз (рост словаря
+администраторами). К БД и Telegram бенчмарк не обращается:
+
+    python -m benchmarks.skill_matcher --extra 0,500,5000
+"""
+import argparse
+import re
+import time
+from collections import Counter
+
+from bot_welcome.models.migrations.v0007_skill_synonyms import SEED
+from core.text_matcher import PhraseMatcher
+
+SAMPLE = (
+    "Python 3, Django, FastAPI, PostgreSQL, Redis, Docker, немного React и TypeScript. "
+    "Опыт: 4 года backend-разработки, интеграции с внешними API, Celery, aiogram-боты."
+)
+
+
+def build_dictionary(extra: int) -> dict:
+    dictionary = {phrase: direction for direction, phrases in SEED.items() for phrase in phrases}
+    for index in range(extra):
+        dictionary[f"skill{index} framework"] = f"direction{index % 20}"
+    return dictionary
+
+
+def classify_regex(patterns, text: str):
+    counts = Counter()
+    for pattern, direction in patterns:
+        if pattern.search(text):
+            counts[direction] += 1
+    return counts.most_common(1)[0][0] if counts else None
+
+
+def classify_matcher(matcher: PhraseMatcher, text: str):
+    phrases = {}
+    for match in matcher.iter_matches(text):
+        phrases.setdefault(match.phrase, match.value)
+    return Counter(phrases.values()).most_common(1)[0][0] if phrases else None
+
+
+def measure(function, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--extra", default="0,500,5000", help="синтетических фраз сверх начального словаря")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'phrases':>8} {'build, ms':>10} {'matcher, us':>12} {'regex, us':>10}")
+    for extra in (int(value) for value in args.extra.split(",")):
+        dictionary = build_dictionary(extra)
+
+        started = time.perf_counter()
+        matcher = PhraseMatcher(dictionary)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        patterns = [
+            (re.compile(rf"(?<!\w){re.escape(phrase)}(?!\w)", re.IGNORECASE), direction)
+            for phrase, direction in dictionary.items()
+        ]
+        assert classify_matcher(matcher, SAMPLE) == classify_regex(patterns, SAMPLE)
+
+        matcher_us = measure(lambda: classify_matcher(matcher, SAMPLE), args.iterations)
+        regex_us = measure(lambda: classify_regex(patterns, SAMPLE), max(args.iterations // 10, 1))
+        print(f"{len(dictionary):>8} {build_ms:>10.1f} {matcher_us:>12.1f} {regex_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
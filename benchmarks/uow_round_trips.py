@@ -0,0 +1,104 @@
+# benchmarks/uow_round_trips.py
+"""
+Число обращений к БД (BEGIN, SQL-запросы, COMMIT/ROLLBACK) на основных путях обработки апдейта
+при фиксации одной транзакцией в DBSessionMiddleware (COMMIT после хендлера; хендлеры QC-чата
+фиксируют явно перед ответом рекрутеру — здесь это release() перед callback.answer).
+
+До перехода на единицу работы (commit в каждом методе сервиса) те же пути давали:
+
+    выбор вакансии (create_new_application)    6: BEGIN, INSERT, COMMIT, BEGIN, SELECT (refresh), COMMIT
+    отправка анкеты (finalize_apply)            8: BEGIN, SELECT, UPDATE, INSERT, COMMIT, BEGIN, SELECT, COMMIT
+    рекрутер берет заявку (handle_take)         6: BEGIN, UPDATE (CTE), COMMIT, BEGIN, SELECT, ROLLBACK
+
+Нужна доступная БД из .env (DATABASE_URL); создает и удаляет одну тестовую заявку:
+
+    python -m benchmarks.uow_round_trips
+"""
+import asyncio
+
+from sqlalchemy import delete, event
+
+from bot_welcome.middlewares.db_middleware import LazySession
+from bot_welcome.models.db_models import Application, ApplicationStatus, OutboxMessage, StatusUpdate
+from bot_welcome.services.application_service import ApplicationService
+from core.db import AsyncSessionLocal, engine
+from core.migrations import check_schema
+
+CANDIDATE_TG_ID = 1
+RECRUITER_TG_ID = 2
+
+
+class RoundTripCounter:
+    """Считает обращения к БД через события движка."""
+
+    def __init__(self):
+        self.log = []
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "begin", lambda conn: self._add("BEGIN"))
+        event.listen(sync_engine, "commit", lambda conn: self._add("COMMIT"))
+        event.listen(sync_engine, "rollback", lambda conn: self._add("ROLLBACK"))
+        event.listen(
+            sync_engine, "before_cursor_execute",
+            lambda conn, cursor, statement, *args: self._add(statement.split()[0].upper())
+        )
+
+    def _add(self, name: str):
+        self.log.append(name)
+
+    def reset(self):
+        self.log.clear()
+
+    def report(self, title: str):
+        print(f"{title:<44}{len(self.log):>3}: {', '.join(self.log)}")
+
+
+async def run_update(counter: RoundTripCounter, title: str, handler):
+    """Апдейт как в DBSessionMiddleware: ленивая сессия, COMMIT в конце, закрытие."""
+    counter.reset()
+    session = LazySession(AsyncSessionLocal)
+    try:
+        result = await handler(session)
+        await session.release()
+        return result
+    finally:
+        await session.close()
+        counter.report(title)
+
+
+async def main():
+    await check_schema(engine)
+    counter = RoundTripCounter()
+
+    async def choose_vacancy(session):
+        application = await ApplicationService(session).create_new_application(
+            CANDIDATE_TG_ID, 0, "Benchmark vacancy", {"vacancy_id": 0, "vacancy_title": "Benchmark vacancy"}
+        )
+        return application.id
+
+    application_id = await run_update(counter, "choose vacancy (create_new_application)", choose_vacancy)
+
+    async def finalize(session):
+        service = ApplicationService(session)
+        await service.finalize_application(application_id, {"full_name": "Benchmark", "contacts": {}})
+
+    await run_update(counter, "submit application (finalize_apply)", finalize)
+
+    async def take(session):
+        await ApplicationService(session).update_application_status(
+            application_id, ApplicationStatus.IN_PROGRESS, RECRUITER_TG_ID
+        )
+        await session.get(Application, application_id, populate_existing=True)
+        await session.release()  # callback.answer
+
+    await run_update(counter, "recruiter takes application (handle_take)", take)
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(OutboxMessage).where(OutboxMessage.application_id == application_id))
+        await session.execute(delete(StatusUpdate).where(StatusUpdate.application_id == application_id))
+        await session.execute(delete(Application).where(Application.id == application_id))
+        await session.commit()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
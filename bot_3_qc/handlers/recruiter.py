@@ -1,12 +1,20 @@
 # bot_3_qc/handlers/recruiter.py
+import logging
+
 from aiogram import Router, types, F
 from aiogram.enums import ParseMode
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from aiogram.types import CallbackQuery
+from aiogram.types import CallbackQuery, Message
+from aiogram.filters import Command, CommandObject
+from aiogram.methods import EditMessageText
 from sqlalchemy.ext.asyncio import AsyncSession
-from bot_welcome.services.application_service import ApplicationService
+from bot_welcome.middlewares.db_middleware import LazySession
+from bot_welcome.services.application_service import ApplicationService, StatusChange, StatusChangeResult, STATUS_TRANSITIONS
+from bot_welcome.services.stats_service import StatsService, parse_report_days
 from bot_welcome.models.db_models import Application, ApplicationStatus
 from core.config import settings
+from core.send_queue import send_queue, Priority
+from core.render import Markup, Template
 from typing import Optional
 
 recruiter_router = Router()
@@ -21,113 +29,159 @@ def get_application_service(session: AsyncSession) -> ApplicationService:
     return ApplicationService(session)
 
 
-# --- Вспомогательная функция для экранирования Markdown V2 ---
-def escape_input(text: Optional[str]) -> str:
-    """Полное ручное экранирование для MarkdownV2."""
-    if not text:
-        return "Н/Д"
-
-    # Экранируем ВСЕ специальные символы V2
-    special_chars = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
-    for char in special_chars:
-        text = text.replace(char, f'\\{char}')
-
-    return text.strip()
+def edit_qc_message(
+    callback: CallbackQuery,
+    application: Application,
+    text: str,
+    reply_markup: Optional[types.InlineKeyboardMarkup] = None
+):
+    """
+    Ставит правку карточки отклика в QC-чате в общую очередь (лимит Telegram на групповой чат) и не ждет ее:
+    хендлер рекрутера не стоит за лимитером. Ошибки Telegram логирует очередь, переполнение — здесь.
+    """
+    future = send_queue.submit(
+        callback.bot,
+        EditMessageText(
+            chat_id=callback.message.chat.id,
+            message_id=application.qc_message_id or callback.message.message_id,
+            text=text,
+            reply_markup=reply_markup,
+            parse_mode=ParseMode.MARKDOWN_V2
+        ),
+        priority=Priority.QC
+    )
+    if future.done() and future.exception() is not None:
+        logging.warning(f"QC card edit for app {application.id} not queued: {future.exception()}")
+
+
+# --- Шаблоны сообщений QC-чата (MarkdownV2, core/render.py) ---
+
+APPLICATION_CARD = Template(
+    "🚨 *НОВЫЙ ОТКЛИК* ID: {id}\n"
+    "*💼 Вакансия:* {vacancy_title}\n"
+    "*👤 Кандидат:* {full_name}\n"
+    "*🎯 Уровень:* {level}\n"
+    "*✨ Скиллы:* {skills}\n"
+    "*🏷 Теги:* {tags}\n"
+    "*⏳ Стаж \\(оценка\\):* {years}\n\n"
+    "*📞 Контакты:*\n"
+    "  • Email: {email}\n"
+    "  • Телефон: {phone}\n"
+    "  • TG: {telegram}\n\n"
+    "*📝 Опыт:* {experience}\n"
+    "*📎 Резюме:* {resume}\n"
+    "*🔄 Статус:* {status}"
+)
+TAKEN_CARD = Template("{card}\n\n*ВЗЯТО В РАБОТУ:* @{recruiter}")
+FINAL_STATUS_CARD = Template("{emoji} *СТАТУС: {status}* Обработано рекрутером @{recruiter}\n\n{card}")
 
 
 # --- Вспомогательные функции для форматирования ---
 
 def format_application_message(application: Application) -> str:
-    """Форматирует сообщение о новом отклике для QC-чата (Использует Markdown V2)."""
+    """Карточка отклика для QC-чата (MarkdownV2); все поля кандидата экранируются шаблоном."""
     data = application.candidate_data
     contacts = data.get('contacts', {})
     info = data.get('professional_info', {})
 
-    # Экранирование полей, вводимых пользователем
-    full_name_esc = escape_input(data.get('full_name'))
-    vacancy_title_esc = escape_input(application.vacancy_title)
-    level_esc = escape_input(info.get('level'))
-    skills_esc = escape_input(info.get('skills'))
-    experience_esc = escape_input(info.get('experience'))
-    resume_link_esc = escape_input(data.get('resume_link'))
-
-    # Контакты
-    email_esc = escape_input(contacts.get('email'))
-    phone_esc = escape_input(contacts.get('phone'))
-    tg_esc = escape_input(contacts.get('telegram_username'))
-
-    message_text = (
-        # ИСПРАВЛЕНИЕ: Экранируем ID: {application.id} скобками
-        f"🚨 *НОВЫЙ ОТКЛИК* ID: {application.id}\n"
-        f"*💼 Вакансия:* {vacancy_title_esc}\n"
-        f"*👤 Кандидат:* {full_name_esc}\n"
-        f"*🎯 Уровень:* {level_esc}\n"
-        f"*✨ Скиллы:* {skills_esc}\n\n"
-        f"*📞 Контакты:*\n"
-        f"  • Email: {email_esc}\n"
-        f"  • Телефон: {phone_esc}\n"
-        f"  • TG: {tg_esc}\n\n"
-        f"*📝 Опыт:* {experience_esc}\n"
-        f"*📎 Резюме:* {resume_link_esc}\n"
-        f"*🔄 Статус:* {application.status.value}"
+    return APPLICATION_CARD.render(
+        id=application.id,
+        vacancy_title=application.vacancy_title,
+        full_name=data.get('full_name'),
+        level=info.get('level'),
+        skills=info.get('skills'),
+        tags=", ".join(application.skill_tags or []),
+        years=format_years(application.experience_years),
+        email=contacts.get('email'),
+        phone=contacts.get('phone'),
+        telegram=contacts.get('telegram_username'),
+        experience=info.get('experience'),
+        resume=data.get('resume_link'),
+        status=application.status.value,
     )
-    return message_text
 
 
-def create_recruiter_keyboard(app_id: int) -> types.InlineKeyboardMarkup:
-    """Создает клавиатуру действий для рекрутера."""
+def format_years(years: Optional[float]) -> Optional[str]:
+    if years is None:
+        return None
+    if years < 1:
+        return "меньше года"
+    return f"{years:g} г."
+
+
+def create_recruiter_keyboard(app_id: int, status: ApplicationStatus = ApplicationStatus.NEW) -> types.InlineKeyboardMarkup:
+    """Создает клавиатуру действий для рекрутера: только переходы, разрешенные из текущего статуса."""
     builder = InlineKeyboardBuilder()
+    allowed = STATUS_TRANSITIONS.get(status, set())
 
-    builder.button(text="✅ Взять в работу", callback_data=f"app_take_{app_id}")
-    builder.button(text="✉️ Пригласить", callback_data=f"app_status_INVITED_{app_id}")
-    builder.button(text="❌ Отказ", callback_data=f"app_status_REJECTED_{app_id}")
+    if ApplicationStatus.IN_PROGRESS in allowed:
+        builder.button(text="✅ Взять в работу", callback_data=f"app_take_{app_id}")
+    if ApplicationStatus.INVITED in allowed:
+        builder.button(text="✉️ Пригласить", callback_data=f"app_status_INVITED_{app_id}")
+    if ApplicationStatus.REJECTED in allowed:
+        builder.button(text="❌ Отказ", callback_data=f"app_status_REJECTED_{app_id}")
 
-    builder.adjust(1, 2)
+    builder.adjust(2)
     return builder.as_markup()
 
 
+STATUS_CHANGE_ERRORS = {
+    StatusChangeResult.NOT_FOUND: "Заявка не найдена.",
+    StatusChangeResult.ALREADY_TAKEN: "Заявка уже взята или обработана другим рекрутером.",
+    StatusChangeResult.INVALID_TRANSITION: "Сначала возьмите заявку в работу.",
+}
+
+
+async def load_application(session: AsyncSession, app_id: int) -> Optional[Application]:
+    """Свежая версия отклика из БД (после изменения статуса отдельным запросом)."""
+    return await session.get(Application, app_id, populate_existing=True)
+
+
+async def answer_status_change_error(callback: CallbackQuery, change: StatusChange):
+    """Сообщает рекрутеру о проигранной гонке/недопустимом переходе, не трогая сообщение в чате."""
+    text = STATUS_CHANGE_ERRORS.get(change.result, "Не удалось обновить статус заявки.")
+    if change.status is not None:
+        text += f" Текущий статус: {change.status.value}."
+    await callback.answer(text, show_alert=True)
+
+
 # --- Хендлеры действий ---
 
 @recruiter_router.callback_query(F.data.startswith("app_take_"))
-async def handle_take_application(callback: CallbackQuery, session: AsyncSession):
+async def handle_take_application(callback: CallbackQuery, session: LazySession):
     """Рекрутер берет заявку в работу (status=IN_PROGRESS)."""
-    await callback.answer("Принимаю заявку в работу...")
-
     app_id = int(callback.data.split("_")[-1])
     recruiter_tg_id = callback.from_user.id
     recruiter_username = callback.from_user.username or callback.from_user.full_name
 
     app_service = get_application_service(session)
-    success = await app_service.update_application_status(
+    change = await app_service.update_application_status(
         application_id=app_id,
         new_status=ApplicationStatus.IN_PROGRESS,
         recruiter_tg_id=recruiter_tg_id
     )
 
-    if success:
-        # Обновляем сообщение, используя Markdown V2
-        new_text = f"{callback.message.text}\n\n"
-        # Экранируем имя пользователя, так как оно может содержать _, * и т.д.
-        recruiter_info = escape_input(recruiter_username)
-        new_text += f"*ВЗЯТО В РАБОТУ:* \\@{recruiter_info}"
+    if not change.ok:
+        await answer_status_change_error(callback, change)
+        return
 
-        await callback.message.edit_text(
-            new_text,
-            reply_markup=create_recruiter_keyboard(app_id),
-            parse_mode=ParseMode.MARKDOWN_V2
-        )
-    else:
-        await callback.message.edit_text(
-            f"{callback.message.text}\n\n⚠️ *ОШИБКА:* Не удалось обновить статус заявки {app_id}\\.",
-            parse_mode=ParseMode.MARKDOWN_V2
-        )
+    # Карточка читается в той же транзакции; работа с БД закончена — фиксируем до ответа рекрутеру,
+    # чтобы он не увидел подтверждения откатившегося изменения, а соединение не ждало Telegram
+    application = await load_application(session, app_id)
+    await session.release()
+    await callback.answer("Заявка взята в работу.")
+    if application is None:
+        return
+
+    # Карточка перерисовывается из БД, а не из текста сообщения
+    new_text = TAKEN_CARD.render(card=Markup(format_application_message(application)), recruiter=recruiter_username)
+
+    edit_qc_message(callback, application, new_text, reply_markup=create_recruiter_keyboard(app_id, change.status))
 
 
 @recruiter_router.callback_query(F.data.startswith("app_status_"))
-async def handle_final_status(callback: CallbackQuery, session: AsyncSession):
+async def handle_final_status(callback: CallbackQuery, session: LazySession):
     """Обработка финальных статусов (INVITED, REJECTED)."""
-    await callback.answer("Обновляю статус...")
-
     parts = callback.data.split("_")
     new_status_str = parts[2]
     app_id = int(parts[3])
@@ -142,27 +196,44 @@ async def handle_final_status(callback: CallbackQuery, session: AsyncSession):
     recruiter_username = callback.from_user.username or callback.from_user.full_name
 
     app_service = get_application_service(session)
-    success = await app_service.update_application_status(
+    change = await app_service.update_application_status(
         application_id=app_id,
         new_status=new_status,
         recruiter_tg_id=recruiter_tg_id,
         reason=f"Обновлено рекрутером @{recruiter_username}"
     )
 
-    if success:
-        # Обновляем сообщение, удаляя кнопки
-        status_emoji = "✅" if new_status == ApplicationStatus.INVITED else "❌"
-        recruiter_info = escape_input(recruiter_username)
+    if not change.ok:
+        await answer_status_change_error(callback, change)
+        return
 
-        new_text = f"{status_emoji} *СТАТУС: {new_status.value}* Обработано рекрутером \\@{recruiter_info}\n\n{callback.message.text}"
+    # Карточка читается в той же транзакции; работа с БД закончена — фиксируем до ответа рекрутеру,
+    # чтобы он не увидел подтверждения откатившегося изменения, а соединение не ждало Telegram
+    application = await load_application(session, app_id)
+    await session.release()
+    await callback.answer("Статус обновлен.")
+    if application is None:
+        return
 
-        await callback.message.edit_text(
-            new_text,
-            reply_markup=None,
-            parse_mode=ParseMode.MARKDOWN_V2
-        )
-    else:
-        await callback.message.edit_text(
-            f"{callback.message.text}\n\n⚠️ *ОШИБКА:* Не удалось обновить статус заявки {app_id}\\.",
-            parse_mode=ParseMode.MARKDOWN_V2
-        )
+    # Обновляем сообщение, удаляя кнопки
+    new_text = FINAL_STATUS_CARD.render(
+        emoji="✅" if new_status == ApplicationStatus.INVITED else "❌",
+        status=new_status.value,
+        recruiter=recruiter_username,
+        card=Markup(format_application_message(application)),
+    )
+
+    edit_qc_message(callback, application, new_text)
+
+
+@recruiter_router.message(Command("stats"))
+async def cmd_stats(message: Message, command: CommandObject, session: AsyncSession):
+    """/stats [дни] в QC-чате — эффективность рекрутеров (та же сводка, что у администратора)."""
+    days = parse_report_days(command.args)
+    if days is None:
+        await message.answer("Формат: /stats [дни]", parse_mode=None)
+        return
+
+    service = StatsService(session)
+    report = await service.recruiter_report(days)
+    await message.answer(await service.format_report(report), parse_mode=None)
@@ -1,30 +1,46 @@
 # bot_3_qc/main.py
 import asyncio
 import logging
+from typing import Optional
 
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
 
 
+from core.cache_bus import invalidation_bus
 from core.config import settings
-from core.db import AsyncSessionLocal # ИСПРАВЛЕНО
+from core.fsm_storage import create_fsm_storage
+from core.send_queue import send_queue
+from core.recruiting_api import recruiting_api
+from core.metrics import start_metrics_server
+from core.webhook import register_webhook, serve_webhook, run_webhook_workers
+from bot_welcome.services.outbox_dispatcher import outbox_dispatcher
+from core.db import AsyncSessionLocal, engine # ИСПРАВЛЕНО
+from core.migrations import check_schema
 from bot_welcome.middlewares.db_middleware import DBSessionMiddleware # НОВЫЙ ИМПОРТ
+from bot_welcome.middlewares.metrics_middleware import MetricsMiddleware, TelegramTimingMiddleware
 from bot_3_qc.handlers.recruiter import recruiter_router
 
 logging.basicConfig(level=logging.INFO)
 
+WEBHOOK_PATH = "/webhook/qc"
 
-async def main():
-    logging.info("Starting Recruiter Bot for QC Chat...")
 
-    # Инициализация Бота и Диспетчера
+def create_bot() -> Bot:
     # Используем токен рекрутера (который мы исправили в .env)
     bot = Bot(
         token=settings.RECRUITER_BOT_TOKEN,
         default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN_V2)) # Используем V2 для QC-чата
-    dp = Dispatcher(storage=MemoryStorage())
+    bot.session.middleware(TelegramTimingMiddleware())
+    return bot
+
+
+def create_dispatcher() -> Dispatcher:
+    dp = Dispatcher(storage=create_fsm_storage())
+
+    # Метрики хендлеров (самый внешний мидлвар, чтобы учитывать и работу с сессией БД)
+    MetricsMiddleware("qc").setup(dp)
 
     # 1. Регистрация Мидлвара (Dependency Injection)
     # Используем уже определенный AsyncSessionLocal
@@ -33,14 +49,65 @@ async def main():
 
     # 2. Регистрация роутера
     dp.include_router(recruiter_router)
+    return dp
+
+
+async def main(set_webhook: bool = True, worker_index: Optional[int] = None):
+    logging.info("Starting Recruiter Bot for QC Chat...")
+
+    # Бот не стартует на схеме БД старее кода (миграции: python -m core.migrations)
+    await check_schema(engine)
 
-    # 3. Запуск бота
-    logging.info(f"Recruiter Bot is listening to chat ID: {settings.QC_CHAT_ID}")
-    await dp.start_polling(bot)
+    # Инициализация Бота и Диспетчера
+    bot = create_bot()
+    dp = create_dispatcher()
+
+    # 3. Слушатель межпроцессной инвалидации кэшей
+    await invalidation_bus.start()
+    # Общая очередь исходящих сообщений с лимитами Telegram (делятся между webhook-воркерами)
+    await send_queue.start(processes=settings.WEBHOOK_WORKERS if worker_index is not None else 1)
+    # Фоновая доставка откликов и статусов во внешнее API
+    await outbox_dispatcher.start()
+    # Эндпоинт /metrics (у каждого воркера свой порт)
+    metrics_port = settings.QC_METRICS_PORT
+    if metrics_port and worker_index is not None:
+        metrics_port += worker_index + 1
+    metrics_runner = await start_metrics_server(settings.METRICS_HOST, metrics_port)
+
+    # 4. Запуск бота
+    logging.info(f"Recruiter Bot is listening to chat ID: {settings.QC_CHAT_ID} ({settings.BOT_MODE})")
+    try:
+        if settings.BOT_MODE == "webhook":
+            # Webhook регистрирует только один процесс
+            if set_webhook:
+                await register_webhook(bot, dp, WEBHOOK_PATH)
+            await serve_webhook(bot, dp, WEBHOOK_PATH, settings.QC_WEBHOOK_PORT,
+                                reuse_port=settings.WEBHOOK_WORKERS > 1)
+        else:
+            # Webhook, оставшийся от запуска в режиме webhook, блокирует getUpdates
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
+    finally:
+        await outbox_dispatcher.stop()
+        await send_queue.stop()
+        await invalidation_bus.stop()
+        await recruiting_api.close()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+
+
+def run_worker(index: int):
+    try:
+        asyncio.run(main(set_webhook=index == 0, worker_index=index))
+    except KeyboardInterrupt:
+        logging.info("Webhook worker stopped by KeyboardInterrupt.")
 
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if settings.BOT_MODE == "webhook" and settings.WEBHOOK_WORKERS > 1:
+            run_webhook_workers(run_worker, settings.WEBHOOK_WORKERS)
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
-        logging.info("Recruiter Bot stopped by KeyboardInterrupt.")
\ No newline at end of file
+        logging.info("Recruiter Bot stopped by KeyboardInterrupt.")
@@ -1,11 +1,14 @@
 # bot_welcome/handlers/admin.py
-from aiogram.filters import Filter
+from aiogram.filters import Filter, Command, CommandObject
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from bot_welcome.services.content_service import ContentService
+from bot_welcome.services.application_service import ApplicationService
+from bot_welcome.services.stats_service import StatsService, parse_report_days
 from core.config import settings
+from core.render import Markup, Template
 from sqlalchemy.ext.asyncio import AsyncSession
 import json
 from aiogram.enums import ParseMode
@@ -25,6 +28,58 @@ def get_service(session: AsyncSession) -> ContentService:
     return ContentService(session)
 
 
+def get_application_service(session: AsyncSession) -> ApplicationService:
+    return ApplicationService(session)
+
+
+# --- Шаблоны ответов администратору (MarkdownV2, core/render.py) ---
+# Бот по умолчанию отправляет HTML, поэтому они уходят через answer_markup()
+
+WELCOME_TEXT_PROMPT = Markup("Введите *новый текст приветствия* \\(поддерживается Markdown\\):")
+LINKS_JSON_PROMPT = Markup(
+    "Отлично\\. Теперь введите *полезные ссылки* в формате *JSON*:\n"
+    'Пример: `[{"title": "GitHub", "url": "http://..."}]`'
+)
+WELCOME_UPDATED = Markup("✅ *Приветственный контент успешно обновлен*")
+INVALID_JSON = Markup("❌ *Ошибка:* Неверный формат JSON\\. Попробуйте снова\\.")
+
+VACANCY_PROMPT = Markup(
+    "Введите данные новой вакансии в формате:\n"
+    "*Название вакансии*\n"
+    "*Ссылка на пост*\n"
+    "*ID поста \\(только цифры\\)*\n"
+    "*Направление* \\(необязательно, например: python\\)\n"
+    "_\\(Каждый параметр в новой строке\\)_"
+)
+VACANCY_ADDED = Template("✅ *Вакансия '{title}' успешно добавлена в кэш*")
+VACANCY_EXISTS = Template("⚠️ *Вакансия с ID {post_id} уже существует*")
+TOGGLE_PROMPT = Markup(
+    "Введите *ID поста* и *новый статус* через пробел \\(0 \\- неактивна, 1 \\- активна\\):\n"
+    "Пример: `12345 0`"
+)
+VACANCY_TOGGLED = Template("✅ *Статус вакансии с ID {post_id} обновлен:* {status}\\.")
+VACANCY_NOT_FOUND = Template("⚠️ *Ошибка:* Вакансия с ID {post_id} не найдена\\.")
+
+ADD_RECRUITER_USAGE = Markup("Формат: `/add_recruiter <направление> @username [tg_id]`")
+INVALID_TG_ID = Markup("❌ *Ошибка:* tg\\_id должен состоять из цифр\\.")
+TG_ID_REQUIRED = Markup("❌ *Ошибка:* для нового направления укажите Telegram ID рекрутера третьим параметром\\.")
+RECRUITER_SET = Template("✅ Направление {direction} → @{username} \\({tg_id}\\){suffix}")
+REMOVE_RECRUITER_USAGE = Markup("Формат: `/remove_recruiter <направление>`")
+RECRUITER_REMOVED = Template("✅ Рекрутер направления {direction} отключен\\.")
+RECRUITER_NOT_FOUND = Template("⚠️ Активный рекрутер для направления {direction} не найден\\.")
+ROUTES_HEADER = Markup("Направление \\| Рекрутер \\(TG ID\\)")
+ROUTE_LINE = Template("{direction} \\| @{username} \\({tg_id}\\){status}")
+
+ADD_SYNONYM_USAGE = Markup("Формат: `/add_synonym <направление> <фраза>`")
+PHRASE_TOO_LONG = Markup("❌ *Ошибка:* фраза длиннее 100 символов\\.")
+REMOVE_SYNONYM_USAGE = Markup("Формат: `/remove_synonym <фраза>`")
+STATS_USAGE = Markup("Формат: `/stats [дни]`")
+
+
+async def answer_markup(message: Message, text: Markup):
+    await message.answer(text, parse_mode=ParseMode.MARKDOWN_V2)
+
+
 class IsAdmin(Filter):
     """Проверяет, является ли отправитель сообщения администратором."""
 
@@ -37,10 +92,17 @@ class IsAdmin(Filter):
 @admin_router.message(F.text == "/admin", IsAdmin())
 async def cmd_admin(message: Message):
     """Главное меню админ-панели."""
-    text = "**⚙️ Панель Администратора Бот №1:**\n"
+    text = "*⚙️ Панель Администратора Бот №1:*\n"
     text += "/update\\_welcome \\- Обновить текст приветствия и ссылки\n"
     text += "/add\\_vacancy \\- Добавить новую вакансию в кэш\n"
-    text += "/toggle\\_vacancy \\- Изменить статус активности вакансии \\(по ID поста\\)"
+    text += "/toggle\\_vacancy \\- Изменить статус активности вакансии \\(по ID поста\\)\n"
+    text += "/add\\_recruiter \\- Назначить рекрутера направлению\n"
+    text += "/remove\\_recruiter \\- Отключить рекрутера направления\n"
+    text += "/list\\_recruiters \\- Маппинг направлений на рекрутеров\n"
+    text += "/add\\_synonym \\- Навык → направление для маршрутизации откликов\n"
+    text += "/remove\\_synonym \\- Удалить навык из словаря\n"
+    text += "/list\\_synonyms \\- Словарь навыков\n"
+    text += "/stats \\[дни\\] \\- Эффективность рекрутеров"
 
     await message.answer(text, parse_mode=ParseMode.MARKDOWN_V2)
 
@@ -50,21 +112,14 @@ async def cmd_admin(message: Message):
 @admin_router.message(F.text == "/update_welcome", IsAdmin())
 async def cmd_update_welcome(message: Message, state: FSMContext):
     await state.set_state(AdminStates.waiting_for_welcome_text)
-    await message.answer(
-        "Введите **новый текст приветствия** (поддерживается Markdown):",
-        parse_mode=ParseMode.MARKDOWN
-    )
+    await answer_markup(message, WELCOME_TEXT_PROMPT)
 
 
 @admin_router.message(AdminStates.waiting_for_welcome_text, IsAdmin())
 async def process_new_welcome_text(message: Message, state: FSMContext):
     await state.update_data(new_welcome_text=message.html_text)  # Сохраняем как HTML/Markdown
     await state.set_state(AdminStates.waiting_for_links_json)
-    await message.answer(
-        "Отлично. Теперь введите **полезные ссылки** в формате **JSON**:\n"
-        'Пример: `[{"title": "GitHub", "url": "http://..."}]`',
-        parse_mode=ParseMode.MARKDOWN
-    )
+    await answer_markup(message, LINKS_JSON_PROMPT)
 
 
 @admin_router.message(AdminStates.waiting_for_links_json, IsAdmin())
@@ -80,14 +135,14 @@ async def process_new_links_json(message: Message, state: FSMContext, session: A
         service = get_service(session)
         await service.update_welcome_content(new_text, links_data)
 
-        await message.answer("✅ **Приветственный контент успешно обновлен**")
+        await answer_markup(message, WELCOME_UPDATED)
         await state.clear()
     except json.JSONDecodeError:
-        await message.answer("❌ **Ошибка:** Неверный формат JSON. Попробуйте снова.")
+        await answer_markup(message, INVALID_JSON)
     except ValueError as e:
-        await message.answer(f"❌ **Ошибка:** {e}")
+        await message.answer(f"❌ Ошибка: {e}", parse_mode=None)
     except Exception as e:
-        await message.answer(f"❌ **Ошибка БД:** {e}")
+        await message.answer(f"❌ Ошибка БД: {e}", parse_mode=None)
         await state.clear()
 
 
@@ -96,38 +151,34 @@ async def process_new_links_json(message: Message, state: FSMContext, session: A
 @admin_router.message(F.text == "/add_vacancy", IsAdmin())
 async def cmd_add_vacancy(message: Message, state: FSMContext):
     await state.set_state(AdminStates.waiting_for_new_vacancy_data)
-    await message.answer(
-        "Введите данные новой вакансии в формате:\n"
-        "**Название вакансии**\n"
-        "**Ссылка на пост**\n"
-        "**ID поста (только цифры)**\n"
-        "*(Каждый параметр в новой строке)*"
-    )
+    await answer_markup(message, VACANCY_PROMPT)
 
 
 @admin_router.message(AdminStates.waiting_for_new_vacancy_data, IsAdmin())
 async def process_new_vacancy_data(message: Message, state: FSMContext, session: AsyncSession):
     try:
         lines = message.text.strip().split('\n')
-        if len(lines) != 3:
-            raise ValueError("Необходимо 3 строки: Название, Ссылка, ID поста.")
+        if len(lines) not in (3, 4):
+            raise ValueError("Необходимо 3 или 4 строки: Название, Ссылка, ID поста, [Направление].")
 
         title = lines[0].strip()
         link = lines[1].strip()
         post_id = int(lines[2].strip())
+        direction = lines[3].strip() if len(lines) == 4 else 'default'
 
+        # Запись через сервис инвалидирует кэш и меняет версию готовых сообщений /start
         service = get_service(session)
-        if await service.add_vacancy_to_cache(title, link, post_id):
-            await message.answer(f"✅ **Вакансия '{title}' успешно добавлена в кэш**")
+        if await service.add_vacancy_to_cache(title, link, post_id, direction):
+            await answer_markup(message, VACANCY_ADDED.render(title=title))
         else:
-            await message.answer(f"⚠️ **Вакансия с ID {post_id} уже существует**")
+            await answer_markup(message, VACANCY_EXISTS.render(post_id=post_id))
 
         await state.clear()
 
     except ValueError as e:
-        await message.answer(f"❌ **Ошибка:** {e}")
+        await message.answer(f"❌ Ошибка: {e}", parse_mode=None)
     except Exception as e:
-        await message.answer(f"❌ **Ошибка БД:** {e}")
+        await message.answer(f"❌ Ошибка БД: {e}", parse_mode=None)
         await state.clear()
 
 
@@ -136,10 +187,7 @@ async def process_new_vacancy_data(message: Message, state: FSMContext, session:
 @admin_router.message(F.text == "/toggle_vacancy", IsAdmin())
 async def cmd_toggle_vacancy(message: Message, state: FSMContext):
     await state.set_state(AdminStates.waiting_for_toggle_vacancy_id)
-    await message.answer(
-        "Введите **ID поста** и **новый статус** через пробел (0 - неактивна, 1 - активна):\n"
-        "Пример: `12345 0`"
-    )
+    await answer_markup(message, TOGGLE_PROMPT)
 
 
 @admin_router.message(AdminStates.waiting_for_toggle_vacancy_id, IsAdmin())
@@ -160,14 +208,153 @@ async def process_toggle_vacancy(message: Message, state: FSMContext, session: A
         service = get_service(session)
         if await service.toggle_vacancy_active(post_id, is_active):
             status_text = "Активна" if is_active else "Неактивна"
-            await message.answer(f"✅ **Статус вакансии с ID {post_id} обновлен:** {status_text}.")
+            await answer_markup(message, VACANCY_TOGGLED.render(post_id=post_id, status=status_text))
         else:
-            await message.answer(f"⚠️ **Ошибка:** Вакансия с ID {post_id} не найдена.")
+            await answer_markup(message, VACANCY_NOT_FOUND.render(post_id=post_id))
 
         await state.clear()
 
     except ValueError as e:
-        await message.answer(f"❌ **Ошибка:** {e}")
+        await message.answer(f"❌ Ошибка: {e}", parse_mode=None)
+    except Exception as e:
+        await message.answer(f"❌ Ошибка БД: {e}", parse_mode=None)
+        await state.clear()
+
+# --- 4. Маппинг направлений на рекрутеров ---
+
+@admin_router.message(Command("add_recruiter"), IsAdmin())
+async def cmd_add_recruiter(message: Message, command: CommandObject, session: AsyncSession):
+    """/add_recruiter <направление> @username [tg_id]"""
+    parts = (command.args or "").split()
+    if len(parts) not in (2, 3) or not parts[1].startswith("@"):
+        await answer_markup(message, ADD_RECRUITER_USAGE)
+        return
+
+    direction, username = parts[0], parts[1].lstrip("@")
+    app_service = get_application_service(session)
+    reactivated = False
+
+    if len(parts) == 3:
+        if not parts[2].isdigit():
+            await answer_markup(message, INVALID_TG_ID)
+            return
+        tg_id = int(parts[2])
+    else:
+        # Telegram не отдает ID по username, поэтому без tg_id можно только сменить username
+        # (или снова включить отключенное направление с прежним рекрутером)
+        current = await app_service.get_recruiter_mapping(direction)
+        if not current:
+            await answer_markup(message, TG_ID_REQUIRED)
+            return
+        tg_id = current.recruiter_tg_id
+        reactivated = not current.is_active
+
+    try:
+        await app_service.add_update_recruiter(direction=direction, tg_id=tg_id, username=username)
+        suffix = Markup(" — направление снова включено" if reactivated else "")
+        await answer_markup(
+            message, RECRUITER_SET.render(direction=direction, username=username, tg_id=tg_id, suffix=suffix)
+        )
     except Exception as e:
-        await message.answer(f"❌ **Ошибка БД:** {e}")
-        await state.clear()
\ No newline at end of file
+        await message.answer(f"❌ Ошибка БД: {e}", parse_mode=None)
+
+
+@admin_router.message(Command("remove_recruiter"), IsAdmin())
+async def cmd_remove_recruiter(message: Message, command: CommandObject, session: AsyncSession):
+    """/remove_recruiter <направление>"""
+    direction = (command.args or "").strip()
+    if not direction:
+        await answer_markup(message, REMOVE_RECRUITER_USAGE)
+        return
+
+    app_service = get_application_service(session)
+    if await app_service.remove_recruiter(direction):
+        await answer_markup(message, RECRUITER_REMOVED.render(direction=direction))
+    else:
+        await answer_markup(message, RECRUITER_NOT_FOUND.render(direction=direction))
+
+
+@admin_router.message(Command("list_recruiters"), IsAdmin())
+async def cmd_list_recruiters(message: Message, session: AsyncSession):
+    app_service = get_application_service(session)
+    # Таблица в памяти: запрос к БД только при первом обращении после записи
+    routes = await app_service.list_recruiters()
+
+    if not routes:
+        await message.answer("Маппинг рекрутеров пуст.")
+        return
+
+    lines = [ROUTES_HEADER]
+    for route in routes:
+        lines.append(ROUTE_LINE.render(
+            direction=route.direction,
+            username=route.recruiter_username or "—",
+            tg_id=route.recruiter_tg_id,
+            status=Markup("" if route.is_active else " — отключен"),
+        ))
+    await answer_markup(message, Markup("\n".join(lines)))
+
+
+# --- 5. Словарь навыков для маршрутизации откликов ---
+
+@admin_router.message(Command("add_synonym"), IsAdmin())
+async def cmd_add_synonym(message: Message, command: CommandObject, session: AsyncSession):
+    """/add_synonym <направление> <фраза> — например, /add_synonym java spring boot"""
+    parts = (command.args or "").split(maxsplit=1)
+    if len(parts) != 2:
+        await answer_markup(message, ADD_SYNONYM_USAGE)
+        return
+    if len(parts[1]) > 100:
+        await answer_markup(message, PHRASE_TOO_LONG)
+        return
+
+    app_service = get_application_service(session)
+    phrase, direction = await app_service.add_skill_synonym(phrase=parts[1], direction=parts[0])
+    await message.answer(f"✅ «{phrase}» → {direction}", parse_mode=None)
+
+
+@admin_router.message(Command("remove_synonym"), IsAdmin())
+async def cmd_remove_synonym(message: Message, command: CommandObject, session: AsyncSession):
+    """/remove_synonym <фраза>"""
+    phrase = (command.args or "").strip()
+    if not phrase:
+        await answer_markup(message, REMOVE_SYNONYM_USAGE)
+        return
+
+    app_service = get_application_service(session)
+    if await app_service.remove_skill_synonym(phrase):
+        await message.answer(f"✅ Фраза «{phrase}» удалена из словаря.", parse_mode=None)
+    else:
+        await message.answer(f"⚠️ Фразы «{phrase}» нет в словаре.", parse_mode=None)
+
+
+@admin_router.message(Command("list_synonyms"), IsAdmin())
+async def cmd_list_synonyms(message: Message, session: AsyncSession):
+    app_service = get_application_service(session)
+    # Словарь в памяти: запрос к БД только при первом обращении после записи
+    synonyms = await app_service.list_skill_synonyms()
+
+    if not synonyms:
+        await message.answer("Словарь навыков пуст.")
+        return
+
+    by_direction: dict[str, list[str]] = {}
+    for phrase, direction in synonyms:
+        by_direction.setdefault(direction, []).append(phrase)
+    lines = [f"{direction}: {', '.join(phrases)}" for direction, phrases in by_direction.items()]
+    await message.answer("\n".join(lines), parse_mode=None)
+
+
+# --- 6. Статистика ---
+
+@admin_router.message(Command("stats"), IsAdmin())
+async def cmd_stats(message: Message, command: CommandObject, session: AsyncSession):
+    """/stats [дни] — эффективность рекрутеров за последние N дней (по умолчанию 7)."""
+    days = parse_report_days(command.args)
+    if days is None:
+        await answer_markup(message, STATS_USAGE)
+        return
+
+    service = StatsService(session)
+    report = await service.recruiter_report(days)
+    await message.answer(await service.format_report(report), parse_mode=None)
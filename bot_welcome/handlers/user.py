@@ -1,22 +1,24 @@
 # bot_welcome/handlers/user.py
-from aiogram import Router, types, F, Bot
+from aiogram import Router, types, F
 from aiogram.enums import ParseMode
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from aiogram.types import Message, CallbackQuery, KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from aiogram.types import Message, CallbackQuery, KeyboardButton, ReplyKeyboardMarkup
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from aiogram.methods import SendMessage
 from core.config import settings
-import json
+from core.send_queue import send_queue, Priority
+from core.render import Template, escape
 import logging
 import re
-from typing import Optional, Union
 
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from bot_welcome.services.content_service import ContentService
-from bot_3_qc.handlers.recruiter import format_application_message, create_recruiter_keyboard  # QC-функции
+from core.cache import TTLCache
 from bot_welcome.services.application_service import ApplicationService
-from bot_welcome.models.db_models import CachedVacancy, Application
+from bot_welcome.services.draft_buffer import draft_buffer
+from bot_welcome.services.qc_notifier import qc_notifier
+from bot_welcome.services.resume_pipeline import resume_pipeline
 
 user_router = Router()
 
@@ -33,25 +35,16 @@ class QuickApply(StatesGroup):
     waiting_resume = State()
 
 
-# --- Вспомогательная функция для ручного экранирования Markdown V2 ---
+# --- Шаблоны сообщений кандидату (MarkdownV2, core/render.py) ---
 
-SPECIAL_CHARS = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
-
-
-def escape_markdown_v2(text: Optional[str]) -> str:
-    """Экранирует специальные символы MarkdownV2 для финального сообщения кандидату."""
-    if not text:
-        return "Н\\/Д"
-
-    # 1. Сначала убираем символы, которые могут быть частью разметки, но являются вводом пользователя
-    # (чтобы избежать конфликтов с внутренним синтаксисом)
-    text = text.replace('*', '').replace('_', '').replace('`', '')
-
-    # 2. Экранируем все остальные специальные символы V2
-    for char in SPECIAL_CHARS:
-        text = text.replace(char, f'\\{char}')
-
-    return text.strip()
+VACANCY_SELECTED = Template("✅ Вы выбрали: *{vacancy_title}*\n\n*👤 Шаг 2/7:* Введите Ваши *полные ФИО*:")
+APPLICATION_ACCEPTED = Template(
+    "🎉 *Ваш отклик успешно принят*\n"
+    "*🎯 Вакансия:* {vacancy_title}\n"
+    "*📞 Для быстрой связи напишите Вашему рекрутеру:*\n"
+    "👉 @{recruiter}\n"
+    "Укажите, что Вы по поводу вакансии \\[*{vacancy_title}*\\]\\."
+)
 
 
 # --- Вспомогательные функции для DI ---
@@ -63,6 +56,15 @@ def get_application_service(session: AsyncSession) -> ApplicationService:
     return ApplicationService(session)
 
 
+async def save_step(state: FSMContext, **fields):
+    """
+    Сохраняет ответ шага анкеты в FSM и ставит его в черновик: в БД черновик пишется в фоне пачкой
+    (write-behind), только изменившиеся поля. id отклика берется из данных, которые вернул update_data.
+    """
+    data = await state.update_data(**fields)
+    draft_buffer.stage(data['application_id'], **fields)
+
+
 # --- Вспомогательные функции для клавиатуры ---
 
 async def create_main_keyboard(vacancies: list) -> types.InlineKeyboardMarkup:
@@ -89,22 +91,63 @@ async def create_vacancy_selection_keyboard(vacancies: list) -> types.InlineKeyb
     return builder.as_markup()
 
 
-# --- Хендлеры команд и Callback'ов (Приветственный Гид) ---
+# --- Кэш готовых сообщений и клавиатур ---
+# Ключ: (вид, WelcomeContent.id, версия набора вакансий). Любая запись контента
+# через ContentService меняет версию, поэтому старые записи просто перестают запрашиваться.
+render_cache = TTLCache(ttl=settings.CONTENT_CACHE_TTL, max_size=32)
 
-async def send_welcome_message(message: Message, service: ContentService):
-    """Отправляет полное приветственное сообщение (использует Markdown V2)."""
+
+async def get_rendered_welcome(service: ContentService) -> tuple[str, types.InlineKeyboardMarkup]:
+    """Готовый текст (MarkdownV2) и клавиатура главного меню."""
+    version = await service.get_content_version()
+    return await render_cache.get_or_load(("welcome",) + version, lambda: _render_welcome(service))
+
+
+async def _render_welcome(service: ContentService) -> tuple[str, types.InlineKeyboardMarkup]:
     welcome_text, _ = await service.get_welcome_data()
     vacancies = await service.get_latest_vacancies(limit=5)
-    welcome_text_esc = escape_markdown_v2(welcome_text)
+    # Текст приветствия из админки — обычный текст; список вакансий уже размечен в MarkdownV2
+    final_text = f"{escape(welcome_text)}\n\n{service.format_vacancies_text(vacancies)}"
 
-    vac_text_part_raw = service.format_vacancies_text(vacancies)
+    keyboard = await create_main_keyboard(vacancies)
+    return final_text, keyboard
 
-    vac_text_part_esc = escape_markdown_v2(vac_text_part_raw)
 
-    # Используем Markdown V2 для welcome_text (предполагая, что он был очищен в админке или экранирован)
-    final_text = f"{welcome_text_esc}\n\n{vac_text_part_esc}"
+async def get_rendered_vacancies(service: ContentService) -> tuple[str, types.InlineKeyboardMarkup]:
+    """Готовый список вакансий (MarkdownV2) и клавиатура к нему."""
+    version = await service.get_content_version()
+    return await render_cache.get_or_load(("vacancies",) + version, lambda: _render_vacancies(service))
 
-    keyboard = await create_main_keyboard(vacancies)
+
+async def _render_vacancies(service: ContentService) -> tuple[str, types.InlineKeyboardMarkup]:
+    vacancies = await service.get_latest_vacancies(limit=10)
+
+    text = service.format_vacancies_text(vacancies)
+
+    builder = InlineKeyboardBuilder()
+    if vacancies:
+        builder.button(text="✈️ Откликнуться на вакансию", callback_data="init_apply")
+
+    builder.button(text="↩️ В главное меню", callback_data="start_menu")
+    builder.adjust(1)
+    return text, builder.as_markup()
+
+
+async def get_rendered_vacancy_selection(service: ContentService) -> types.InlineKeyboardMarkup:
+    """Готовая клавиатура выбора вакансии для Quick Apply."""
+    version = await service.get_content_version()
+
+    async def render() -> types.InlineKeyboardMarkup:
+        return await create_vacancy_selection_keyboard(await service.get_latest_vacancies(limit=10))
+
+    return await render_cache.get_or_load(("vacancy_selection",) + version, render)
+
+
+# --- Хендлеры команд и Callback'ов (Приветственный Гид) ---
+
+async def send_welcome_message(message: Message, service: ContentService):
+    """Отправляет полное приветственное сообщение (использует Markdown V2)."""
+    final_text, keyboard = await get_rendered_welcome(service)
 
     await message.answer(
         final_text,
@@ -126,21 +169,12 @@ async def handle_start_and_help(message: Message, session: AsyncSession, state:
 async def handle_show_vacancies(callback: CallbackQuery, session: AsyncSession):
     await callback.answer("Загружаю вакансии...")
     service = get_content_service(session)
-    vacancies = await service.get_latest_vacancies(limit=10)
-
-    text = service.format_vacancies_text(vacancies)
-
-    builder = InlineKeyboardBuilder()
-    if vacancies:
-        builder.button(text="✈️ Откликнуться на вакансию", callback_data="init_apply")
-
-    builder.button(text="↩️ В главное меню", callback_data="start_menu")
-    builder.adjust(1)
+    text, keyboard = await get_rendered_vacancies(service)
 
     await callback.message.edit_text(
         text,
-        reply_markup=builder.as_markup(),
-        parse_mode=ParseMode.MARKDOWN,  # Оставляем Markdown V1 здесь для совместимости с format_vacancies_text
+        reply_markup=keyboard,
+        parse_mode=ParseMode.MARKDOWN_V2,
         disable_web_page_preview=True
     )
 
@@ -157,8 +191,8 @@ async def handle_show_links(callback: CallbackQuery, session: AsyncSession):
     builder = InlineKeyboardBuilder()
 
     for item in links:
-        # Экранируем title в кнопке
-        builder.button(text=escape_markdown_v2(item['title']), url=item['url'])
+        # Текст кнопки не размечается — экранировать не нужно
+        builder.button(text=item['title'], url=item['url'])
 
     builder.button(text="↩️ В главное меню", callback_data="start_menu")
     builder.adjust(1)
@@ -182,18 +216,21 @@ async def handle_back_to_menu(callback: CallbackQuery, session: AsyncSession, st
 @user_router.message(F.new_chat_members)
 async def handle_new_member_in_chat(message: Message, session: AsyncSession):
     """Отправляет приветственное сообщение в ЛС новому участнику (использует Markdown V2)."""
-    service = get_content_service(session)
     for member in message.new_chat_members:
         if member.is_bot: continue
 
-        try:
-            await message.bot.send_message(
+        # Отправка идет через общую очередь с лимитами Telegram: при наплыве участников
+        # приветствия растягиваются во времени, а не теряются на TelegramRetryAfter.
+        # Ошибки доставки логирует и считает сама очередь.
+        send_queue.submit(
+            message.bot,
+            SendMessage(
                 chat_id=member.id,
-                text="👋 *Добро пожаловать в канал*\\n\\nНажмите /start, чтобы увидеть актуальные вакансии и полезные ссылки\\.",
+                text="👋 *Добро пожаловать в канал*\n\nНажмите /start, чтобы увидеть актуальные вакансии и полезные ссылки\\.",
                 parse_mode=ParseMode.MARKDOWN_V2  # <--- ИСПРАВЛЕНИЕ
-            )
-        except Exception as e:
-            logging.error(f"Не удалось отправить приветствие пользователю {member.id}: {e}")
+            ),
+            priority=Priority.WELCOME
+        )
 
 
 # --- Хендлеры Quick Apply ---
@@ -231,10 +268,10 @@ async def start_telegram_apply(callback: CallbackQuery, session: AsyncSession, s
         await state.clear()
         return
 
-    keyboard = await create_vacancy_selection_keyboard(vacancies)
+    keyboard = await get_rendered_vacancy_selection(content_service)
 
     await state.set_state(QuickApply.choosing_vacancy)
-    await state.update_data(vacancies_cache={v.post_id: v.vacancy_title for v in vacancies})
+    await state.update_data(vacancies_cache={str(v.post_id): v.vacancy_title for v in vacancies})
 
     await callback.message.edit_text(
         "*💼 Шаг 1/7:* Выберите вакансию, на которую хотите откликнуться:",
@@ -250,7 +287,7 @@ async def process_vacancy_choice(callback: CallbackQuery, state: FSMContext, ses
     vacancy_post_id = int(callback.data.split("_")[1])
     data = await state.get_data()
 
-    vacancy_title = data['vacancies_cache'].get(vacancy_post_id, "Неизвестная вакансия")
+    vacancy_title = data['vacancies_cache'].get(str(vacancy_post_id), "Неизвестная вакансия")
 
     # 1. Создаем запись отклика в БД для сохранения FSM-контекста
     app_service = get_application_service(session)
@@ -258,7 +295,8 @@ async def process_vacancy_choice(callback: CallbackQuery, state: FSMContext, ses
         candidate_tg_id=callback.from_user.id,
         vacancy_id=vacancy_post_id,
         vacancy_title=vacancy_title,
-        temp_data=data  # Сохраняем текущий контекст
+        # Начальный черновик; служебный vacancies_cache в БД не нужен
+        temp_data={"vacancy_id": vacancy_post_id, "vacancy_title": vacancy_title}
     )
 
     # 2. Сохраняем ID отклика и название вакансии в FSM
@@ -271,8 +309,7 @@ async def process_vacancy_choice(callback: CallbackQuery, state: FSMContext, ses
     # 3. Переход к следующему состоянию
     await state.set_state(QuickApply.waiting_fio)
     await callback.message.edit_text(
-        f"✅ Вы выбрали: *{escape_markdown_v2(vacancy_title)}*\\n\\n"
-        f"*👤 Шаг 2/7:* Введите Ваши *полные ФИО*:",
+        VACANCY_SELECTED.render(vacancy_title=vacancy_title),
         parse_mode=ParseMode.MARKDOWN_V2  # <--- ИСПРАВЛЕНИЕ
     )
 
@@ -286,12 +323,7 @@ async def process_fio(message: Message, state: FSMContext, session: AsyncSession
                              parse_mode=ParseMode.MARKDOWN_V2)  # <--- ИСПРАВЛЕНИЕ
         return
 
-    await state.update_data(full_name=fio)
-
-    # Обновление временных данных в БД
-    data = await state.get_data()
-    app_service = get_application_service(session)
-    await app_service.update_temp_data(data['application_id'], data)
+    await save_step(state, full_name=fio)
 
     # Клавиатура для быстрого ввода номера
     reply_keyboard = ReplyKeyboardMarkup(
@@ -321,12 +353,7 @@ async def process_contact(message: Message, state: FSMContext, session: AsyncSes
                              parse_mode=ParseMode.MARKDOWN_V2)  # <--- ИСПРАВЛЕНИЕ
         return
 
-    await state.update_data(phone=phone)
-
-    # Обновление временных данных в БД
-    data = await state.get_data()
-    app_service = get_application_service(session)
-    await app_service.update_temp_data(data['application_id'], data)
+    await save_step(state, phone=phone)
 
     await state.set_state(QuickApply.waiting_email)
     await message.answer(
@@ -350,13 +377,8 @@ async def process_email(message: Message, state: FSMContext, session: AsyncSessi
                              parse_mode=ParseMode.MARKDOWN_V2)  # <--- ИСПРАВЛЕНИЕ
         return
 
-    await state.update_data(email=email,
-                            telegram_username=f"@{message.from_user.username}" if message.from_user.username else "Нет")
-
-    # Обновление временных данных в БД
-    data = await state.get_data()
-    app_service = get_application_service(session)
-    await app_service.update_temp_data(data['application_id'], data)
+    telegram_username = f"@{message.from_user.username}" if message.from_user.username else "Нет"
+    await save_step(state, email=email, telegram_username=telegram_username)
 
     # Клавиатура выбора уровня
     builder = InlineKeyboardBuilder()
@@ -378,12 +400,7 @@ async def process_level(callback: CallbackQuery, state: FSMContext, session: Asy
     """Обработка уровня -> Запрос скиллов."""
     await callback.answer()
     level = callback.data.split("_")[1]
-    await state.update_data(level=level)
-
-    # Обновление временных данных в БД
-    data = await state.get_data()
-    app_service = get_application_service(session)
-    await app_service.update_temp_data(data['application_id'], data)
+    await save_step(state, level=level)
 
     await state.set_state(QuickApply.waiting_skills)
     await callback.message.edit_text(
@@ -403,12 +420,7 @@ async def process_skills(message: Message, state: FSMContext, session: AsyncSess
                              parse_mode=ParseMode.MARKDOWN_V2)
         return
 
-    await state.update_data(skills=skills)
-
-    # Обновление временных данных в БД
-    data = await state.get_data()
-    app_service = get_application_service(session)
-    await app_service.update_temp_data(data['application_id'], data)
+    await save_step(state, skills=skills)
 
     await state.set_state(QuickApply.waiting_experience)
     await message.answer(
@@ -427,12 +439,7 @@ async def process_experience(message: Message, state: FSMContext, session: Async
                              parse_mode=ParseMode.MARKDOWN_V2)
         return
 
-    await state.update_data(experience=experience)
-
-    # Обновление временных данных в БД
-    data = await state.get_data()
-    app_service = get_application_service(session)
-    await app_service.update_temp_data(data['application_id'], data)
+    await save_step(state, experience=experience)
 
     # Клавиатура для пропуска резюме
     builder = InlineKeyboardBuilder()
@@ -453,13 +460,13 @@ async def process_experience(message: Message, state: FSMContext, session: Async
 @user_router.message(QuickApply.waiting_resume,
                      F.content_type.in_({types.ContentType.DOCUMENT, types.ContentType.TEXT}))
 @user_router.callback_query(QuickApply.waiting_resume, F.data == "skip_resume")
-async def finalize_apply(update: types.Union[Message, CallbackQuery], state: FSMContext, session: AsyncSession):
+async def finalize_apply(update: Message | CallbackQuery, state: FSMContext, session: AsyncSession):
     is_message = isinstance(update, Message)
 
     # 1. Получение данных резюме
     if is_message:
         if update.document and update.document.file_name.lower().endswith(('.pdf', '.doc', '.docx')):
-            # Резюме в виде файла. Мы не загружаем его, а сохраняем file_id или ссылку
+            # Резюме в виде файла: сам файл скачивается в хранилище в фоне после сохранения анкеты
             resume_data = {"type": "file_id", "value": update.document.file_id}
             resume_link = f"File ID: {update.document.file_id}"
         elif update.text and (update.text.lower().startswith('http') or update.text.lower().startswith('www')):
@@ -498,65 +505,41 @@ async def finalize_apply(update: types.Union[Message, CallbackQuery], state: FSM
     vacancy_post_id = state_data['vacancy_id']
     vacancy_title = state_data['vacancy_title']
 
-    # 3. Финализация и отправка в API
+    # 3. Сохранение отклика; отправка в API идет в фоне через outbox, кандидат ее не ждет
     app_service = get_application_service(session)
-    success, result_message = await app_service.finalize_and_send_application(application_id, final_data)
-
-    # 4. Коммуникация с кандидатом (ФИНАЛЬНЫЙ ОТВЕТ)
-    if success:
-        # Пытаемся получить рекрутера по направлению (берем первое слово из skills)
-        vacancy_result = await session.execute(
-            select(CachedVacancy).filter_by(post_id=vacancy_post_id)
-        )
-        vacancy = vacancy_result.scalar_one_or_none()
-        if vacancy and vacancy.direction:
-            direction = vacancy.direction.lower()
-        else:
-            logging.error(f"Vacancy ID {vacancy_post_id} not found in cache. Defaulting direction.")
-            direction = 'default'
-        recruiter = await app_service.get_recruiter_by_direction(direction)
-
-        recruiter_contact = recruiter.recruiter_username if recruiter and recruiter.recruiter_username else "default_recruiter"
-
-        final_response = (
-            f"🎉 *Ваш отклик успешно принят*\n"
-            f"*🎯 Вакансия:* {escape_markdown_v2(vacancy_title)}\n"
-            f"*📞 Для быстрой связи напишите Вашему рекрутеру:*\n"
-            f"👉 @{escape_markdown_v2(recruiter_contact)}\n"
-            f"Укажите, что Вы по поводу вакансии \\[*{escape_markdown_v2(vacancy_title)}*\\]\\."
+    application = await app_service.finalize_application(application_id, final_data)
+    if application is None:
+        logging.error(f"Application {application_id} not found on submit (vacancy {vacancy_post_id}).")
+        await update.bot.send_message(
+            chat_id=update.from_user.id,
+            text="⚠️ Черновик отклика не найден. Начните заново: /start",
+            parse_mode=None
         )
+        await state.clear()
+        return
 
-        # --- БЛОК ОТПРАВКИ УВЕДОМЛЕНИЯ В QC-ЧАТ ---
-        # 1. Загружаем объект Application для полного доступа к данным
-        application = await session.get(Application, application_id)
-
-        # 2. Форматируем и отправляем сообщение
-        if application:
-            recruiter_bot_instance = Bot(token=settings.RECRUITER_BOT_TOKEN)
-
-            qc_message = format_application_message(application)
-            qc_keyboard = create_recruiter_keyboard(application_id)
-
-            try:
-                await recruiter_bot_instance.send_message(
-                    chat_id=settings.QC_CHAT_ID,
-                    text=qc_message,
-                    reply_markup=qc_keyboard,
-                    parse_mode=ParseMode.MARKDOWN_V2
-                )
-                await recruiter_bot_instance.session.close()  # Закрыть сессию
-            except Exception as e:
-                logging.error(f"Failed to send QC notification for app {application_id}: {e}")
-        # ---------------------------------------------
+    # 4. Коммуникация с кандидатом (ФИНАЛЬНЫЙ ОТВЕТ)
+    if is_message and update.document:
+        # Задача скачивания — в той же транзакции, кандидат ответа не ждет
+        resume_pipeline.schedule(session, application_id, update.document)
 
+    # Направление записано при создании отклика
+    if application.direction:
+        direction = application.direction
     else:
-        # Если API не сработало, показываем пользователю ошибку (или мягкое сообщение)
-        logging.error(f"API send failed for app {application_id}: {result_message}")
-        final_response = (
-            "⚠️ *Ошибка отправки\\.*\\n\\n"
-            "Ваш отклик сохранен, но произошел сбой при передаче данных в рекрутинговую систему\\.\\n"
-            "Мы свяжемся с Вами по почте или телефону\\. Приносим извинения\\."
-        )
+        logging.error(f"Vacancy ID {vacancy_post_id} not found in cache. Defaulting direction.")
+        direction = 'default'
+    recruiter = await app_service.get_recruiter_by_direction(direction)
+
+    recruiter_contact = recruiter.recruiter_username if recruiter and recruiter.recruiter_username else "default_recruiter"
+
+    final_response = APPLICATION_ACCEPTED.render(vacancy_title=vacancy_title, recruiter=recruiter_contact)
+
+    # --- БЛОК ОТПРАВКИ УВЕДОМЛЕНИЯ В QC-ЧАТ ---
+    # Задача уведомления пишется в той же транзакции, что и анкета; карточку отправит
+    # планировщик от имени рекрутерского бота (с повторами, переживает рестарт)
+    qc_notifier.schedule(session, application_id)
+    # ---------------------------------------------
 
     await update.bot.send_message(
         chat_id=update.from_user.id,
@@ -1,52 +1,186 @@
 # bot_welcome/main.py
 import asyncio
 import logging
+from typing import Optional
 
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
 
 
 from bot_welcome.handlers.user import user_router
 from bot_welcome.handlers.admin import admin_router
 from bot_welcome.middlewares.db_middleware import DBSessionMiddleware
+from bot_welcome.middlewares.metrics_middleware import MetricsMiddleware, TelegramTimingMiddleware
+from core.cache_bus import invalidation_bus
 from core.config import settings
-from core.db import init_db, AsyncSessionLocal
+from core.fsm_storage import create_fsm_storage
+from core.send_queue import send_queue
+from core.recruiting_api import recruiting_api
+from core.metrics import start_metrics_server
+from core.webhook import register_webhook, serve_webhook, run_webhook_workers
+from core.sharding import ShardedFrontend, consume_shard
+from bot_welcome.services.outbox_dispatcher import outbox_dispatcher
+from bot_welcome.services.draft_buffer import draft_buffer
+from bot_welcome.services.qc_notifier import qc_notifier
+from bot_welcome.services.job_scheduler import job_scheduler
+from bot_welcome.services.reminders import register_reminders
+from bot_welcome.services.resume_pipeline import register_resume_pipeline
+from bot_welcome.services.resume_analysis import resume_analyzer
+from core.db import engine, AsyncSessionLocal
+from core.migrations import check_schema
 from core.init_data import insert_initial_data
+from bot_welcome.services.recruiter_routing import recruiter_routing
 
 logging.basicConfig(level=logging.INFO)
 
+WEBHOOK_PATH = "/webhook/welcome"
 
-async def main():
-    # 1. Инициализация БД
-    await init_db()
 
-    async with AsyncSessionLocal() as session:
-        await insert_initial_data(session)
-
-    # 2. Инициализация Бота и Диспетчера
+def create_bot() -> Bot:
     bot = Bot(
         token=settings.CANDIDATE_BOT_TOKEN,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-    dp = Dispatcher(storage=MemoryStorage())
+    bot.session.middleware(TelegramTimingMiddleware())
+    return bot
+
 
-    # 3. Регистрация Мидлвара (Dependency Injection)
+def create_dispatcher() -> Dispatcher:
+    dp = Dispatcher(storage=create_fsm_storage())
+
+    # Метрики хендлеров (самый внешний мидлвар, чтобы учитывать и работу с сессией БД)
+    MetricsMiddleware("welcome").setup(dp)
+
+    # Регистрация Мидлвара (Dependency Injection)
     # Мидлвар будет создавать сессию и передавать её в хендлеры как аргумент 'session'
     db_middleware = DBSessionMiddleware(session_pool=AsyncSessionLocal)
     dp.update.outer_middleware(db_middleware)
 
-    # 4. Регистрация роутеров
+    # Регистрация роутеров
     dp.include_router(admin_router)
     dp.include_router(user_router)
+    return dp
+
+
+async def prepare():
+    """Однократная подготовка БД перед запуском (в режиме webhook — до старта воркеров)."""
+    # Схему меняют только миграции (python -m core.migrations); здесь лишь проверка версии
+    await check_schema(engine)
+
+    async with AsyncSessionLocal() as session:
+        await insert_initial_data(session)
+
+    # Соединения пула привязаны к текущему event loop; воркеры откроют свои
+    await engine.dispose()
+
+
+async def main(set_webhook: bool = True, shard_queue=None, worker_index: Optional[int] = None):
+    # 1. Маршрутизация откликов по рекрутерам держится в памяти процесса
+    async with AsyncSessionLocal() as session:
+        await recruiter_routing.load(session)
 
-    # 5. Запуск бота
-    logging.info("Starting User Bot ...")
-    await dp.start_polling(bot)
+    # 2. Инициализация Бота и Диспетчера (с мидлварами и роутерами)
+    bot = create_bot()
+    dp = create_dispatcher()
+
+    # 3. Слушатель межпроцессной инвалидации кэшей
+    await invalidation_bus.start()
+    # Общая очередь исходящих сообщений с лимитами Telegram (делятся между шардами или webhook-воркерами)
+    if shard_queue is not None:
+        sending_processes = settings.SHARD_WORKERS
+    elif worker_index is not None:
+        sending_processes = settings.WEBHOOK_WORKERS
+    else:
+        sending_processes = 1
+    await send_queue.start(processes=sending_processes)
+    # Фоновая доставка откликов и статусов во внешнее API
+    await outbox_dispatcher.start()
+    # Эндпоинт /metrics (у каждого воркера свой порт)
+    metrics_port = settings.METRICS_PORT
+    if metrics_port and worker_index is not None:
+        metrics_port += worker_index + 1
+    metrics_runner = await start_metrics_server(settings.METRICS_HOST, metrics_port)
+    # Пакетная запись черновиков анкет
+    await draft_buffer.start()
+    # Уведомления о новых откликах в QC-чат
+    await qc_notifier.start()
+    # Отложенные задачи: напоминания кандидату, уведомления о просрочке, скачивание резюме
+    register_reminders(bot)
+    register_resume_pipeline(bot)
+    resume_analyzer.start()
+    await job_scheduler.start()
+
+    # 4. Запуск бота
+    logging.info(f"Starting User Bot ({settings.BOT_MODE}) ...")
+    try:
+        if shard_queue is not None:
+            # Воркер шарда: апдейты приходят от фронтенда (run_sharded)
+            await consume_shard(bot, dp, shard_queue, settings.SHARD_CONCURRENCY)
+        elif settings.BOT_MODE == "webhook":
+            # Webhook регистрирует только один процесс
+            if set_webhook:
+                await register_webhook(bot, dp, WEBHOOK_PATH)
+            await serve_webhook(bot, dp, WEBHOOK_PATH, settings.WEBHOOK_PORT,
+                                reuse_port=settings.WEBHOOK_WORKERS > 1)
+        else:
+            # Webhook, оставшийся от запуска в режиме webhook, блокирует getUpdates
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
+    finally:
+        await job_scheduler.stop()
+        resume_analyzer.shutdown()
+        await draft_buffer.stop()
+        await qc_notifier.stop()
+        await outbox_dispatcher.stop()
+        await send_queue.stop()
+        await invalidation_bus.stop()
+        await recruiting_api.close()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+
+
+async def run_sharded():
+    """Фронтенд: принимает апдейты и раскладывает их по SHARD_WORKERS процессам по from_user.id."""
+    frontend = ShardedFrontend(run_shard, settings.SHARD_WORKERS)
+    frontend.start()
+
+    bot = create_bot()
+    dp = create_dispatcher()  # только для списка используемых типов апдейтов
+    logging.info(f"Starting User Bot frontend ({settings.BOT_MODE}, {settings.SHARD_WORKERS} shards) ...")
+    try:
+        if settings.BOT_MODE == "webhook":
+            await register_webhook(bot, dp, WEBHOOK_PATH)
+            await frontend.serve_webhook(WEBHOOK_PATH, settings.WEBHOOK_PORT)
+        else:
+            await bot.delete_webhook()
+            await frontend.poll(bot, dp.resolve_used_update_types())
+    finally:
+        await frontend.stop()
+        await bot.session.close()
+
+
+def run_shard(index: int, shard_queue):
+    try:
+        asyncio.run(main(shard_queue=shard_queue, worker_index=index))
+    except KeyboardInterrupt:
+        logging.info(f"Shard {index} stopped by KeyboardInterrupt.")
+
+
+def run_worker(index: int):
+    try:
+        asyncio.run(main(set_webhook=index == 0, worker_index=index))
+    except KeyboardInterrupt:
+        logging.info("Webhook worker stopped by KeyboardInterrupt.")
 
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        asyncio.run(prepare())
+        if settings.SHARD_WORKERS > 1:
+            asyncio.run(run_sharded())
+        elif settings.BOT_MODE == "webhook" and settings.WEBHOOK_WORKERS > 1:
+            run_webhook_workers(run_worker, settings.WEBHOOK_WORKERS)
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
-        logging.info("Bot stopped by KeyboardInterrupt.")
\ No newline at end of file
+        logging.info("Bot stopped by KeyboardInterrupt.")
@@ -1,9 +1,58 @@
 # bot_welcome/middlewares/db_middleware.py
-from typing import Callable, Awaitable, Any, Dict
+from typing import Callable, Awaitable, Any, Dict, Optional
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
 from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 
+
+class LazySession:
+    """
+    Прокси AsyncSession для хендлера (единица работы апдейта): сама сессия создается при первом обращении,
+    а release() фиксирует накопленные изменения одним COMMIT и возвращает соединение в пул.
+    release() вызывает DBSessionMiddleware после хендлера; хендлер может вызвать его и сам — в явной точке,
+    когда работа с БД закончена, а впереди долгие запросы к Telegram. После release() сессией можно пользоваться дальше.
+    """
+
+    def __init__(self, session_pool: async_sessionmaker):
+        self._session_pool = session_pool
+        self._session: Optional[AsyncSession] = None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._session_pool()
+        return self._session
+
+    @property
+    def holds_connection(self) -> bool:
+        """Сессия создана и держит соединение (открыта транзакция)."""
+        return self._session is not None and self._session.in_transaction()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+    async def release(self) -> bool:
+        """
+        Фиксирует текущую транзакцию (с flush несохраненных объектов) и отдает соединение в пул.
+        Транзакцию, сломанную ошибкой в запросе, откатывает. Возвращает False, если фиксировать было нечего.
+        """
+        session = self._session
+        if session is None or not (session.in_transaction() or session.new or session.dirty or session.deleted):
+            return False
+        transaction = session.get_transaction()
+        if transaction is not None and not transaction.is_active:
+            await session.rollback()
+        else:
+            # commit, а не rollback и для чтения: при expire_on_commit=False загруженные объекты остаются пригодными
+            await session.commit()
+        return True
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
 class DBSessionMiddleware(BaseMiddleware):
     def __init__(self, session_pool: async_sessionmaker):
         super().__init__()
@@ -15,10 +64,16 @@ class DBSessionMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any],
     ) -> Any:
-        # 1. Создаем сессию
-        async with self.session_pool() as session:
+        # 1. Создаем ленивую сессию: соединение берется из пула только при первом запросе
+        session = LazySession(self.session_pool)
+        try:
             # 2. Инжектируем сессию в контекст данных (data)
             data["session"] = session
             # 3. Вызываем следующий хендлер/мидлвар
-            return await handler(event, data)
-        # Сессия автоматически закрывается при выходе из with-блока
\ No newline at end of file
+            result = await handler(event, data)
+            # 4. Один COMMIT на апдейт: сервисы только делают flush
+            await session.release()
+            return result
+        finally:
+            # Сессия закрывается сразу после хендлера (при ошибке незафиксированное откатывается)
+            await session.close()
@@ -0,0 +1,110 @@
+# bot_welcome/middlewares/metrics_middleware.py
+import logging
+import time
+from typing import Callable, Awaitable, Any, Dict
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.methods import GetUpdates, Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject
+
+from core import metrics
+from core.config import settings
+
+logger = logging.getLogger("db.queries")
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Внешний мидлвар апдейтов: латентность и результат по хендлерам, число апдейтов в обработке
+    и раскладка времени хендлера по БД / рекрутинговому API / Telegram.
+    """
+
+    def __init__(self, bot_name: str):
+        super().__init__()
+        self.bot_name = bot_name
+
+    def setup(self, dp: Dispatcher):
+        """Регистрирует мидлвар на апдейтах и определитель имени хендлера на всех типах событий."""
+        dp.update.outer_middleware(self)
+        for name, observer in dp.observers.items():
+            if name not in ("update", "error"):
+                observer.middleware(HandlerNameMiddleware())
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        context, token = metrics.start_update(getattr(event, "update_id", None))
+        metrics.UPDATES_IN_FLIGHT.inc(self.bot_name)
+        started = time.perf_counter()
+        result = "error"
+        try:
+            response = await handler(event, data)
+            result = "unhandled" if response is UNHANDLED else "ok"
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.UPDATES_IN_FLIGHT.dec(self.bot_name)
+            metrics.HANDLER_DURATION.observe(self.bot_name, context.handler, value=elapsed)
+            metrics.HANDLER_RESULTS.inc(self.bot_name, context.handler, result)
+            for dependency, seconds in context.timings.items():
+                metrics.HANDLER_TIME_SPLIT.inc(self.bot_name, context.handler, dependency, amount=seconds)
+            self.check_queries(context)
+            metrics.finish_update(token)
+
+    def check_queries(self, context: metrics.UpdateContext):
+        """Число SQL-запросов апдейта и предупреждения о слишком большом числе / повторах (N+1)."""
+        total = sum(context.queries.values())
+        metrics.UPDATE_DB_QUERIES.observe(self.bot_name, context.handler, value=total)
+        metrics.UPDATE_DB_TIME.observe(self.bot_name, context.handler, value=context.timings.get(metrics.DB, 0.0))
+
+        origin = f"Update {context.update_id} ({self.bot_name}:{context.handler})"
+        if total > settings.DB_MAX_QUERIES_PER_UPDATE:
+            logger.warning(
+                f"{origin} issued {total} SQL statements in {context.timings.get(metrics.DB, 0.0) * 1000:.0f} ms."
+            )
+        for statement, count in context.queries.items():
+            if count > settings.DB_REPEATED_QUERY_LIMIT:
+                logger.warning(f"{origin}: possible N+1, statement repeated {count} times: {statement}")
+
+
+class HandlerNameMiddleware(BaseMiddleware):
+    """Внутренний мидлвар: сообщает внешнему, какой хендлер выбран для апдейта."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        context = metrics.current_update()
+        if context is not None:
+            context.handler = data["handler"].callback.__name__
+        return await handler(event, data)
+
+
+class TelegramTimingMiddleware(BaseRequestMiddleware):
+    """Мидлвар HTTP-сессии бота: время запросов к Bot API."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        # getUpdates — long polling, его время не показательно
+        if isinstance(method, GetUpdates):
+            return await make_request(bot, method)
+
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.TELEGRAM_REQUEST_DURATION.observe(type(method).__name__, value=elapsed)
+            metrics.record_dependency(metrics.TELEGRAM, elapsed)
@@ -1,8 +1,8 @@
 # bot_welcome/models/db_models.py
-from sqlalchemy import Column, Integer, Text, Boolean, TIMESTAMP, JSON, String, BigInteger
+from sqlalchemy import Column, Integer, Text, Boolean, TIMESTAMP, JSON, String, BigInteger, Date, SmallInteger, Float
 from datetime import datetime
 from core.db import Base
-from sqlalchemy import ForeignKey, Enum
+from sqlalchemy import ForeignKey, Enum, Index, text
 from sqlalchemy.orm import relationship
 import enum
 
@@ -13,6 +13,19 @@ class ApplicationStatus(enum.Enum):
     REJECTED = "REJECTED"
 
 
+class JobStatus(enum.Enum):
+    PENDING = "PENDING"
+    DONE = "DONE"
+    CANCELLED = "CANCELLED"
+    FAILED = "FAILED"
+
+
+class OutboxStatus(enum.Enum):
+    PENDING = "PENDING"
+    SENT = "SENT"
+    FAILED = "FAILED"  # исчерпаны попытки или API отверг запрос
+
+
 class WelcomeContent(Base):
     __tablename__ = "welcome_content"
 
@@ -29,10 +42,15 @@ class CachedVacancy(Base):
     vacancy_title = Column(Text, nullable=False)
     telegram_link = Column(Text, nullable=False)
     post_id = Column(Integer, nullable=False, unique=True)
-    direction = Column(String(50), nullable=False)
+    direction = Column(String(50), nullable=False, index=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(TIMESTAMP, default=datetime.utcnow)
 
+    # Индексы создаются миграциями (bot_welcome/models/migrations), здесь — для полноты метаданных
+    __table_args__ = (
+        Index("ix_cached_vacancies_active_post_id", "is_active", text("post_id DESC")),
+    )
+
 
 class RecruiterMapping(Base):
     __tablename__ = "recruiters_mapping"
@@ -43,11 +61,19 @@ class RecruiterMapping(Base):
     is_active = Column(Boolean, default=True)
 
 
+class SkillSynonym(Base):
+    """Словарь навыков для маршрутизации: фраза из анкеты ("spring boot") -> направление ("java")."""
+    __tablename__ = "skill_synonyms"
+
+    phrase = Column(String(100), primary_key=True)  # в нижнем регистре, пробелы схлопнуты
+    direction = Column(String(50), nullable=False)
+
+
 class Application(Base):
     __tablename__ = "applications"
 
     id = Column(Integer, primary_key=True)
-    candidate_tg_id = Column(BigInteger, nullable=False)
+    candidate_tg_id = Column(BigInteger, nullable=False, index=True)
     candidate_data = Column(JSON, nullable=True)
     vacancy_id = Column(Integer, nullable=False)
     vacancy_title = Column(Text, nullable=False)
@@ -56,9 +82,19 @@ class Application(Base):
     recruiter_id = Column(BigInteger, nullable=True)
 
     external_api_id = Column(String(100), nullable=True)
+    qc_message_id = Column(BigInteger, nullable=True)  # сообщение с карточкой отклика в QC-чате (0 — отправляется)
+    # Нормализованные теги навыков и оценка стажа в годах (из анкеты и разобранного резюме)
+    skill_tags = Column(JSON, nullable=True)
+    experience_years = Column(Float, nullable=True)
+    direction = Column(String(50), nullable=True)  # направление вакансии на момент отклика (для статистики)
     created_at = Column(TIMESTAMP, default=datetime.utcnow)
+    taken_at = Column(TIMESTAMP, nullable=True)  # когда рекрутер взял заявку в работу
     temp_fsm_data = Column(JSON, nullable=True)
 
+    __table_args__ = (
+        Index("ix_applications_status_created_at", "status", "created_at"),
+    )
+
 
 class StatusUpdate(Base):
     __tablename__ = "status_updates"
@@ -72,3 +108,104 @@ class StatusUpdate(Base):
     timestamp = Column(TIMESTAMP, default=datetime.utcnow)
 
     application = relationship("Application")
+
+    __table_args__ = (
+        Index("ix_status_updates_application_timestamp", "application_id", "timestamp"),
+    )
+
+
+class OutboxMessage(Base):
+    """Запрос к рекрутинговому API, записанный в одной транзакции с изменением отклика."""
+    __tablename__ = "api_outbox"
+
+    id = Column(Integer, primary_key=True)
+    application_id = Column(Integer, ForeignKey("applications.id"), nullable=False)
+    kind = Column(String(30), nullable=False)  # "create_application" | "update_status"
+    payload = Column(JSON, nullable=False)
+
+    status = Column(Enum(OutboxStatus), default=OutboxStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(TIMESTAMP, default=datetime.utcnow, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
+    sent_at = Column(TIMESTAMP, nullable=True)
+
+    __table_args__ = (
+        Index("ix_api_outbox_status_next_attempt", "status", "next_attempt_at"),
+        Index("ix_api_outbox_application_id", "application_id", "id"),
+    )
+
+
+class FSMRecord(Base):
+    """Состояние FSM aiogram: одна строка на (bot, chat, user[, thread, destiny])."""
+    __tablename__ = "fsm_storage"
+
+    key = Column(String(255), primary_key=True)
+    state = Column(String(255), nullable=True)
+    data = Column(JSON, nullable=False, default=dict)
+    updated_at = Column(TIMESTAMP, default=datetime.utcnow, nullable=False, index=True)
+
+
+class RecruiterDailyStats(Base):
+    """Решения рекрутера за день по направлению. Обновляется вместе со статусом заявки (без пересчета истории)."""
+    __tablename__ = "recruiter_daily_stats"
+
+    day = Column(Date, primary_key=True)
+    recruiter_id = Column(BigInteger, primary_key=True)
+    direction = Column(String(50), primary_key=True)
+    taken = Column(Integer, nullable=False, default=0)
+    invited = Column(Integer, nullable=False, default=0)
+    rejected = Column(Integer, nullable=False, default=0)
+
+
+class RecruiterLatencyStats(Base):
+    """
+    Гистограмма времени реакции рекрутера за день: kind="take" — от отклика до взятия в работу,
+    kind="decision" — от взятия до финального статуса. bucket — номер интервала из stats_service.LATENCY_BUCKETS.
+    """
+    __tablename__ = "recruiter_latency_stats"
+
+    day = Column(Date, primary_key=True)
+    recruiter_id = Column(BigInteger, primary_key=True)
+    direction = Column(String(50), primary_key=True)
+    kind = Column(String(10), primary_key=True)
+    bucket = Column(SmallInteger, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class ScheduledJob(Base):
+    """Отложенная задача (напоминание и т.п.): выполняется после due_at одним из процессов бота."""
+    __tablename__ = "scheduled_jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(30), nullable=False)
+    application_id = Column(Integer, ForeignKey("applications.id"), nullable=True)
+    payload = Column(JSON, nullable=True)
+    due_at = Column(TIMESTAMP, nullable=False)
+    status = Column(Enum(JobStatus), default=JobStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
+    done_at = Column(TIMESTAMP, nullable=True)
+
+    # Частичные индексы: в них только ожидающие задачи, выполненные не мешают выборке
+    __table_args__ = (
+        Index("ix_scheduled_jobs_due_at", "due_at", postgresql_where=text("status = 'PENDING'")),
+        Index("ix_scheduled_jobs_application_id", "application_id", postgresql_where=text("status = 'PENDING'")),
+    )
+
+
+class ResumeFile(Base):
+    """
+    Скачанный файл резюме: file_unique_id Telegram -> ключ в хранилище.
+    Повторно присланный файл находится по file_unique_id без скачивания; разные файлы
+    с одинаковым содержимым (sha256) указывают на один объект хранилища.
+    """
+    __tablename__ = "resume_files"
+
+    file_unique_id = Column(String(64), primary_key=True)
+    sha256 = Column(String(64), nullable=False, index=True)
+    storage_key = Column(String(255), nullable=False)
+    size = Column(Integer, nullable=False)
+    analysis = Column(JSON, nullable=True)  # результат разбора: {"skills": [...], "years": ...}
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
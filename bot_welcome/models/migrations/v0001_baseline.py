@@ -0,0 +1,106 @@
+# bot_welcome/models/migrations/v0001_baseline.py
+"""
+Схема на момент перехода с create_all на миграции. Все операции идемпотентны:
+базы, созданные раньше через init_db(), доводятся до этой версии без потери данных.
+"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+STATEMENTS = [
+    """
+    DO $$ BEGIN
+        CREATE TYPE applicationstatus AS ENUM ('NEW', 'IN_PROGRESS', 'INVITED', 'REJECTED');
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$
+    """,
+    """
+    DO $$ BEGIN
+        CREATE TYPE outboxstatus AS ENUM ('PENDING', 'SENT', 'FAILED');
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS welcome_content (
+        id SERIAL PRIMARY KEY,
+        welcome_text TEXT NOT NULL,
+        links_json JSON NOT NULL,
+        last_updated TIMESTAMP WITHOUT TIME ZONE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS cached_vacancies (
+        id SERIAL PRIMARY KEY,
+        vacancy_title TEXT NOT NULL,
+        telegram_link TEXT NOT NULL,
+        post_id INTEGER NOT NULL UNIQUE,
+        direction VARCHAR(50) NOT NULL,
+        is_active BOOLEAN,
+        created_at TIMESTAMP WITHOUT TIME ZONE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS recruiters_mapping (
+        direction VARCHAR(50) PRIMARY KEY,
+        recruiter_tg_id BIGINT NOT NULL,
+        recruiter_username VARCHAR(50),
+        is_active BOOLEAN
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS applications (
+        id SERIAL PRIMARY KEY,
+        candidate_tg_id BIGINT NOT NULL,
+        candidate_data JSON,
+        vacancy_id INTEGER NOT NULL,
+        vacancy_title TEXT NOT NULL,
+        status applicationstatus NOT NULL,
+        recruiter_id BIGINT,
+        external_api_id VARCHAR(100),
+        qc_message_id BIGINT,
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        temp_fsm_data JSON
+    )
+    """,
+    # Колонка появилась позже таблицы: в базах от init_db() ее может не быть
+    "ALTER TABLE applications ADD COLUMN IF NOT EXISTS qc_message_id BIGINT",
+    """
+    CREATE TABLE IF NOT EXISTS status_updates (
+        id SERIAL PRIMARY KEY,
+        application_id INTEGER NOT NULL REFERENCES applications (id),
+        old_status applicationstatus NOT NULL,
+        new_status applicationstatus NOT NULL,
+        recruiter_id BIGINT,
+        reason TEXT,
+        timestamp TIMESTAMP WITHOUT TIME ZONE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS api_outbox (
+        id SERIAL PRIMARY KEY,
+        application_id INTEGER NOT NULL REFERENCES applications (id),
+        kind VARCHAR(30) NOT NULL,
+        payload JSON NOT NULL,
+        status outboxstatus NOT NULL,
+        attempts INTEGER NOT NULL,
+        next_attempt_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        last_error TEXT,
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        sent_at TIMESTAMP WITHOUT TIME ZONE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_api_outbox_status_next_attempt ON api_outbox (status, next_attempt_at)",
+    """
+    CREATE TABLE IF NOT EXISTS fsm_storage (
+        key VARCHAR(255) PRIMARY KEY,
+        state VARCHAR(255),
+        data JSON NOT NULL,
+        updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_fsm_storage_updated_at ON fsm_storage (updated_at)",
+]
+
+
+async def upgrade(conn: AsyncConnection):
+    for statement in STATEMENTS:
+        await conn.execute(text(statement))
@@ -0,0 +1,28 @@
+# bot_welcome/models/migrations/v0002_hot_path_indexes.py
+"""
+Индексы под частые запросы. Строятся CONCURRENTLY, чтобы не блокировать запись в рабочие таблицы,
+поэтому миграция выполняется вне транзакции.
+"""
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from core.migrations import create_index_concurrently
+
+TRANSACTIONAL = False
+
+INDEXES = [
+    # ContentService.get_latest_vacancies: WHERE is_active ORDER BY post_id DESC LIMIT n
+    ("ix_cached_vacancies_active_post_id", "cached_vacancies", "is_active, post_id DESC"),
+    # Вакансии и маршрутизация по направлению
+    ("ix_cached_vacancies_direction", "cached_vacancies", "direction"),
+    # Отклики кандидата
+    ("ix_applications_candidate_tg_id", "applications", "candidate_tg_id"),
+    # Очереди заявок по статусу и возрасту (напоминания, отчеты)
+    ("ix_applications_status_created_at", "applications", "status, created_at"),
+    # История статусов заявки
+    ("ix_status_updates_application_timestamp", "status_updates", "application_id, timestamp"),
+]
+
+
+async def upgrade(conn: AsyncConnection):
+    for name, table, columns in INDEXES:
+        await create_index_concurrently(conn, name, table, columns)
@@ -0,0 +1,97 @@
+# bot_welcome/models/migrations/v0003_recruiter_stats.py
+"""
+Дневные агрегаты для /stats и колонки заявки, из которых они считаются (direction, taken_at).
+Агрегаты однократно заполняются из истории status_updates; дальше их обновляет смена статуса.
+"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# Копия stats_service.LATENCY_BUCKETS на момент миграции
+LATENCY_BUCKETS = (60, 300, 900, 1800, 3600, 7200, 14400, 28800, 86400, 172800, 259200, 604800)
+
+BUCKET_SQL = (
+    "CASE "
+    + " ".join(f"WHEN seconds <= {bound} THEN {index}" for index, bound in enumerate(LATENCY_BUCKETS))
+    + f" ELSE {len(LATENCY_BUCKETS)} END"
+)
+
+STATEMENTS = [
+    "ALTER TABLE applications ADD COLUMN IF NOT EXISTS direction VARCHAR(50)",
+    "ALTER TABLE applications ADD COLUMN IF NOT EXISTS taken_at TIMESTAMP WITHOUT TIME ZONE",
+    """
+    UPDATE applications AS a SET direction = lower(v.direction)
+    FROM cached_vacancies AS v
+    WHERE v.post_id = a.vacancy_id AND a.direction IS NULL
+    """,
+    """
+    UPDATE applications AS a SET taken_at = t.taken_at
+    FROM (
+        SELECT application_id, min(timestamp) AS taken_at
+        FROM status_updates
+        WHERE new_status = 'IN_PROGRESS'
+        GROUP BY application_id
+    ) AS t
+    WHERE t.application_id = a.id AND a.taken_at IS NULL
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS recruiter_daily_stats (
+        day DATE NOT NULL,
+        recruiter_id BIGINT NOT NULL,
+        direction VARCHAR(50) NOT NULL,
+        taken INTEGER NOT NULL DEFAULT 0,
+        invited INTEGER NOT NULL DEFAULT 0,
+        rejected INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, recruiter_id, direction)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS recruiter_latency_stats (
+        day DATE NOT NULL,
+        recruiter_id BIGINT NOT NULL,
+        direction VARCHAR(50) NOT NULL,
+        kind VARCHAR(10) NOT NULL,
+        bucket SMALLINT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, recruiter_id, direction, kind, bucket)
+    )
+    """,
+    """
+    INSERT INTO recruiter_daily_stats (day, recruiter_id, direction, taken, invited, rejected)
+    SELECT
+        s.timestamp::date,
+        s.recruiter_id,
+        coalesce(a.direction, 'default'),
+        count(*) FILTER (WHERE s.new_status = 'IN_PROGRESS'),
+        count(*) FILTER (WHERE s.new_status = 'INVITED'),
+        count(*) FILTER (WHERE s.new_status = 'REJECTED')
+    FROM status_updates AS s
+    JOIN applications AS a ON a.id = s.application_id
+    WHERE s.recruiter_id IS NOT NULL AND s.timestamp IS NOT NULL
+    GROUP BY 1, 2, 3
+    ON CONFLICT DO NOTHING
+    """,
+    f"""
+    INSERT INTO recruiter_latency_stats (day, recruiter_id, direction, kind, bucket, count)
+    SELECT day, recruiter_id, direction, kind, {BUCKET_SQL}, count(*)
+    FROM (
+        SELECT
+            s.timestamp::date AS day,
+            s.recruiter_id,
+            coalesce(a.direction, 'default') AS direction,
+            CASE WHEN s.new_status = 'IN_PROGRESS' THEN 'take' ELSE 'decision' END AS kind,
+            extract(epoch FROM s.timestamp - CASE WHEN s.new_status = 'IN_PROGRESS' THEN a.created_at ELSE a.taken_at END)
+                AS seconds
+        FROM status_updates AS s
+        JOIN applications AS a ON a.id = s.application_id
+        WHERE s.recruiter_id IS NOT NULL AND s.timestamp IS NOT NULL
+    ) AS timed
+    WHERE seconds IS NOT NULL
+    GROUP BY day, recruiter_id, direction, kind, 5
+    ON CONFLICT DO NOTHING
+    """,
+]
+
+
+async def upgrade(conn: AsyncConnection):
+    for statement in STATEMENTS:
+        await conn.execute(text(statement))
@@ -0,0 +1,38 @@
+# bot_welcome/models/migrations/v0004_scheduled_jobs.py
+"""Таблица отложенных задач (напоминания по откликам) с частичными индексами по ожидающим задачам."""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+STATEMENTS = [
+    """
+    DO $$ BEGIN
+        CREATE TYPE jobstatus AS ENUM ('PENDING', 'DONE', 'CANCELLED', 'FAILED');
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS scheduled_jobs (
+        id SERIAL PRIMARY KEY,
+        kind VARCHAR(30) NOT NULL,
+        application_id INTEGER REFERENCES applications (id),
+        payload JSON,
+        due_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        status jobstatus NOT NULL,
+        attempts INTEGER NOT NULL,
+        last_error TEXT,
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        done_at TIMESTAMP WITHOUT TIME ZONE
+    )
+    """,
+    # Таблица новая и пустая — индексы можно строить в транзакции
+    "CREATE INDEX IF NOT EXISTS ix_scheduled_jobs_due_at ON scheduled_jobs (due_at) WHERE status = 'PENDING'",
+    """
+    CREATE INDEX IF NOT EXISTS ix_scheduled_jobs_application_id ON scheduled_jobs (application_id)
+    WHERE status = 'PENDING'
+    """,
+]
+
+
+async def upgrade(conn: AsyncConnection):
+    for statement in STATEMENTS:
+        await conn.execute(text(statement))
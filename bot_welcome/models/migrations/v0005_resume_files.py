@@ -0,0 +1,23 @@
+# bot_welcome/models/migrations/v0005_resume_files.py
+"""Таблица скачанных резюме (file_unique_id -> объект хранилища по SHA-256)."""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS resume_files (
+        file_unique_id VARCHAR(64) PRIMARY KEY,
+        sha256 VARCHAR(64) NOT NULL,
+        storage_key VARCHAR(255) NOT NULL,
+        size INTEGER NOT NULL,
+        created_at TIMESTAMP WITHOUT TIME ZONE
+    )
+    """,
+    # Таблица новая и пустая — индекс можно строить в транзакции
+    "CREATE INDEX IF NOT EXISTS ix_resume_files_sha256 ON resume_files (sha256)",
+]
+
+
+async def upgrade(conn: AsyncConnection):
+    for statement in STATEMENTS:
+        await conn.execute(text(statement))
@@ -0,0 +1,15 @@
+# bot_welcome/models/migrations/v0006_resume_analysis.py
+"""Теги навыков и оценка стажа заявки; результат разбора файла резюме."""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+STATEMENTS = [
+    "ALTER TABLE applications ADD COLUMN IF NOT EXISTS skill_tags JSON",
+    "ALTER TABLE applications ADD COLUMN IF NOT EXISTS experience_years DOUBLE PRECISION",
+    "ALTER TABLE resume_files ADD COLUMN IF NOT EXISTS analysis JSON",
+]
+
+
+async def upgrade(conn: AsyncConnection):
+    for statement in STATEMENTS:
+        await conn.execute(text(statement))
@@ -0,0 +1,31 @@
+# bot_welcome/models/migrations/v0007_skill_synonyms.py
+"""Словарь навыков -> направление для автоматической маршрутизации откликов (с начальным наполнением)."""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# Начальный словарь; дальше его ведут администраторы (/add_synonym, /remove_synonym)
+SEED = {
+    "python": ("python", "python3", "питон", "django", "flask", "fastapi", "aiohttp", "aiogram", "celery", "pandas", "numpy"),
+    "java": ("java", "spring", "spring boot", "hibernate", "kotlin", "maven", "gradle", "jvm"),
+    "js": ("javascript", "typescript", "react", "react.js", "vue", "vue.js", "angular", "node.js", "nodejs", "next.js", "frontend", "фронтенд"),
+    "go": ("golang", "go lang", "gin", "goroutines"),
+    "csharp": ("c#", ".net", "asp.net", "dotnet", "unity"),
+}
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS skill_synonyms (
+        phrase VARCHAR(100) PRIMARY KEY,
+        direction VARCHAR(50) NOT NULL
+    )
+    """,
+]
+
+
+async def upgrade(conn: AsyncConnection):
+    for statement in STATEMENTS:
+        await conn.execute(text(statement))
+    await conn.execute(
+        text("INSERT INTO skill_synonyms (phrase, direction) VALUES (:phrase, :direction) ON CONFLICT DO NOTHING"),
+        [{"phrase": phrase, "direction": direction} for direction, phrases in SEED.items() for phrase in phrases]
+    )
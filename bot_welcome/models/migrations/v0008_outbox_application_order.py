@@ -0,0 +1,14 @@
+# bot_welcome/models/migrations/v0008_outbox_application_order.py
+"""
+Индекс для порядка доставки outbox: диспетчер проверяет, нет ли у отклика более ранней ожидающей записи.
+Строится CONCURRENTLY, поэтому миграция выполняется вне транзакции.
+"""
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from core.migrations import create_index_concurrently
+
+TRANSACTIONAL = False
+
+
+async def upgrade(conn: AsyncConnection):
+    await create_index_concurrently(conn, "ix_api_outbox_application_id", "api_outbox", "application_id, id")
@@ -2,39 +2,75 @@ import logging
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func
-from bot_welcome.models.db_models import RecruiterMapping, Application, ApplicationStatus, StatusUpdate
-from core.config import settings
-from typing import Dict, Any, Optional
-import aiohttp
-import json
+from sqlalchemy import func, update, insert, literal, cast, BigInteger, Integer, String, Text, TIMESTAMP, JSON
+from bot_welcome.models.db_models import RecruiterMapping, Application, ApplicationStatus, StatusUpdate, OutboxMessage, OutboxStatus, CachedVacancy, SkillSynonym
+from bot_welcome.services.recruiter_routing import recruiter_routing, RecruiterRoute, normalize_direction
+from bot_welcome.services.direction_classifier import direction_classifier, normalize_phrase
+from bot_welcome.services.draft_buffer import draft_buffer
+from bot_welcome.services.stats_service import rollup_ctes
+from bot_welcome.services.job_scheduler import cancel_jobs_cte
+from bot_welcome.services.reminders import schedule_follow_ups
+from bot_welcome.services.outbox_dispatcher import outbox_dispatcher, KIND_CREATE_APPLICATION, KIND_UPDATE_STATUS
+from core.cache_bus import invalidation_bus
+from core.db import call_after_commit
+from core.resume_text import estimate_years, tag_skills
+from typing import Dict, Any, Optional, Set
+from dataclasses import dataclass
 from datetime import datetime
+import enum
+
+# Статусная модель: из какого статуса в какие разрешен переход (NEW → IN_PROGRESS → INVITED/REJECTED)
+STATUS_TRANSITIONS: Dict[ApplicationStatus, Set[ApplicationStatus]] = {
+    ApplicationStatus.NEW: {ApplicationStatus.IN_PROGRESS},
+    ApplicationStatus.IN_PROGRESS: {ApplicationStatus.INVITED, ApplicationStatus.REJECTED},
+}
+
+
+def allowed_sources(new_status: ApplicationStatus) -> list[ApplicationStatus]:
+    """Статусы, из которых разрешен переход в new_status."""
+    return [old for old, targets in STATUS_TRANSITIONS.items() if new_status in targets]
+
+
+class StatusChangeResult(enum.Enum):
+    OK = "OK"
+    NOT_FOUND = "NOT_FOUND"
+    ALREADY_TAKEN = "ALREADY_TAKEN"  # другой рекрутер успел изменить статус раньше
+    INVALID_TRANSITION = "INVALID_TRANSITION"
+
+
+@dataclass
+class StatusChange:
+    result: StatusChangeResult
+    status: Optional[ApplicationStatus] = None  # статус заявки после попытки
+    recruiter_id: Optional[int] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.result == StatusChangeResult.OK
+
 
 class ApplicationService:
+    """Сервисы только выполняют flush: транзакцию апдейта фиксирует DBSessionMiddleware."""
+
     def __init__(self, session: AsyncSession):
         self.session = session
-        self.api_url = settings.RECRUITING_API_URL
-        self.headers = {"Content-Type": "application/json"}
-
-    async def get_recruiter_by_direction(self, direction: str) -> Optional[RecruiterMapping]:
-        result = await self.session.execute(
-            select(RecruiterMapping)
-            .where(RecruiterMapping.direction == direction)
-            .where(RecruiterMapping.is_active == True)
-        )
-        return result.scalars().first()
-        if recruiter:
-            return recruiter
 
-        default_result = await self.session.execute(
-            select(RecruiterMapping)
-            .where(RecruiterMapping.direction == 'default')
-            .where(RecruiterMapping.is_active == True)
-        )
-        return default_result.scalars().first()
+    async def get_recruiter_by_direction(self, direction: str, use_default: bool = True) -> Optional[RecruiterRoute]:
+        """Рекрутер направления из таблицы маршрутизации в памяти (с фолбэком на 'default')."""
+        await recruiter_routing.ensure_loaded(self.session)
+        return recruiter_routing.resolve(direction, use_default=use_default)
+
+    async def get_recruiter_mapping(self, direction: str) -> Optional[RecruiterRoute]:
+        """Маппинг направления, в том числе отключенный (для админки)."""
+        await recruiter_routing.ensure_loaded(self.session)
+        return recruiter_routing.get(direction)
+
+    async def list_recruiters(self) -> list[RecruiterRoute]:
+        await recruiter_routing.ensure_loaded(self.session)
+        return recruiter_routing.routes()
 
     async def add_update_recruiter(self, direction:str, tg_id: int, username: str, is_active:bool = True):
-        direction = direction.lower()
+        direction = normalize_direction(direction)
         recruiter = await self.session.get(RecruiterMapping, direction)
 
         if recruiter:
@@ -50,32 +86,91 @@ class ApplicationService:
             )
             self.session.add(recruiter)
 
-        await self.session.commit()
+        await self.session.flush()
+        await invalidation_bus.notify(self.session, RecruiterMapping.__tablename__, direction)
+        return True
+
+    async def remove_recruiter(self, direction: str) -> bool:
+        """Отключает маппинг направления (запись остается для истории)."""
+        direction = normalize_direction(direction)
+        recruiter = await self.session.get(RecruiterMapping, direction)
+        if not recruiter or not recruiter.is_active:
+            return False
+
+        recruiter.is_active = False
+        await self.session.flush()
+        await invalidation_bus.notify(self.session, RecruiterMapping.__tablename__, direction)
+        return True
+
+    async def list_skill_synonyms(self) -> list[tuple[str, str]]:
+        await direction_classifier.ensure_loaded(self.session)
+        return direction_classifier.synonyms()
+
+    async def add_skill_synonym(self, phrase: str, direction: str) -> tuple[str, str]:
+        """Добавляет или переназначает фразу словаря навыков; возвращает (фраза, направление) после нормализации."""
+        phrase, direction = normalize_phrase(phrase), normalize_direction(direction)
+        synonym = await self.session.get(SkillSynonym, phrase)
+        if synonym:
+            synonym.direction = direction
+        else:
+            self.session.add(SkillSynonym(phrase=phrase, direction=direction))
+
+        await self.session.flush()
+        await invalidation_bus.notify(self.session, SkillSynonym.__tablename__, phrase)
+        return phrase, direction
+
+    async def remove_skill_synonym(self, phrase: str) -> bool:
+        synonym = await self.session.get(SkillSynonym, normalize_phrase(phrase))
+        if not synonym:
+            return False
+
+        await self.session.delete(synonym)
+        await self.session.flush()
+        await invalidation_bus.notify(self.session, SkillSynonym.__tablename__, synonym.phrase)
         return True
 
+    async def route_by_skills(self, application: Application, text: str):
+        """
+        Если у направления вакансии нет активного рекрутера (общий отклик, неверная разметка вакансии),
+        направление заявки определяется по навыкам кандидата. Обе таблицы — в памяти процесса.
+        """
+        await recruiter_routing.ensure_loaded(self.session)
+        if recruiter_routing.resolve(application.direction, use_default=False):
+            return
+
+        await direction_classifier.ensure_loaded(self.session)
+        direction = direction_classifier.classify(text)
+        if direction and recruiter_routing.resolve(direction, use_default=False):
+            logging.info(f"App {application.id}: direction '{application.direction}' -> '{direction}' by skills.")
+            application.direction = direction
+
     async def create_new_application(self, candidate_tg_id: int, vacancy_id: int, vacancy_title: str, temp_data: Dict[str, Any]) -> Application:
-        application = Application(
-            candidate_tg_id=candidate_tg_id,
-            vacancy_id=vacancy_id,
-            vacancy_title=vacancy_title,
-            status=ApplicationStatus.NEW,
-            temp_fsm_data=temp_data
+        # INSERT ... RETURNING: готовая строка (id, created_at) за один запрос вместо commit() + refresh()
+        return await self.session.scalar(
+            insert(Application)
+            .values(
+                candidate_tg_id=candidate_tg_id,
+                vacancy_id=vacancy_id,
+                vacancy_title=vacancy_title,
+                status=ApplicationStatus.NEW,
+                temp_fsm_data=temp_data,
+                # Направление фиксируется при отклике: статистика не зависит от последующих правок вакансии
+                direction=select(func.lower(CachedVacancy.direction))
+                .where(CachedVacancy.post_id == vacancy_id)
+                .scalar_subquery()
+            )
+            .returning(Application)
         )
-        self.session.add(application)
-        await self.session.commit()
-        await self.session.refresh(application)
-        return application
 
-    async def update_temp_data(self, application_id: int, temp_data: Dict[str, Any]) -> tuple[str, Any]:
-        application = await self.session.get(Application, application_id)
-        if application:
-            application.temp_fsm_data = temp_data
-            await self.session.commit()
-
-    async def finalize_and_send_application(self, application_id: int, final_data: Dict[str, Any]) -> tuple[bool, str]:
+    async def finalize_application(self, application_id: int, final_data: Dict[str, Any]) -> Optional[Application]:
+        """
+        Сохраняет анкету и ставит отправку во внешнее API в outbox (одна транзакция).
+        Саму отправку с повторами выполняет OutboxDispatcher в фоне — его будят после COMMIT,
+        поэтому ошибка API до кандидата не доходит. None — черновика с таким id нет.
+        """
         application = await self.session.get(Application, application_id)
         if not application:
-            return False, "Application not found."
+            return None
 
         payload = {
             "vacancy_id": str(application.vacancy_id), # Отправляем как строку
@@ -88,68 +183,126 @@ class ApplicationService:
             }
         }
 
-        success = False
-        external_id = None
-        error_message = ""
-
-        try:
-            async with aiohttp.ClientSession() as client_session:
-                async with client_session.post(f"{self.api_url}/api/applications", json=payload, headers=self.headers) as response:
-
-                    if response.status == 201:
-                        api_response = await response.json()
-                        external_id = api_response.get('id')
-                        success = True
-                    else:
-                        error_message = f"API Error: {response.status}: {await response.text()}"
-        except aiohttp.ClientError as e:
-            error_message = f"Network/Connection error: {e}"
-        except json.JSONDecodeError:
-            error_message = "Invalid JSON response from API."
-
-        if success:
-            application.candidate_data = final_data
-            application.external_api_id = external_id
-            application.temp_fsm_data = None
-            await self.session.commit()
-            return True, external_id
-        else:
-            application.temp_fsm_data = {"final_data": final_data, "error": error_message, "timestamp": str(datetime.utcnow())}
-            await self.session.commit()
-            return False, error_message
+        application.candidate_data = final_data
+        application.temp_fsm_data = None
+        # Теги и стаж по коротким полям анкеты считаются сразу; файл резюме дополнит их в фоне
+        info = final_data.get('professional_info') or {}
+        skills_text = f"{info.get('skills') or ''}\n{info.get('experience') or ''}"
+        application.skill_tags = tag_skills(skills_text)
+        application.experience_years = estimate_years(info.get('experience'))
+        await self.route_by_skills(application, skills_text)
+        # Неотправленные шаги черновика уже вошли в final_data; выбрасываем их только после COMMIT —
+        # при откате анкета остается черновиком, и шаги еще нужны
+        call_after_commit(self.session, lambda: draft_buffer.discard(application_id))
+        # Напоминание кандидату и уведомление о просрочке (отменяются при взятии в работу)
+        schedule_follow_ups(self.session, application_id)
+        self.session.add(OutboxMessage(
+            application_id=application_id,
+            kind=KIND_CREATE_APPLICATION,
+            payload=payload
+        ))
+        await self.session.flush()
+        call_after_commit(self.session, outbox_dispatcher.wake)
+        return application
 
-    async def update_application_status(self, application_id: int, new_status: ApplicationStatus, recruiter_tg_id: int, reason: Optional[str] = None) -> bool:
-        application = await self.session.get(Application, application_id)
-        if not application:
-            return False
+    async def update_application_status(self, application_id: int, new_status: ApplicationStatus, recruiter_tg_id: int, reason: Optional[str] = None) -> StatusChange:
+        """
+        Атомарно меняет статус по таблице STATUS_TRANSITIONS одним запросом:
+        условный UPDATE, запись в status_updates, дневные агрегаты статистики рекрутеров,
+        отмена напоминаний и outbox для внешнего API в одной транзакции.
+        Если заявку успели перевести раньше (гонка двух рекрутеров), возвращает ALREADY_TAKEN.
+        Блокировка строки держится до COMMIT, который выполняется перед первым ответом в Telegram.
+        """
+        sources = allowed_sources(new_status)
+        now = datetime.utcnow()
 
-        old_status = application.status
-        application.status = new_status
-        application.recruiter_id = recruiter_tg_id
-        await self.session.commit()
+        taken_at = {"taken_at": now} if new_status == ApplicationStatus.IN_PROGRESS else {}
 
-        status_log = StatusUpdate(
-            application_id=application_id,
-            old_status=old_status,
-            new_status=new_status,
-            recruiter_id=recruiter_tg_id,
-            reason=reason,
-            timestamp=datetime.utcnow()
+        # FOR UPDATE: конкурентный запрос дождется нашего COMMIT и перечитает уже новый статус
+        previous = (
+            select(
+                Application.id,
+                Application.status.label("old_status"),
+                Application.created_at,
+                Application.taken_at,
+                Application.direction,
+            )
+            .where(Application.id == application_id)
+            .with_for_update()
+            .cte("previous")
+        )
+        changed = (
+            update(Application)
+            .where(Application.id == previous.c.id)
+            .where(previous.c.old_status.in_(sources))
+            .values(status=new_status, recruiter_id=recruiter_tg_id, **taken_at)
+            .returning(
+                Application.id,
+                previous.c.old_status,
+                previous.c.created_at,
+                previous.c.taken_at,
+                previous.c.direction,
+            )
+            .cte("changed")
         )
-        self.session.add(status_log)
-        await self.session.commit()
+        # Дневные агрегаты для /stats обновляются тем же запросом
+        daily_stats, latency_stats = rollup_ctes(changed, new_status, recruiter_tg_id, now)
+        history = (
+            insert(StatusUpdate)
+            .from_select(
+                ["application_id", "old_status", "new_status", "recruiter_id", "reason", "timestamp"],
+                select(
+                    changed.c.id,
+                    changed.c.old_status,
+                    cast(literal(new_status, StatusUpdate.new_status.type), StatusUpdate.new_status.type),
+                    literal(recruiter_tg_id, BigInteger),
+                    literal(reason, Text),
+                    literal(now, TIMESTAMP),
+                )
+            )
+            .cte("history")
+        )
+        ctes = [history, daily_stats, latency_stats]
+        if ApplicationStatus.NEW in sources:
+            # Заявка уходит из NEW: напоминания и уведомление о просрочке больше не нужны
+            ctes.append(cancel_jobs_cte(changed.c.id, now))
+        # Синхронизация статуса с внешней системой — через тот же outbox
         payload = {
             "status": new_status.value.lower(),
             "recruiter_id": str(recruiter_tg_id),
             "reason": reason,
         }
+        statement = (
+            insert(OutboxMessage)
+            .from_select(
+                ["application_id", "kind", "payload", "status", "attempts", "next_attempt_at", "created_at"],
+                select(
+                    changed.c.id,
+                    literal(KIND_UPDATE_STATUS, String),
+                    literal(payload, JSON),
+                    cast(literal(OutboxStatus.PENDING, OutboxMessage.status.type), OutboxMessage.status.type),
+                    literal(0, Integer),
+                    literal(now, TIMESTAMP),
+                    literal(now, TIMESTAMP),
+                )
+            )
+            .add_cte(*ctes)
+            .returning(OutboxMessage.id)
+        )
 
-        try:
-            async with aiohttp.ClientSession() as client_session:
-                async with client_session.patch(f"{self.api_url}/applications/{application.external_api_id}/status", json=payload, headers=self.headers) as response:
-                    if response.status not in [200, 204]:
-                        logging.error(f"Failed to update status in external API: {application.external_api_id}: {await response.text()}")
-        except aiohttp.ClientError as e:
-            logging.error(f"Network error updating API status for application {application_id}: {e}")
+        result = await self.session.execute(statement)
+        changed_row = result.first()
 
-        return True
+        if changed_row:
+            call_after_commit(self.session, outbox_dispatcher.wake)
+            return StatusChange(StatusChangeResult.OK, new_status, recruiter_tg_id)
+
+        # Переход не состоялся: выясняем почему (только на редком пути отказа)
+        current = (await self.session.execute(
+            select(Application.status, Application.recruiter_id).where(Application.id == application_id)
+        )).first()
+        if current is None:
+            return StatusChange(StatusChangeResult.NOT_FOUND)
+        if current.status == ApplicationStatus.NEW:
+            return StatusChange(StatusChangeResult.INVALID_TRANSITION, current.status, current.recruiter_id)
+        return StatusChange(StatusChangeResult.ALREADY_TAKEN, current.status, current.recruiter_id)
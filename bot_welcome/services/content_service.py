@@ -2,11 +2,27 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from bot_welcome.models.db_models import WelcomeContent, CachedVacancy
+from core.cache import TTLCache
+from core.cache_bus import invalidation_bus
+from core.config import settings
+from core.render import Markup, escape, link
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+# Общий для всех экземпляров сервиса кэш (сервис создается на каждый апдейт)
+content_cache = TTLCache(ttl=settings.CONTENT_CACHE_TTL, max_size=settings.CONTENT_CACHE_MAX_SIZE)
+
+WELCOME_KEY = ("welcome",)
+VACANCIES_NAMESPACE = "vacancies"
+
+# Записи из других процессов приходят через LISTEN/NOTIFY
+invalidation_bus.subscribe(WelcomeContent.__tablename__, lambda _: content_cache.invalidate(WELCOME_KEY))
+invalidation_bus.subscribe(CachedVacancy.__tablename__, lambda _: content_cache.invalidate_namespace(VACANCIES_NAMESPACE))
+
 
 class ContentService:
+    """Сервисы только выполняют flush: транзакцию апдейта фиксирует DBSessionMiddleware."""
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
@@ -14,35 +30,61 @@ class ContentService:
 
     async def get_welcome_data(self) -> tuple[str, List[Dict[str, str]]]:
         """Получает текущий текст приветствия и ссылки."""
+        _, text, links = await content_cache.get_or_load(WELCOME_KEY, self._load_welcome_content)
+        return text, links
+
+    async def _load_welcome_content(self) -> tuple[int, str, List[Dict[str, str]]]:
         result = await self.session.execute(
             select(WelcomeContent).order_by(WelcomeContent.id.desc()).limit(1)
         )
         content: WelcomeContent = result.scalars().first()
         if content:
-            return content.welcome_text, content.links_json
-        return "Привет Используйте /help для справки.", []
+            return content.id, content.welcome_text, content.links_json
+        return 0, "Привет Используйте /help для справки.", []
 
     async def get_latest_vacancies(self, limit: int = 5) -> List[CachedVacancy]:
-        """Получает N последних активных вакансий."""
+        """Получает N последних активных вакансий (объекты отсоединены от сессии, только для чтения)."""
+        vacancies = await content_cache.get_or_load(
+            (VACANCIES_NAMESPACE, limit),
+            lambda: self._load_latest_vacancies(limit)
+        )
+        return list(vacancies)
+
+    async def _load_latest_vacancies(self, limit: int) -> tuple[CachedVacancy, ...]:
         result = await self.session.execute(
             select(CachedVacancy)
             .where(CachedVacancy.is_active == True)
             .order_by(CachedVacancy.post_id.desc())
             .limit(limit)
         )
-        return result.scalars().all()
+        vacancies = tuple(result.scalars().all())
+        # Объекты разделяются между апдейтами: отвязываем их от сессии,
+        # чтобы rollback/expire в чужой сессии не трогал закэшированные данные
+        for vacancy in vacancies:
+            self.session.expunge(vacancy)
+        return vacancies
+
+    async def get_content_version(self) -> tuple[int, int]:
+        """Версия контента для кэша отрисовки: (WelcomeContent.id, версия набора активных вакансий)."""
+        welcome_id, _, _ = await content_cache.get_or_load(WELCOME_KEY, self._load_welcome_content)
+        return welcome_id, content_cache.generation(VACANCIES_NAMESPACE)
+
+    @staticmethod
+    def cache_stats() -> Dict[str, Any]:
+        """Счетчики попаданий/промахов общего кэша контента."""
+        return content_cache.stats()
 
-    def format_vacancies_text(self, vacancies: List[CachedVacancy]) -> str:
-        """Форматирует список вакансий для сообщения в Markdown."""
+    def format_vacancies_text(self, vacancies: List[CachedVacancy]) -> Markup:
+        """Форматирует список вакансий для сообщения в MarkdownV2."""
         if not vacancies:
-            return "Актуальных вакансий пока нет."
+            return Markup(escape("Актуальных вакансий пока нет."))
 
-        text = "**🔥 Горячие Вакансии:**\n"
+        lines = ["*🔥 Горячие Вакансии:*"]
         for i, vacancy in enumerate(vacancies, 1):
             # [Название](ссылка) для кликабельности
-            text += f"{i}. [{vacancy.vacancy_title}]({vacancy.telegram_link})\n"
+            lines.append(f"{i}\\. {link(vacancy.vacancy_title, vacancy.telegram_link)}")
 
-        return text
+        return Markup("\n".join(lines) + "\n")
 
     # --- Администрирование ---
 
@@ -54,7 +96,8 @@ class ContentService:
             last_updated=datetime.utcnow()
         )
         self.session.add(new_content)
-        await self.session.commit()
+        await self.session.flush()
+        await invalidation_bus.notify(self.session, WelcomeContent.__tablename__)
 
     async def add_vacancy_to_cache(self, title: str, link: str, post_id: int, direction: str) -> bool:
         """Добавляет или обновляет вакансию в кэше."""
@@ -73,7 +116,8 @@ class ContentService:
             is_active=True
         )
         self.session.add(new_vacancy)
-        await self.session.commit()
+        await self.session.flush()
+        await invalidation_bus.notify(self.session, CachedVacancy.__tablename__)
         return True
 
     async def toggle_vacancy_active(self, post_id: int, is_active: bool):
@@ -84,6 +128,7 @@ class ContentService:
         vacancy = result.scalars().first()
         if vacancy:
             vacancy.is_active = is_active
-            await self.session.commit()
+            await self.session.flush()
+            await invalidation_bus.notify(self.session, CachedVacancy.__tablename__)
             return True
         return False
\ No newline at end of file
@@ -0,0 +1,77 @@
+# bot_welcome/services/direction_classifier.py
+import asyncio
+import logging
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from bot_welcome.models.db_models import SkillSynonym
+from bot_welcome.services.recruiter_routing import normalize_direction
+from core.cache_bus import invalidation_bus
+from core.text_matcher import PhraseMatcher
+
+
+def normalize_phrase(phrase: str) -> str:
+    return " ".join(phrase.lower().split())
+
+
+class DirectionClassifier:
+    """
+    Направление отклика по навыкам кандидата: словарь skill_synonyms (фраза -> направление)
+    компилируется в автомат Ахо — Корасик, и текст анкеты разбирается за один проход
+    (микросекунды на отклик, запросов к БД нет). Словарь перечитывается целиком после
+    любой записи в skill_synonyms, локальной или пришедшей через LISTEN/NOTIFY.
+    """
+
+    def __init__(self):
+        self._matcher: PhraseMatcher[str] = PhraseMatcher({})
+        self._synonyms: Dict[str, str] = {}
+        self._loaded = False
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    async def ensure_loaded(self, session: AsyncSession):
+        if self._loaded:
+            return
+        async with self._lock:
+            if not self._loaded:
+                await self.load(session)
+
+    async def load(self, session: AsyncSession):
+        generation = self._generation
+        result = await session.execute(select(SkillSynonym.phrase, SkillSynonym.direction))
+        synonyms = {phrase: normalize_direction(direction) for phrase, direction in result}
+        self._matcher = PhraseMatcher(synonyms)
+        self._synonyms = synonyms
+        # Если во время чтения пришла инвалидация, следующий запрос перечитает словарь еще раз
+        self._loaded = generation == self._generation
+        logging.info(f"Skill dictionary loaded: {len(self._matcher)} phrases.")
+
+    def invalidate(self, _payload: Optional[str] = None):
+        self._generation += 1
+        self._loaded = False
+
+    def classify(self, text: Optional[str]) -> Optional[str]:
+        """
+        Направление с наибольшим числом упомянутых навыков (разные фразы; при равенстве —
+        упомянутое раньше). None, если в тексте нет ни одной фразы словаря.
+        """
+        if not text:
+            return None
+        phrases: Dict[str, str] = {}
+        for match in self._matcher.iter_matches(text):
+            phrases.setdefault(match.phrase, match.value)
+        if not phrases:
+            return None
+        # Counter сохраняет порядок первого упоминания, most_common стабилен при равенстве
+        return Counter(phrases.values()).most_common(1)[0][0]
+
+    def synonyms(self) -> List[Tuple[str, str]]:
+        return sorted(self._synonyms.items(), key=lambda item: (item[1], item[0]))
+
+
+# Единственный словарь на процесс
+direction_classifier = DirectionClassifier()
+invalidation_bus.subscribe(SkillSynonym.__tablename__, direction_classifier.invalidate)
@@ -0,0 +1,100 @@
+# bot_welcome/services/draft_buffer.py
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Integer, JSON, cast, column, func, literal, update, values
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from bot_welcome.models.db_models import Application
+from core.config import settings
+from core.db import AsyncSessionLocal
+
+
+class DraftBuffer:
+    """
+    Write-behind буфер черновиков анкеты (Application.temp_fsm_data).
+    Шаги QuickApply складывают сюда только изменившиеся поля, а буфер раз в flush_interval
+    записывает все накопленное одним UPDATE ... FROM (VALUES ...) с jsonb-слиянием.
+    При падении процесса теряется не больше flush_interval секунд ввода, а сам ход
+    анкеты не страдает: он живет в FSM-хранилище.
+    """
+
+    def __init__(self, session_pool: async_sessionmaker, flush_interval: float, max_pending: int):
+        self.session_pool = session_pool
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def stage(self, application_id: int, **fields: Any):
+        """Запоминает изменившиеся поля черновика; более поздние значения перекрывают ранние."""
+        self._pending.setdefault(application_id, {}).update(fields)
+        if len(self._pending) >= self.max_pending:
+            self._wakeup.set()
+
+    def discard(self, application_id: int):
+        """Отменяет неотправленные изменения (анкета финализирована, черновик больше не нужен)."""
+        self._pending.pop(application_id, None)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Дописываем остаток при штатной остановке
+        await self.flush()
+
+    async def _run_forever(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Записывает накопленные черновики одним запросом. Возвращает число затронутых анкет."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+
+            patches = values(column("id", Integer), column("patch", JSONB), name="drafts").data(list(batch.items()))
+            merged = func.coalesce(cast(Application.temp_fsm_data, JSONB), literal({}, JSONB)).op("||")(patches.c.patch)
+            try:
+                async with self.session_pool() as session:
+                    await session.execute(
+                        update(Application)
+                        .where(Application.id == patches.c.id)
+                        # Финализированная анкета уже очистила черновик — не воскрешаем его
+                        .where(Application.candidate_data.is_(None))
+                        .values(temp_fsm_data=cast(merged, JSON))
+                    )
+                    await session.commit()
+            except Exception as e:
+                logging.error(f"Draft flush failed for {len(batch)} applications: {e}")
+                # Возвращаем пачку в буфер под более свежие изменения и повторим в следующий раз
+                for application_id, fields in batch.items():
+                    self._pending[application_id] = {**fields, **self._pending.get(application_id, {})}
+                return 0
+            return len(batch)
+
+
+# Единственный буфер на процесс
+draft_buffer = DraftBuffer(
+    session_pool=AsyncSessionLocal,
+    flush_interval=settings.DRAFT_FLUSH_INTERVAL,
+    max_pending=settings.DRAFT_MAX_PENDING,
+)
@@ -0,0 +1,305 @@
+# bot_welcome/services/job_scheduler.py
+import asyncio
+import logging
+import math
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from bot_welcome.models.db_models import JobStatus, ScheduledJob
+from core.config import settings
+from core.db import AsyncSessionLocal, call_after_commit
+
+
+@dataclass
+class ClaimedJob:
+    id: int
+    kind: str
+    application_id: Optional[int]
+    payload: Optional[Dict[str, Any]]
+    attempts: int
+
+
+# Обработчик задачи; исключение — повторить позже (с backoff), до max_attempts
+JobHandler = Callable[[ClaimedJob], Awaitable[None]]
+
+
+class TimingWheel:
+    """
+    Колесо таймеров на ближайшие horizon секунд: добавление и тик — O(1), память — по числу задач в горизонте.
+    Хранит только id задач: сработавший слот будит планировщик, а выполнять ли задачу, решает БД.
+    """
+
+    def __init__(self, tick: float, horizon: float):
+        self.tick = tick
+        self.size = max(1, math.ceil(horizon / tick)) + 1
+        self._slots: List[Set[int]] = [set() for _ in range(self.size)]
+        self._cursor = 0
+
+    def add(self, job_id: int, delay: float) -> bool:
+        """Ставит задачу на слот через delay секунд; за горизонтом не ставит (ее подберет опрос БД)."""
+        ticks = max(1, math.ceil(delay / self.tick))
+        if ticks >= self.size:
+            return False
+        self._slots[(self._cursor + ticks) % self.size].add(job_id)
+        return True
+
+    def advance(self) -> Set[int]:
+        """Сдвигает колесо на один тик и возвращает задачи, срок которых наступил."""
+        self._cursor = (self._cursor + 1) % self.size
+        fired, self._slots[self._cursor] = self._slots[self._cursor], set()
+        return fired
+
+
+def cancel_jobs_cte(application_id_column, now: datetime, name: str = "cancelled_jobs"):
+    """CTE для запроса изменения заявки: отменяет ее ожидающие задачи в той же транзакции."""
+    return (
+        update(ScheduledJob)
+        .where(ScheduledJob.application_id == application_id_column)
+        .where(ScheduledJob.status == JobStatus.PENDING)
+        .values(status=JobStatus.CANCELLED, done_at=now)
+        .cte(name)
+    )
+
+
+class JobScheduler:
+    """
+    Отложенные задачи в таблице scheduled_jobs, переживающие перезапуск.
+    Созревшие задачи захватываются пачкой через SELECT ... FOR UPDATE SKIP LOCKED с арендой
+    (due_at сдвигается на время аренды и продлевается, пока задача выполняется), поэтому их разбирают
+    несколько процессов без дублей.
+    БД опрашивается редко: задачи ближайших horizon секунд лежат в TimingWheel и будят планировщик вовремя.
+    """
+
+    def __init__(
+        self,
+        session_pool: async_sessionmaker,
+        batch_size: int,
+        poll_interval: float,
+        horizon: float,
+        tick: float,
+        max_attempts: int,
+        lease_seconds: float = 300.0,
+        base_backoff: float = 30.0,
+        max_backoff: float = 3600.0,
+    ):
+        self.session_pool = session_pool
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.horizon = horizon
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.wheel = TimingWheel(tick, horizon)
+        self._handlers: Dict[str, JobHandler] = {}
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def register(self, kind: str, handler: JobHandler):
+        self._handlers[kind] = handler
+
+    def schedule(
+        self,
+        session: AsyncSession,
+        kind: str,
+        due_at: datetime,
+        application_id: Optional[int] = None,
+        payload: Optional[Dict[str, Any]] = None,
+    ) -> ScheduledJob:
+        """Добавляет задачу в транзакцию сессии; после COMMIT она сразу попадает в колесо таймеров."""
+        job = ScheduledJob(
+            kind=kind,
+            application_id=application_id,
+            payload=payload,
+            due_at=due_at,
+            status=JobStatus.PENDING,
+            attempts=0,
+        )
+        session.add(job)
+        call_after_commit(session, lambda: self._arm(job.id, job.due_at))
+        return job
+
+    def wake(self):
+        self._wakeup.set()
+
+    def _arm(self, job_id: int, due_at: datetime):
+        if not self._tasks:
+            return  # планировщик в этом процессе не запущен — задачу выполнит другой
+        delay = (due_at - datetime.utcnow()).total_seconds()
+        if delay <= 0:
+            self.wake()
+        else:
+            self.wheel.add(job_id, delay)
+
+    async def start(self):
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._run_forever()),
+                asyncio.create_task(self._tick_forever()),
+            ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    async def _tick_forever(self):
+        while True:
+            await asyncio.sleep(self.wheel.tick)
+            if self.wheel.advance():
+                self.wake()
+
+    async def _run_forever(self):
+        next_poll = 0.0
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                if loop.time() >= next_poll:
+                    await self._load_upcoming()
+                    next_poll = loop.time() + self.poll_interval
+                processed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Job scheduler error: {e}")
+                processed = 0
+
+            # Полная пачка — вероятно, созрели еще задачи
+            if processed >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(next_poll - loop.time(), 0))
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _load_upcoming(self):
+        """Задачи ближайшего горизонта из БД (созданные другими процессами или до перезапуска) — в колесо."""
+        now = datetime.utcnow()
+        async with self.session_pool() as session:
+            result = await session.execute(
+                select(ScheduledJob.id, ScheduledJob.due_at)
+                .where(ScheduledJob.status == JobStatus.PENDING)
+                .where(ScheduledJob.due_at > now)
+                .where(ScheduledJob.due_at <= now + timedelta(seconds=self.horizon))
+            )
+            for job_id, due_at in result:
+                self.wheel.add(job_id, (due_at - now).total_seconds())
+
+    async def run_once(self) -> int:
+        """Захватывает и выполняет одну пачку созревших задач. Возвращает их число."""
+        claimed = await self._claim()
+        if not claimed:
+            return 0
+        # Пока пачка выполняется, аренда продлевается: обработчик может долго ждать внешний лимит
+        # (очередь отправки в QC-чат), и задачу не должен перехватить другой процесс
+        renewal = asyncio.create_task(self._renew_leases([job.id for job in claimed]))
+        try:
+            errors = await asyncio.gather(*(self._execute(job) for job in claimed))
+        finally:
+            renewal.cancel()
+        await self._complete(list(zip(claimed, errors)))
+        return len(claimed)
+
+    async def _renew_leases(self, job_ids: List[int]):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                async with self.session_pool() as session:
+                    await session.execute(
+                        update(ScheduledJob)
+                        .where(ScheduledJob.id.in_(job_ids))
+                        .where(ScheduledJob.status == JobStatus.PENDING)
+                        .values(due_at=datetime.utcnow() + timedelta(seconds=self.lease_seconds))
+                    )
+                    await session.commit()
+            except Exception as e:
+                logging.warning(f"Job scheduler lease renewal failed: {e}")
+
+    async def _claim(self) -> List[ClaimedJob]:
+        now = datetime.utcnow()
+        claimable = (
+            select(ScheduledJob.id)
+            .where(ScheduledJob.status == JobStatus.PENDING)
+            .where(ScheduledJob.due_at <= now)
+            .order_by(ScheduledJob.due_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        async with self.session_pool() as session:
+            result = await session.execute(
+                update(ScheduledJob)
+                .where(ScheduledJob.id.in_(claimable.scalar_subquery()))
+                .values(
+                    due_at=now + timedelta(seconds=self.lease_seconds),
+                    attempts=ScheduledJob.attempts + 1,
+                )
+                .returning(
+                    ScheduledJob.id,
+                    ScheduledJob.kind,
+                    ScheduledJob.application_id,
+                    ScheduledJob.payload,
+                    ScheduledJob.attempts,
+                )
+            )
+            rows = result.all()
+            await session.commit()
+        return [ClaimedJob(*row) for row in rows]
+
+    async def _execute(self, job: ClaimedJob) -> Optional[str]:
+        """Выполняет задачу; возвращает текст ошибки или None."""
+        handler = self._handlers.get(job.kind)
+        if handler is None:
+            return f"No handler for job kind '{job.kind}'"
+        try:
+            await handler(job)
+        except Exception as e:
+            return repr(e)
+        return None
+
+    def _backoff(self, attempts: int) -> timedelta:
+        delay = min(self.base_backoff * 2 ** max(attempts - 1, 0), self.max_backoff)
+        return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    async def _complete(self, results: List[tuple[ClaimedJob, Optional[str]]]):
+        now = datetime.utcnow()
+        async with self.session_pool() as session:
+            for job, error in results:
+                if error is None:
+                    values: Dict[str, Any] = dict(status=JobStatus.DONE, done_at=now, last_error=None)
+                elif job.attempts >= self.max_attempts or job.kind not in self._handlers:
+                    values = dict(status=JobStatus.FAILED, done_at=now, last_error=error)
+                    logging.error(f"Job {job.id} ({job.kind}) failed: {error}")
+                else:
+                    values = dict(due_at=now + self._backoff(job.attempts), last_error=error)
+                    logging.warning(f"Job {job.id} ({job.kind}) attempt {job.attempts} failed: {error}")
+
+                # Задачу могли отменить во время выполнения — отмену не перетираем
+                await session.execute(
+                    update(ScheduledJob)
+                    .where(ScheduledJob.id == job.id)
+                    .where(ScheduledJob.status == JobStatus.PENDING)
+                    .values(**values)
+                )
+            await session.commit()
+
+
+# Единственный планировщик на процесс
+job_scheduler = JobScheduler(
+    session_pool=AsyncSessionLocal,
+    batch_size=settings.SCHEDULER_BATCH_SIZE,
+    poll_interval=settings.SCHEDULER_POLL_INTERVAL,
+    horizon=settings.SCHEDULER_HORIZON,
+    tick=settings.SCHEDULER_TICK,
+    max_attempts=settings.SCHEDULER_MAX_ATTEMPTS,
+)
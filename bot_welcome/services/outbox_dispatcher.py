@@ -0,0 +1,273 @@
+# bot_welcome/services/outbox_dispatcher.py
+import asyncio
+import json
+import logging
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from sqlalchemy import select, update
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from bot_welcome.models.db_models import Application, OutboxMessage, OutboxStatus
+from core.config import settings
+from core.db import AsyncSessionLocal
+from core.recruiting_api import RecruitingAPIClient, recruiting_api
+
+# Виды записей outbox
+KIND_CREATE_APPLICATION = "create_application"
+KIND_UPDATE_STATUS = "update_status"
+
+
+@dataclass
+class _Claimed:
+    id: int
+    application_id: int
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+
+
+@dataclass
+class _Outcome:
+    status: Optional[OutboxStatus]  # None — повторить позже
+    external_id: Optional[str] = None
+    error: Optional[str] = None
+    waiting: bool = False  # запись ждет другую (create_application): не попытка, а ожидание
+
+
+class OutboxDispatcher:
+    """
+    Фоновая доставка записей api_outbox во внешнее API.
+    Записи захватываются пачкой через SELECT ... FOR UPDATE SKIP LOCKED и "арендуются"
+    (next_attempt_at сдвигается на время аренды), поэтому несколько реплик ботов
+    разбирают очередь параллельно, не отправляя одно и то же дважды.
+    Записи одного отклика уходят строго по порядку: захватывается только самая ранняя
+    ожидающая запись отклика, следующая — после ее доставки (или окончательной ошибки).
+    """
+
+    def __init__(
+        self,
+        session_pool: async_sessionmaker,
+        api_client: RecruitingAPIClient,
+        batch_size: int,
+        concurrency: int,
+        poll_interval: float,
+        max_attempts: int,
+        base_backoff: float = 5.0,
+        max_backoff: float = 1800.0,
+        lease_seconds: float = 120.0,
+    ):
+        self.session_pool = session_pool
+        self.api = api_client
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lease_seconds = lease_seconds
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        """Будит диспетчер сразу после новой записи в outbox (не дожидаясь интервала опроса)."""
+        self._wakeup.set()
+
+    async def _run_forever(self):
+        while True:
+            try:
+                processed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Outbox dispatcher error: {e}")
+                processed = 0
+
+            # Полная пачка — вероятно, есть еще записи, продолжаем без паузы
+            if processed >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def run_once(self) -> int:
+        """Захватывает и отправляет одну пачку. Возвращает число обработанных записей."""
+        claimed = await self._claim()
+        if not claimed:
+            return 0
+
+        targets = await self._load_targets(
+            [c.application_id for c in claimed if c.kind == KIND_UPDATE_STATUS]
+        )
+        outcomes = await asyncio.gather(*(self._deliver(c, targets) for c in claimed))
+        await self._complete(list(zip(claimed, outcomes)))
+        return len(claimed)
+
+    async def _claim(self) -> List[_Claimed]:
+        now = datetime.utcnow()
+        # Более ранняя ожидающая запись того же отклика (в том числе арендованная другой репликой
+        # или ждущая повтора) блокирует остальные: иначе IN_PROGRESS и INVITED могли бы дойти
+        # до API в обратном порядке
+        earlier = aliased(OutboxMessage)
+        has_earlier_pending = (
+            select(earlier.id)
+            .where(earlier.application_id == OutboxMessage.application_id)
+            .where(earlier.status == OutboxStatus.PENDING)
+            .where(earlier.id < OutboxMessage.id)
+            .exists()
+        )
+        claimable = (
+            select(OutboxMessage.id)
+            .where(OutboxMessage.status == OutboxStatus.PENDING)
+            .where(OutboxMessage.next_attempt_at <= now)
+            .where(~has_earlier_pending)
+            .order_by(OutboxMessage.next_attempt_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        async with self.session_pool() as session:
+            result = await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id.in_(claimable.scalar_subquery()))
+                .values(
+                    next_attempt_at=now + timedelta(seconds=self.lease_seconds),
+                    attempts=OutboxMessage.attempts + 1,
+                )
+                .returning(
+                    OutboxMessage.id,
+                    OutboxMessage.application_id,
+                    OutboxMessage.kind,
+                    OutboxMessage.payload,
+                    OutboxMessage.attempts,
+                )
+            )
+            rows = result.all()
+            await session.commit()
+
+        # Создание карточек первыми занимают слоты отправки
+        claimed = [_Claimed(*row) for row in rows]
+        claimed.sort(key=lambda c: (c.kind != KIND_CREATE_APPLICATION, c.id))
+        return claimed
+
+    async def _load_targets(self, application_ids: List[int]) -> Dict[int, tuple[Optional[str], bool]]:
+        """Для обновлений статуса: id карточки во внешней системе и ждет ли еще доставки ее создание."""
+        if not application_ids:
+            return {}
+        create_pending = (
+            select(OutboxMessage.id)
+            .where(OutboxMessage.application_id == Application.id)
+            .where(OutboxMessage.kind == KIND_CREATE_APPLICATION)
+            .where(OutboxMessage.status == OutboxStatus.PENDING)
+            .exists()
+        )
+        async with self.session_pool() as session:
+            result = await session.execute(
+                select(Application.id, Application.external_api_id, create_pending)
+                .where(Application.id.in_(application_ids))
+            )
+            return {application_id: (external_id, pending) for application_id, external_id, pending in result}
+
+    async def _deliver(self, claimed: _Claimed, targets: Dict[int, tuple[Optional[str], bool]]) -> _Outcome:
+        async with self._semaphore:
+            try:
+                if claimed.kind == KIND_CREATE_APPLICATION:
+                    # Повтор после потерянного ответа не должен создать вторую карточку
+                    status, body = await self.api.create_application(
+                        claimed.payload, idempotency_key=f"outbox-{claimed.id}"
+                    )
+                    if status == 201:
+                        return _Outcome(OutboxStatus.SENT, external_id=json.loads(body).get('id'))
+                elif claimed.kind == KIND_UPDATE_STATUS:
+                    external_id, create_pending = targets.get(claimed.application_id, (None, False))
+                    if not external_id:
+                        if not create_pending:
+                            # Создание провалилось окончательно (или не ставилось) — обновлять нечего
+                            return _Outcome(OutboxStatus.FAILED, error="No external application id to update.")
+                        # Карточка еще не создана во внешней системе — ждем доставки create_application
+                        return _Outcome(None, error="Waiting for external application id.", waiting=True)
+                    status, body = await self.api.update_application_status(external_id, claimed.payload)
+                    if status in (200, 204):
+                        return _Outcome(OutboxStatus.SENT)
+                else:
+                    return _Outcome(OutboxStatus.FAILED, error=f"Unknown outbox kind: {claimed.kind}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                return _Outcome(None, error=f"Network/Connection error: {e!r}")
+            except json.JSONDecodeError:
+                return _Outcome(None, error="Invalid JSON response from API.")
+
+        error = f"API Error: {status}: {body}"
+        # 4xx (кроме 408/429) не исправятся повтором
+        if 400 <= status < 500 and status not in (408, 429):
+            return _Outcome(OutboxStatus.FAILED, error=error)
+        return _Outcome(None, error=error)
+
+    def _backoff(self, attempts: int) -> timedelta:
+        delay = min(self.base_backoff * 2 ** max(attempts - 1, 0), self.max_backoff)
+        # Джиттер, чтобы реплики не били в API синхронно после его восстановления
+        return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    async def _complete(self, results: List[tuple[_Claimed, _Outcome]]):
+        now = datetime.utcnow()
+        async with self.session_pool() as session:
+            for claimed, outcome in results:
+                values: Dict[str, Any] = {"last_error": outcome.error}
+                if outcome.status == OutboxStatus.SENT:
+                    values.update(status=OutboxStatus.SENT, sent_at=now)
+                    if outcome.external_id:
+                        await session.execute(
+                            update(Application)
+                            .where(Application.id == claimed.application_id)
+                            .values(external_api_id=outcome.external_id)
+                        )
+                elif outcome.waiting:
+                    # Ожидание не расходует попытки: медленный API не должен довести запись до FAILED
+                    # прежде, чем ее вообще отправили
+                    values.update(
+                        next_attempt_at=now + timedelta(seconds=self.poll_interval),
+                        attempts=OutboxMessage.attempts - 1,
+                    )
+                elif outcome.status == OutboxStatus.FAILED or claimed.attempts >= self.max_attempts:
+                    values.update(status=OutboxStatus.FAILED)
+                    logging.error(
+                        f"Outbox message {claimed.id} ({claimed.kind}) for app {claimed.application_id} failed: {outcome.error}"
+                    )
+                else:
+                    values.update(next_attempt_at=now + self._backoff(claimed.attempts))
+                    logging.warning(
+                        f"Outbox message {claimed.id} ({claimed.kind}) attempt {claimed.attempts} failed: {outcome.error}"
+                    )
+
+                await session.execute(
+                    update(OutboxMessage).where(OutboxMessage.id == claimed.id).values(**values)
+                )
+            await session.commit()
+
+
+# Единственный диспетчер на процесс
+outbox_dispatcher = OutboxDispatcher(
+    session_pool=AsyncSessionLocal,
+    api_client=recruiting_api,
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    concurrency=settings.OUTBOX_CONCURRENCY,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL,
+    max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+)
@@ -0,0 +1,135 @@
+# bot_welcome/services/qc_notifier.py
+import logging
+from datetime import datetime
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.methods import SendMessage
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from bot_welcome.middlewares.metrics_middleware import TelegramTimingMiddleware
+from bot_welcome.models.db_models import Application
+from bot_welcome.services.job_scheduler import ClaimedJob, JobScheduler, job_scheduler
+from core.config import settings
+from core.db import AsyncSessionLocal
+from core.send_queue import Priority, TelegramSendQueue, send_queue
+
+# Вид задачи scheduled_jobs: карточка нового отклика в QC-чат
+KIND_QC_NOTIFICATION = "qc_notification"
+# Application.qc_message_id на время отправки карточки: повторный захват задачи ее не дублирует
+QC_MESSAGE_SENDING = 0
+
+
+class QCNotifier:
+    """
+    Доставка уведомлений о новых откликах в QC-чат от имени рекрутерского бота.
+    Уведомление — задача scheduled_jobs, записанная в одной транзакции с анкетой: рестарт процесса
+    ее не теряет, а повторы с backoff делает планировщик (единственный слой повторов — очередь
+    отправки для этих сообщений не повторяет). Карточка рисуется из БД в момент отправки,
+    message_id сохраняется в Application.qc_message_id. Перед отправкой заявка условно помечается
+    (qc_message_id = QC_MESSAGE_SENDING): если процесс упал после отправки, но до записи message_id,
+    повтор карточку не дублирует (лучше потерять ее с предупреждением в логе, чем прислать дважды).
+    Владеет одним долгоживущим Bot на процесс.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        chat_id: int,
+        session_pool: async_sessionmaker,
+        queue: TelegramSendQueue,
+        scheduler: JobScheduler,
+    ):
+        self.token = token
+        self.chat_id = chat_id
+        self.session_pool = session_pool
+        self.send_queue = queue
+        self.scheduler = scheduler
+        self._bot: Optional[Bot] = None
+
+    @property
+    def bot(self) -> Bot:
+        if self._bot is None:
+            self._bot = Bot(token=self.token, default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN_V2))
+            self._bot.session.middleware(TelegramTimingMiddleware())
+        return self._bot
+
+    def schedule(self, session: AsyncSession, application_id: int):
+        """Ставит уведомление в транзакцию сессии; после COMMIT планировщик отправляет его сразу."""
+        self.scheduler.schedule(session, KIND_QC_NOTIFICATION, datetime.utcnow(), application_id)
+
+    async def start(self):
+        self.scheduler.register(KIND_QC_NOTIFICATION, self._deliver)
+
+    async def stop(self):
+        if self._bot is not None:
+            await self._bot.session.close()
+            self._bot = None
+
+    async def _deliver(self, job: ClaimedJob):
+        # Импорт здесь: модуль QC-хендлеров сам зависит от сервисов бота кандидатов
+        from bot_3_qc.handlers.recruiter import create_recruiter_keyboard, format_application_message
+
+        async with self.session_pool() as session:
+            result = await session.execute(
+                update(Application)
+                .where(Application.id == job.application_id)
+                .where(Application.qc_message_id.is_(None))
+                .values(qc_message_id=QC_MESSAGE_SENDING)
+                .returning(Application.id)
+            )
+            claimed = result.scalar_one_or_none() is not None
+            await session.commit()
+            if not claimed:
+                application = await session.get(Application, job.application_id)
+                if application is not None and application.qc_message_id == QC_MESSAGE_SENDING:
+                    # Предыдущая попытка прервалась во время отправки: карточка могла уйти
+                    logging.warning(f"QC notification for app {job.application_id} was interrupted; not resending.")
+                return
+            application = await session.get(Application, job.application_id)
+
+        try:
+            message = await self.send_queue.submit(
+                self.bot,
+                SendMessage(
+                    chat_id=self.chat_id,
+                    text=format_application_message(application),
+                    reply_markup=create_recruiter_keyboard(application.id, application.status),
+                ),
+                priority=Priority.QC,
+                max_retries=0,
+            )
+        except Exception as e:
+            # Карточка не ушла — снимаем отметку, чтобы ее можно было отправить снова
+            await self._set_message_id(application.id, None)
+            if isinstance(e, (TelegramBadRequest, TelegramForbiddenError)):
+                # Ошибка разметки, бот удален из чата и т.п. — повтор не поможет
+                logging.error(f"QC notification for app {application.id} rejected: {e}")
+                return
+            raise
+
+        await self._set_message_id(application.id, message.message_id)
+
+    async def _set_message_id(self, application_id: int, message_id: Optional[int]):
+        async with self.session_pool() as session:
+            await session.execute(
+                update(Application)
+                .where(Application.id == application_id)
+                .where(Application.qc_message_id == QC_MESSAGE_SENDING)
+                .values(qc_message_id=message_id)
+            )
+            await session.commit()
+
+
+# Единственный уведомитель на процесс
+qc_notifier = QCNotifier(
+    token=settings.RECRUITER_BOT_TOKEN,
+    chat_id=settings.QC_CHAT_ID,
+    session_pool=AsyncSessionLocal,
+    queue=send_queue,
+    scheduler=job_scheduler,
+)
@@ -0,0 +1,105 @@
+# bot_welcome/services/recruiter_routing.py
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from bot_welcome.models.db_models import RecruiterMapping
+from core.cache_bus import invalidation_bus
+
+DEFAULT_DIRECTION = "default"
+
+# Синонимы направлений -> каноническое имя, под которым хранится маппинг
+DIRECTION_ALIASES: Dict[str, str] = {
+    "javascript": "js",
+    "typescript": "js",
+    "ts": "js",
+    "node": "js",
+    "nodejs": "js",
+    "frontend": "js",
+    "py": "python",
+    "golang": "go",
+    "c#": "csharp",
+    ".net": "csharp",
+    "dotnet": "csharp",
+}
+
+
+def normalize_direction(direction: Optional[str]) -> str:
+    direction = (direction or "").strip().lower()
+    return DIRECTION_ALIASES.get(direction, direction) or DEFAULT_DIRECTION
+
+
+@dataclass(frozen=True)
+class RecruiterRoute:
+    direction: str
+    recruiter_tg_id: int
+    recruiter_username: Optional[str]
+    is_active: bool
+
+
+class RecruiterRoutingTable:
+    """
+    Таблица направление -> рекрутер в памяти процесса.
+    Загружается один раз и перечитывается целиком после любой записи в recruiters_mapping
+    (локальной или пришедшей через LISTEN/NOTIFY), поэтому на отклик не тратится ни одного запроса.
+    """
+
+    def __init__(self):
+        self._routes: Dict[str, RecruiterRoute] = {}
+        self._loaded = False
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    async def ensure_loaded(self, session: AsyncSession):
+        if self._loaded:
+            return
+        async with self._lock:
+            if not self._loaded:
+                await self.load(session)
+
+    async def load(self, session: AsyncSession):
+        generation = self._generation
+        result = await session.execute(select(RecruiterMapping))
+        self._routes = {
+            mapping.direction: RecruiterRoute(
+                direction=mapping.direction,
+                recruiter_tg_id=mapping.recruiter_tg_id,
+                recruiter_username=mapping.recruiter_username,
+                is_active=bool(mapping.is_active),
+            )
+            for mapping in result.scalars().all()
+        }
+        # Если во время чтения пришла инвалидация, следующий запрос перечитает таблицу еще раз
+        self._loaded = generation == self._generation
+        logging.info(f"Recruiter routing table loaded: {len(self._routes)} directions.")
+
+    def invalidate(self, _payload: Optional[str] = None):
+        self._generation += 1
+        self._loaded = False
+
+    def resolve(self, direction: Optional[str], use_default: bool = True) -> Optional[RecruiterRoute]:
+        """Активный рекрутер направления (с учетом синонимов), иначе рекрутер 'default'."""
+        route = self._routes.get(normalize_direction(direction))
+        if route and route.is_active:
+            return route
+        if not use_default:
+            return None
+
+        default_route = self._routes.get(DEFAULT_DIRECTION)
+        return default_route if default_route and default_route.is_active else None
+
+    def get(self, direction: Optional[str]) -> Optional[RecruiterRoute]:
+        """Маппинг направления как есть, в том числе отключенный (без фолбэка на 'default')."""
+        return self._routes.get(normalize_direction(direction))
+
+    def routes(self) -> List[RecruiterRoute]:
+        return sorted(self._routes.values(), key=lambda r: r.direction)
+
+
+# Единственная таблица на процесс
+recruiter_routing = RecruiterRoutingTable()
+invalidation_bus.subscribe(RecruiterMapping.__tablename__, recruiter_routing.invalidate)
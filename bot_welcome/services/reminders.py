@@ -0,0 +1,99 @@
+# bot_welcome/services/reminders.py
+import html
+import logging
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import SendMessage
+from aiogram.types import ReplyParameters
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot_welcome.models.db_models import Application, ApplicationStatus
+from bot_welcome.services.job_scheduler import ClaimedJob, job_scheduler
+from bot_welcome.services.qc_notifier import qc_notifier
+from bot_welcome.services.recruiter_routing import recruiter_routing
+from core.config import settings
+from core.db import AsyncSessionLocal
+from core.send_queue import Priority, send_queue
+
+# Виды задач (п. 4.4 ТЗ)
+KIND_CANDIDATE_REMINDER = "candidate_reminder"  # через 2 часа: кандидату — написать рекрутеру
+KIND_OVERDUE_NOTICE = "overdue_notice"          # через 24 часа: в QC-чат — заявка не взята в работу
+
+
+def schedule_follow_ups(session: AsyncSession, application_id: int):
+    """Напоминание и уведомление о просрочке для отправленной анкеты (в транзакции сессии)."""
+    now = datetime.utcnow()
+    job_scheduler.schedule(
+        session, KIND_CANDIDATE_REMINDER, now + timedelta(seconds=settings.REMINDER_CANDIDATE_DELAY), application_id
+    )
+    job_scheduler.schedule(
+        session, KIND_OVERDUE_NOTICE, now + timedelta(seconds=settings.REMINDER_OVERDUE_DELAY), application_id
+    )
+
+
+async def _load_waiting(job: ClaimedJob) -> tuple[Optional[Application], Optional[str]]:
+    """Заявка, все еще ожидающая рекрутера (иначе None), и username рекрутера ее направления."""
+    async with AsyncSessionLocal() as session:
+        application = await session.get(Application, job.application_id)
+        if application is None or application.status != ApplicationStatus.NEW:
+            return None, None
+        await recruiter_routing.ensure_loaded(session)
+    recruiter = recruiter_routing.resolve(application.direction)
+    return application, recruiter.recruiter_username if recruiter else None
+
+
+async def remind_candidate(bot: Bot, job: ClaimedJob):
+    application, recruiter_username = await _load_waiting(job)
+    if application is None:
+        return
+
+    text = f"⏰ Напоминаем: Вы откликнулись на вакансию <b>{html.escape(application.vacancy_title)}</b>.\n"
+    if recruiter_username:
+        text += f"Напишите рекрутеру @{html.escape(recruiter_username)} — так отклик рассмотрят быстрее."
+    else:
+        text += "Рекрутер свяжется с Вами в ближайшее время."
+
+    try:
+        await send_queue.submit(
+            bot,
+            SendMessage(chat_id=application.candidate_tg_id, text=text),
+            priority=Priority.CANDIDATE
+        )
+    except TelegramForbiddenError:
+        # Кандидат заблокировал бота — повтор не поможет
+        logging.info(f"Candidate of app {application.id} blocked the bot, reminder skipped.")
+
+
+async def notify_overdue(job: ClaimedJob):
+    application, recruiter_username = await _load_waiting(job)
+    if application is None:
+        return
+
+    hours = settings.REMINDER_OVERDUE_DELAY // 3600
+    text = f"⏰ Заявка #{application.id} ({application.vacancy_title}) ждет рекрутера больше {hours} ч."
+    if recruiter_username:
+        text += f" @{recruiter_username}"
+
+    await send_queue.submit(
+        qc_notifier.bot,
+        SendMessage(
+            chat_id=settings.QC_CHAT_ID,
+            text=text,
+            parse_mode=None,
+            # Ответом на карточку отклика, если она уже отправлена
+            reply_parameters=ReplyParameters(
+                message_id=application.qc_message_id, allow_sending_without_reply=True
+            ) if application.qc_message_id else None
+        ),
+        priority=Priority.QC
+    )
+
+
+def register_reminders(candidate_bot: Bot):
+    """Обработчики задач напоминаний (в процессе, где работает планировщик)."""
+    job_scheduler.register(KIND_CANDIDATE_REMINDER, partial(remind_candidate, candidate_bot))
+    job_scheduler.register(KIND_OVERDUE_NOTICE, notify_overdue)
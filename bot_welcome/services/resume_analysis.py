@@ -0,0 +1,104 @@
+# bot_welcome/services/resume_analysis.py
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+from core.config import settings
+from core.resume_text import analyze_resume_file, warm_up
+
+
+class ResumeAnalyzer:
+    """
+    Разбор файлов резюме в пуле процессов: парсинг PDF/DOCX занимает CPU на сотни миллисекунд
+    и не должен останавливать event loop. Одновременно выполняется не больше workers файлов
+    (таймаут считает время разбора, а не ожидание в очереди пула); зависший процесс по таймауту
+    завершается, и пул пересоздается.
+    """
+
+    def __init__(self, workers: int, timeout: float, max_pages: int):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self._semaphore = asyncio.Semaphore(workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._ready: Optional[asyncio.Future] = None
+
+    def _start_pool(self):
+        if self._pool is None:
+            # fork процесса с работающим event loop и потоками небезопасен. forkserver один раз
+            # импортирует модули в чистом процессе-сервере, рабочие процессы форкаются из него быстро
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(["__main__", "core.resume_text"])
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            self._ready = asyncio.ensure_future(self._warm_up(self._pool))
+
+    async def _warm_up(self, pool: ProcessPoolExecutor):
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(pool, warm_up) for _ in range(self.workers)))
+
+    def start(self):
+        """Запускает процессы пула в фоне, чтобы первый файл не ждал их старта."""
+        self._start_pool()
+
+    def _reset_pool(self):
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        # Публичного способа прервать задачу в процессе нет — завершаем процессы пула
+        for process in list(getattr(pool, "_processes", {}).values()):
+            process.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def analyze(self, path: str, file_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Теги навыков и стаж по файлу резюме; None, если файл не разобран за таймаут или битый.
+        BrokenProcessPool (пул пересоздан из-за другого файла) пробрасывается — задачу стоит повторить.
+        """
+        async with self._semaphore:
+            self._start_pool()
+            pool = self._pool
+            loop = asyncio.get_running_loop()
+            try:
+                # Запуск пула (секунды на импорт) не входит в таймаут разбора файла
+                await asyncio.shield(self._ready)
+                return await asyncio.wait_for(
+                    loop.run_in_executor(pool, analyze_resume_file, path, file_name, self.max_pages),
+                    timeout=self.timeout
+                )
+            except asyncio.TimeoutError:
+                logging.warning(f"Resume analysis of '{file_name}' timed out after {self.timeout}s.")
+                if self._pool is pool:
+                    self._reset_pool()
+                return None
+            except BrokenProcessPool:
+                if self._pool is pool:
+                    self._reset_pool()
+                raise
+            except Exception as e:
+                logging.warning(f"Resume analysis of '{file_name}' failed: {e!r}")
+                return None
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def merge_skill_tags(*groups: Optional[List[str]]) -> List[str]:
+    """Объединение тегов без повторов с сохранением порядка."""
+    merged: Dict[str, None] = {}
+    for group in groups:
+        for tag in group or ():
+            merged.setdefault(tag)
+    return list(merged)
+
+
+# Единственный пул разбора на процесс
+resume_analyzer = ResumeAnalyzer(
+    workers=settings.RESUME_ANALYSIS_WORKERS,
+    timeout=settings.RESUME_ANALYSIS_TIMEOUT,
+    max_pages=settings.RESUME_ANALYSIS_MAX_PAGES,
+)
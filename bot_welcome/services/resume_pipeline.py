@@ -0,0 +1,219 @@
+# bot_welcome/services/resume_pipeline.py
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from datetime import datetime
+from functools import partial
+from typing import Any, Dict, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest
+from aiogram.methods import EditMessageText
+from aiogram.types import Document
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from bot_3_qc.handlers.recruiter import create_recruiter_keyboard, format_application_message
+from bot_welcome.models.db_models import Application, ApplicationStatus, ResumeFile
+from bot_welcome.services.job_scheduler import ClaimedJob, job_scheduler
+from bot_welcome.services.qc_notifier import qc_notifier
+from bot_welcome.services.resume_analysis import merge_skill_tags, resume_analyzer
+from core.blob_store import BlobStore, create_blob_store
+from core.config import settings
+from core.db import AsyncSessionLocal
+from core.send_queue import Priority, send_queue
+
+KIND_RESUME_INGEST = "resume_ingest"
+
+
+class ResumeTooLarge(Exception):
+    pass
+
+
+class _HashingWriter:
+    """Приемник bot.download: пишет куски во временный файл, считая SHA-256 и размер по ходу."""
+
+    def __init__(self, file, max_size: int):
+        self.file = file
+        self.max_size = max_size
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk: bytes) -> int:
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            # Прерывает скачивание: дальше поток не читается
+            raise ResumeTooLarge(f"Resume exceeds {self.max_size} bytes")
+        self.sha256.update(chunk)
+        return self.file.write(chunk)
+
+    def flush(self):
+        # bot.download сбрасывает буфер после каждого куска; достаточно сброса при закрытии файла
+        pass
+
+
+class ResumePipeline:
+    """
+    Фоновое сохранение резюме-файлов кандидатов в BlobStore.
+    Задача ставится в scheduled_jobs в транзакции анкеты, поэтому финальный ответ кандидату ее не ждет,
+    а после перезапуска она будет выполнена. Файл скачивается поточно (куски по 64 КБ) с лимитом размера;
+    ключ объекта — SHA-256 содержимого, поэтому одинаковые файлы хранятся один раз, а повторно
+    присланный файл (тот же file_unique_id) не скачивается вовсе.
+    Скачанный файл разбирается в пуле процессов (resume_analyzer): теги навыков и стаж
+    добавляются к заявке, а карточка в QC-чате перерисовывается, пока заявка не взята в работу.
+    """
+
+    def __init__(self, session_pool: async_sessionmaker, max_size: int, download_timeout: int):
+        self.session_pool = session_pool
+        self.max_size = max_size
+        self.download_timeout = download_timeout
+        self._store: Optional[BlobStore] = None
+
+    @property
+    def store(self) -> BlobStore:
+        if self._store is None:
+            self._store = create_blob_store()
+        return self._store
+
+    def schedule(self, session: AsyncSession, application_id: int, document: Document):
+        """Ставит скачивание резюме в транзакцию сессии (выполнится сразу после COMMIT)."""
+        job_scheduler.schedule(
+            session,
+            KIND_RESUME_INGEST,
+            datetime.utcnow(),
+            application_id,
+            payload={
+                "file_id": document.file_id,
+                "file_unique_id": document.file_unique_id,
+                "file_name": document.file_name,
+                "file_size": document.file_size,
+            }
+        )
+
+    async def ingest(self, bot: Bot, job: ClaimedJob):
+        payload = job.payload or {}
+        file_unique_id = payload["file_unique_id"]
+
+        async with self.session_pool() as session:
+            known = await session.get(ResumeFile, file_unique_id)
+        if known is not None:
+            stored = {"key": known.storage_key, "sha256": known.sha256, "size": known.size, "analysis": known.analysis}
+        else:
+            if (payload.get("file_size") or 0) > self.max_size:
+                logging.warning(f"Resume of app {job.application_id} is too large ({payload['file_size']} bytes), skipped.")
+                return
+            try:
+                stored = await self._download(bot, payload)
+            except ResumeTooLarge as e:
+                logging.warning(f"Resume of app {job.application_id} skipped: {e}")
+                return
+
+        async with self.session_pool() as session:
+            await session.execute(
+                pg_insert(ResumeFile)
+                .values(
+                    file_unique_id=file_unique_id,
+                    sha256=stored["sha256"],
+                    storage_key=stored["key"],
+                    size=stored["size"],
+                    analysis=stored["analysis"],
+                    created_at=datetime.utcnow(),
+                )
+                .on_conflict_do_nothing()
+            )
+            # Блокировка строки: слияние тегов и стажа не перетирает параллельную запись в анкету
+            application = await session.scalar(
+                select(Application).where(Application.id == job.application_id).with_for_update()
+            )
+            if application is None or application.candidate_data is None:
+                await session.commit()
+                return
+            application.candidate_data = self._attach(application.candidate_data, payload, stored)
+            analysis = stored["analysis"] or {}
+            application.skill_tags = merge_skill_tags(application.skill_tags, analysis.get("skills"))
+            if analysis.get("years") is not None:
+                application.experience_years = max(application.experience_years or 0, analysis["years"])
+
+            refresh = None
+            if analysis and application.status == ApplicationStatus.NEW and application.qc_message_id:
+                refresh = send_queue.submit(
+                    qc_notifier.bot,
+                    EditMessageText(
+                        chat_id=settings.QC_CHAT_ID,
+                        message_id=application.qc_message_id,
+                        text=format_application_message(application),
+                        reply_markup=create_recruiter_keyboard(application.id)
+                    ),
+                    priority=Priority.QC,
+                    # Пока правка ждала в очереди, рекрутер мог взять заявку (в процессе QC-бота):
+                    # тогда карточку "НОВЫЙ ОТКЛИК" с кнопкой "Взять" не возвращаем
+                    guard=partial(self._still_new, application.id),
+                )
+            await session.commit()
+
+        if refresh is not None:
+            try:
+                await refresh
+            except TelegramBadRequest as e:
+                # Карточка не изменилась или удалена — повтор не нужен
+                logging.info(f"QC card of app {job.application_id} not refreshed: {e}")
+            except (asyncio.QueueFull, TelegramAPIError) as e:
+                # Теги уже сохранены; карточка обновится при следующей смене статуса — задачу не повторяем
+                logging.warning(f"QC card of app {job.application_id} not refreshed: {e}")
+
+    async def _still_new(self, application_id: int) -> bool:
+        async with self.session_pool() as session:
+            status = await session.scalar(select(Application.status).where(Application.id == application_id))
+        return status == ApplicationStatus.NEW
+
+    async def _download(self, bot: Bot, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Скачивает файл во временный файл хранилища и публикует его, если такого содержимого еще нет."""
+        fd, path = tempfile.mkstemp(dir=self.store.staging_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                writer = _HashingWriter(file, self.max_size)
+                await bot.download(payload["file_id"], destination=writer, timeout=self.download_timeout, seek=False)
+
+            # Разбор до публикации: put() может переместить временный файл
+            analysis = await resume_analyzer.analyze(path, payload.get("file_name") or "")
+
+            sha256 = writer.sha256.hexdigest()
+            extension = os.path.splitext(payload.get("file_name") or "")[1].lower()
+            key = f"{sha256[:2]}/{sha256}{extension}"
+            if not await self.store.exists(key):
+                await self.store.put(key, path)
+            return {"key": key, "sha256": sha256, "size": writer.size, "analysis": analysis}
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _attach(self, candidate_data: Dict[str, Any], payload: Dict[str, Any], stored: Dict[str, Any]) -> Dict[str, Any]:
+        # Новый dict: колонка JSON без MutableDict, изменение на месте не отследится
+        data = dict(candidate_data)
+        url = self.store.url(stored["key"])
+        data["resume_file"] = {
+            "key": stored["key"],
+            "sha256": stored["sha256"],
+            "size": stored["size"],
+            "url": url,
+            "file_name": payload.get("file_name"),
+        }
+        if url:
+            data["resume_link"] = url
+        return data
+
+
+# Единственный конвейер резюме на процесс
+resume_pipeline = ResumePipeline(
+    session_pool=AsyncSessionLocal,
+    max_size=settings.RESUME_MAX_SIZE,
+    download_timeout=settings.RESUME_DOWNLOAD_TIMEOUT,
+)
+
+
+def register_resume_pipeline(candidate_bot: Bot):
+    """Обработчик задач скачивания резюме (файлы доступны только боту, которому их прислали)."""
+    job_scheduler.register(KIND_RESUME_INGEST, partial(resume_pipeline.ingest, candidate_bot))
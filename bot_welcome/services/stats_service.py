@@ -0,0 +1,232 @@
+# bot_welcome/services/stats_service.py
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import BigInteger, Date, Integer, SmallInteger, String, TIMESTAMP, case, cast, func, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql.expression import CTE
+
+from bot_welcome.models.db_models import ApplicationStatus, RecruiterDailyStats, RecruiterLatencyStats
+from bot_welcome.services.recruiter_routing import DEFAULT_DIRECTION, recruiter_routing
+
+# Верхние границы интервалов гистограммы времени реакции, секунды (последний интервал — больше недели).
+# Менять только вместе с миграцией, пересчитывающей recruiter_latency_stats
+LATENCY_BUCKETS = (60, 300, 900, 1800, 3600, 7200, 14400, 28800, 86400, 172800, 259200, 604800)
+
+LATENCY_TAKE = "take"
+LATENCY_DECISION = "decision"
+
+DEFAULT_REPORT_DAYS = 7
+MAX_REPORT_DAYS = 365
+
+
+def parse_report_days(args: Optional[str]) -> Optional[int]:
+    """Аргумент команды /stats [дни]: число дней (по умолчанию DEFAULT_REPORT_DAYS) или None, если формат неверный."""
+    args = (args or "").strip()
+    if not args:
+        return DEFAULT_REPORT_DAYS
+    return int(args) if args.isdigit() else None
+
+
+def latency_bucket(seconds):
+    """SQL-выражение: номер интервала LATENCY_BUCKETS для длительности в секундах."""
+    return case(
+        *[(seconds <= bound, index) for index, bound in enumerate(LATENCY_BUCKETS)],
+        else_=len(LATENCY_BUCKETS)
+    )
+
+
+def rollup_ctes(changed: CTE, new_status: ApplicationStatus, recruiter_id: int, now: datetime) -> tuple[CTE, CTE]:
+    """
+    CTE для запроса смены статуса: прибавляют переход к дневным агрегатам рекрутера.
+    changed — строки, реально перешедшие в new_status, с колонками до изменения
+    (created_at, taken_at, direction); если перехода не было, агрегаты не меняются.
+    """
+    day = literal(now.date(), Date)
+    recruiter = literal(recruiter_id, BigInteger)
+    direction = func.coalesce(changed.c.direction, DEFAULT_DIRECTION)
+
+    daily = pg_insert(RecruiterDailyStats).from_select(
+        ["day", "recruiter_id", "direction", "taken", "invited", "rejected"],
+        select(
+            day,
+            recruiter,
+            direction,
+            literal(int(new_status == ApplicationStatus.IN_PROGRESS), Integer),
+            literal(int(new_status == ApplicationStatus.INVITED), Integer),
+            literal(int(new_status == ApplicationStatus.REJECTED), Integer),
+        ).select_from(changed)
+    )
+    daily = daily.on_conflict_do_update(
+        index_elements=["day", "recruiter_id", "direction"],
+        set_={
+            "taken": RecruiterDailyStats.taken + daily.excluded.taken,
+            "invited": RecruiterDailyStats.invited + daily.excluded.invited,
+            "rejected": RecruiterDailyStats.rejected + daily.excluded.rejected,
+        }
+    ).cte("daily_stats")
+
+    # Взятие считается от создания отклика, решение — от взятия в работу
+    if new_status == ApplicationStatus.IN_PROGRESS:
+        kind, started = LATENCY_TAKE, changed.c.created_at
+    else:
+        kind, started = LATENCY_DECISION, changed.c.taken_at
+    timed = (
+        select(direction.label("direction"), func.extract("epoch", literal(now, TIMESTAMP) - started).label("seconds"))
+        .select_from(changed)
+        .where(started.is_not(None))
+        .subquery("timed")
+    )
+
+    latency = pg_insert(RecruiterLatencyStats).from_select(
+        ["day", "recruiter_id", "direction", "kind", "bucket", "count"],
+        select(
+            day,
+            recruiter,
+            timed.c.direction,
+            literal(kind, String),
+            cast(latency_bucket(timed.c.seconds), SmallInteger),
+            literal(1, Integer),
+        )
+    )
+    latency = latency.on_conflict_do_update(
+        index_elements=["day", "recruiter_id", "direction", "kind", "bucket"],
+        set_={"count": RecruiterLatencyStats.count + latency.excluded.count}
+    ).cte("latency_stats")
+    return daily, latency
+
+
+def histogram_percentile(counts: Dict[int, int], q: float) -> Optional[float]:
+    """Перцентиль по гистограмме LATENCY_BUCKETS (линейная интерполяция внутри интервала)."""
+    total = sum(counts.values())
+    if not total:
+        return None
+    rank = q * total
+    cumulative = 0
+    for bucket in range(len(LATENCY_BUCKETS) + 1):
+        count = counts.get(bucket, 0)
+        if count and cumulative + count >= rank:
+            lower = LATENCY_BUCKETS[bucket - 1] if bucket else 0
+            if bucket == len(LATENCY_BUCKETS):
+                return float(lower)
+            return lower + (LATENCY_BUCKETS[bucket] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return float(LATENCY_BUCKETS[-1])
+
+
+@dataclass
+class RecruiterStats:
+    recruiter_id: int
+    taken: int = 0
+    invited: int = 0
+    rejected: int = 0
+    # kind -> bucket -> count
+    latency: Dict[str, Dict[int, int]] = field(default_factory=lambda: defaultdict(lambda: defaultdict(int)))
+
+    def percentile(self, kind: str, q: float) -> Optional[float]:
+        return histogram_percentile(self.latency.get(kind, {}), q)
+
+
+@dataclass
+class StatsReport:
+    days: int
+    since: date
+    recruiters: List[RecruiterStats]
+    directions: Dict[str, List[int]]  # направление -> [взято, приглашено, отказано]
+
+
+class StatsService:
+    """
+    Эффективность рекрутеров из дневных агрегатов (recruiter_daily_stats, recruiter_latency_stats),
+    которые update_application_status обновляет тем же запросом, что и статус.
+    Объем чтения зависит от числа дней в отчете, а не от размера истории заявок.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def recruiter_report(self, days: int = DEFAULT_REPORT_DAYS) -> StatsReport:
+        days = max(1, min(days, MAX_REPORT_DAYS))
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
+
+        recruiters: Dict[int, RecruiterStats] = {}
+        directions: Dict[str, List[int]] = defaultdict(lambda: [0, 0, 0])
+
+        counts = await self.session.execute(
+            select(
+                RecruiterDailyStats.recruiter_id,
+                RecruiterDailyStats.direction,
+                func.sum(RecruiterDailyStats.taken),
+                func.sum(RecruiterDailyStats.invited),
+                func.sum(RecruiterDailyStats.rejected),
+            )
+            .where(RecruiterDailyStats.day >= since)
+            .group_by(RecruiterDailyStats.recruiter_id, RecruiterDailyStats.direction)
+        )
+        for recruiter_id, direction, taken, invited, rejected in counts:
+            stats = recruiters.setdefault(recruiter_id, RecruiterStats(recruiter_id))
+            stats.taken += taken
+            stats.invited += invited
+            stats.rejected += rejected
+            totals = directions[direction]
+            totals[0] += taken
+            totals[1] += invited
+            totals[2] += rejected
+
+        latency = await self.session.execute(
+            select(
+                RecruiterLatencyStats.recruiter_id,
+                RecruiterLatencyStats.kind,
+                RecruiterLatencyStats.bucket,
+                func.sum(RecruiterLatencyStats.count),
+            )
+            .where(RecruiterLatencyStats.day >= since)
+            .group_by(RecruiterLatencyStats.recruiter_id, RecruiterLatencyStats.kind, RecruiterLatencyStats.bucket)
+        )
+        for recruiter_id, kind, bucket, count in latency:
+            stats = recruiters.setdefault(recruiter_id, RecruiterStats(recruiter_id))
+            stats.latency[kind][bucket] += count
+
+        ordered = sorted(recruiters.values(), key=lambda s: s.invited + s.rejected + s.taken, reverse=True)
+        return StatsReport(days=days, since=since, recruiters=ordered, directions=dict(directions))
+
+    async def format_report(self, report: StatsReport) -> str:
+        """Текст отчета без разметки (одинаково отправляется обоими ботами)."""
+        if not report.recruiters:
+            return f"За {report.days} дн. решений по заявкам не было."
+
+        await recruiter_routing.ensure_loaded(self.session)
+        usernames = {route.recruiter_tg_id: route.recruiter_username for route in recruiter_routing.routes()}
+
+        lines = [f"📊 Эффективность рекрутеров за {report.days} дн. (с {report.since:%d.%m.%Y}, UTC)", ""]
+        for stats in report.recruiters:
+            username = usernames.get(stats.recruiter_id)
+            name = f"@{username}" if username else str(stats.recruiter_id)
+            lines.append(
+                f"{name}: взято {stats.taken}, приглашено {stats.invited}, отказано {stats.rejected}"
+            )
+            lines.append(
+                f"   до взятия: p50 {format_duration(stats.percentile(LATENCY_TAKE, 0.5))}, "
+                f"p90 {format_duration(stats.percentile(LATENCY_TAKE, 0.9))}; "
+                f"до решения: p50 {format_duration(stats.percentile(LATENCY_DECISION, 0.5))}, "
+                f"p90 {format_duration(stats.percentile(LATENCY_DECISION, 0.9))}"
+            )
+
+        lines += ["", "По направлениям (взято / приглашено / отказано):"]
+        for direction, (taken, invited, rejected) in sorted(report.directions.items()):
+            lines.append(f"{direction}: {taken} / {invited} / {rejected}")
+        return "\n".join(lines)
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "—"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} мин"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f} ч"
+    return f"{seconds / 86400:.1f} дн"
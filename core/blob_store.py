@@ -0,0 +1,75 @@
+# core/blob_store.py
+import asyncio
+import os
+import shutil
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from core.config import settings
+
+
+class BlobStore(ABC):
+    """
+    Хранилище файлов по ключу. Содержимое сначала пишется во временный файл в staging_dir
+    (поточно, без чтения в память), затем put() публикует его под ключом.
+    """
+
+    # Каталог для временных файлов (None — системный tmp)
+    staging_dir: Optional[str] = None
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def put(self, key: str, path: str):
+        """Публикует файл path под ключом key; файл path после вызова может быть перемещен."""
+
+    def url(self, key: str) -> Optional[str]:
+        """Внешняя ссылка на объект (None, если хранилище наружу не раздается)."""
+        return None
+
+
+class LocalBlobStore(BlobStore):
+    """Каталог на диске; объекты публикуются атомарным переименованием временного файла."""
+
+    def __init__(self, root: str, public_base_url: str = ""):
+        self.root = os.path.abspath(root)
+        self.public_base_url = public_base_url.rstrip("/")
+        # Временные файлы на той же файловой системе, чтобы os.replace был атомарным
+        self.staging_dir = os.path.join(self.root, ".staging")
+        os.makedirs(self.staging_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid blob key: {key}")
+        return path
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(os.path.exists, self._path(key))
+
+    async def put(self, key: str, path: str):
+        await asyncio.to_thread(self._put, self._path(key), path)
+
+    @staticmethod
+    def _put(target: str, path: str):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.replace(path, target)
+        except OSError:
+            # Другая файловая система — копия во временный файл рядом и переименование
+            shutil.copyfile(path, target + ".part")
+            os.replace(target + ".part", target)
+
+    def url(self, key: str) -> Optional[str]:
+        if not self.public_base_url:
+            return None
+        return f"{self.public_base_url}/{key}"
+
+
+def create_blob_store() -> BlobStore:
+    """Хранилище резюме согласно настройке RESUME_STORE."""
+    if settings.RESUME_STORE == "local":
+        return LocalBlobStore(settings.RESUME_STORE_PATH, settings.RESUME_PUBLIC_BASE_URL)
+    raise ValueError(f"Unknown RESUME_STORE: {settings.RESUME_STORE}")
@@ -0,0 +1,104 @@
+# core/cache.py
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """Внутрипроцессный read-through кэш с TTL, ограничением размера (LRU) и счетчиками попаданий."""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        # Загрузки "в полете": параллельные промахи по одному ключу ждут один запрос к БД
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # Версии пространств ключей: растут при каждой инвалидации (для ключей производных кэшей)
+        self._generations: Dict[str, int] = {}
+        self._clears = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Возвращает значение из кэша, при промахе загружает его через loader (один раз на ключ).
+        Загрузка идет отдельной задачей: отмена вызывающего, который ее начал, не отменяет ее
+        для остальных ожидающих этот ключ.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = self._inflight[key] = asyncio.create_task(self._load(key, loader))
+            # Ожидающих может не остаться (все отменены): ошибку загрузки забираем сами
+            inflight.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return await asyncio.shield(inflight)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        task = asyncio.current_task()
+        try:
+            value = await loader()
+            # Если во время загрузки кэш инвалидировали, не сохраняем устаревшее значение
+            if self._inflight.get(key) is task:
+                self.set(key, value)
+            return value
+        finally:
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+
+    def generation(self, namespace: str) -> int:
+        return self._generations.get(namespace, 0) + self._clears
+
+    def invalidate(self, key: Hashable):
+        self._data.pop(key, None)
+        self._inflight.pop(key, None)
+        if isinstance(key, tuple) and key:
+            self._generations[key[0]] = self._generations.get(key[0], 0) + 1
+
+    def invalidate_namespace(self, namespace: str):
+        """Удаляет все ключи вида (namespace, ...)."""
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        for key in [k for k in self._data if isinstance(k, tuple) and k and k[0] == namespace]:
+            del self._data[key]
+        for key in [k for k in self._inflight if isinstance(k, tuple) and k and k[0] == namespace]:
+            del self._inflight[key]
+
+    def clear(self):
+        self._data.clear()
+        self._inflight.clear()
+        self._clears += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
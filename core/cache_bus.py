@@ -0,0 +1,136 @@
+# core/cache_bus.py
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+import asyncpg
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.db import call_after_commit, engine
+
+# Один канал на таблицу: cache_invalidate_<table>
+CHANNEL_PREFIX = "cache_invalidate_"
+
+# Обработчик получает payload уведомления или None, если нужно сбросить все
+# (после переподключения часть уведомлений могла быть потеряна)
+InvalidationHandler = Callable[[Optional[str]], None]
+
+
+class InvalidationBus:
+    """Межпроцессная инвалидация кэшей через Postgres LISTEN/NOTIFY."""
+
+    def __init__(
+        self,
+        health_interval: float,
+        health_timeout: float,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+    ):
+        self._handlers: Dict[str, List[InvalidationHandler]] = defaultdict(list)
+        self._health_interval = health_interval
+        self._health_timeout = health_timeout
+        self._reconnect_delay = reconnect_delay
+        self._max_reconnect_delay = max_reconnect_delay
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, table: str, handler: InvalidationHandler):
+        self._handlers[table].append(handler)
+
+    async def notify(self, session: AsyncSession, table: str, payload: str = ""):
+        """
+        Отправляет NOTIFY в транзакции сессии: слушатели получат его только после COMMIT.
+        Обработчики своего процесса вызываются тогда же (через хук сессии после COMMIT).
+        """
+        await session.execute(select(func.pg_notify(CHANNEL_PREFIX + table, payload)))
+        call_after_commit(session, lambda: self.dispatch(table, payload or None))
+
+    def dispatch(self, table: str, payload: Optional[str]):
+        """Вызывает локальные обработчики таблицы (используется и для инвалидации в своем процессе)."""
+        for handler in self._handlers.get(table, []):
+            try:
+                handler(payload)
+            except Exception as e:
+                logging.error(f"Cache invalidation handler for '{table}' failed: {e}")
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str):
+        self.dispatch(channel[len(CHANNEL_PREFIX):], payload)
+
+    async def _listen_forever(self):
+        # Отдельное соединение вне пула движка: LISTEN держит его всю жизнь процесса
+        # Через pgbouncer в режиме transaction LISTEN не работает — нужен прямой адрес Postgres
+        url = make_url(settings.DATABASE_DIRECT_URL) if settings.DATABASE_DIRECT_URL else engine.url
+        dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+        delay = self._reconnect_delay
+
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                for table in self._handlers:
+                    await connection.add_listener(CHANNEL_PREFIX + table, self._on_notification)
+
+                # Пока соединения не было, уведомления могли потеряться
+                for table in list(self._handlers):
+                    self.dispatch(table, None)
+
+                logging.info(f"Cache invalidation bus is listening: {', '.join(self._handlers)}")
+                delay = self._reconnect_delay
+                await self._watch(connection, lost)
+                logging.warning("Cache invalidation bus connection lost, reconnecting...")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Cache invalidation bus error: {e}")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    try:
+                        await connection.close(timeout=self._health_timeout)
+                    except Exception:
+                        # Полуоткрытое соединение не ответит на штатное закрытие
+                        connection.terminate()
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self._max_reconnect_delay)
+
+    async def _watch(self, connection: asyncpg.Connection, lost: asyncio.Event):
+        """
+        Ждет потери соединения. Обрыв, о котором сокет не узнал (NAT, простой в pgbouncer/балансировщике),
+        находит периодический SELECT 1: без ответа за health_timeout соединение считается потерянным.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(lost.wait(), timeout=self._health_interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await asyncio.wait_for(connection.fetchval("SELECT 1"), timeout=self._health_timeout)
+            except (asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError, OSError) as e:
+                logging.warning(f"Cache invalidation bus health check failed: {e!r}")
+                return
+
+
+# Единственный экземпляр на процесс
+invalidation_bus = InvalidationBus(
+    health_interval=settings.CACHE_BUS_HEALTH_INTERVAL,
+    health_timeout=settings.CACHE_BUS_HEALTH_TIMEOUT,
+)
@@ -1,18 +1,52 @@
 # core/db.py
+import logging
+from typing import Callable
+from uuid import uuid4
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 from core.config import settings
+from core.db_instrumentation import InstrumentedPool, instrument_engine, register_pool_metrics
 
 # Базовый класс для всех ORM-моделей
 class Base(DeclarativeBase):
     pass
 
+
+def engine_options() -> dict:
+    """Параметры пула и драйвера из настроек."""
+    options = dict(
+        poolclass=InstrumentedPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    if settings.DB_PGBOUNCER:
+        # В transaction pooling соседние транзакции попадают на разные серверные соединения:
+        # prepared statements нельзя кэшировать, а их имена должны быть уникальными
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return options
+
+
 # Асинхронный движок
 engine = create_async_engine(
     settings.DATABASE_URL,
-    echo=False # Установите True для логирования SQL-запросов
+    echo=False, # Установите True для логирования SQL-запросов
+    **engine_options()
 )
 
+
+# Время, счетчики и лог медленных SQL-запросов; состояние пула
+instrument_engine(engine.sync_engine, slow_query_ms=settings.DB_SLOW_QUERY_MS)
+register_pool_metrics(engine.sync_engine)
+
 # Асинхронный класс фабрики сессий
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -21,7 +55,32 @@ AsyncSessionLocal = async_sessionmaker(
     class_=AsyncSession
 )
 
-async def init_db():
-    """Создает таблицы, если они не существуют."""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+_AFTER_COMMIT = "after_commit_callbacks"
+
+
+def call_after_commit(session: AsyncSession, callback: Callable[[], None]):
+    """
+    Вызывает callback после COMMIT текущей транзакции сессии; при откате callback отбрасывается.
+    Для побочных эффектов внутри процесса (разбудить фоновую задачу, сбросить локальный кэш),
+    которые не должны срабатывать раньше, чем изменения станут видны другим соединениям.
+    """
+    sync_session = session.sync_session
+    if _AFTER_COMMIT not in sync_session.info:
+        sync_session.info[_AFTER_COMMIT] = []
+        event.listen(sync_session, "after_commit", _run_after_commit)
+        event.listen(sync_session, "after_rollback", _drop_after_commit)
+    sync_session.info[_AFTER_COMMIT].append(callback)
+
+
+def _run_after_commit(sync_session):
+    callbacks = sync_session.info[_AFTER_COMMIT]
+    pending, callbacks[:] = list(callbacks), []
+    for callback in pending:
+        try:
+            callback()
+        except Exception as e:
+            logging.error(f"After-commit callback failed: {e}")
+
+
+def _drop_after_commit(sync_session):
+    sync_session.info[_AFTER_COMMIT].clear()
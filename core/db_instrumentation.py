@@ -0,0 +1,92 @@
+# core/db_instrumentation.py
+import logging
+import re
+import time
+from functools import lru_cache
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from core import metrics
+
+logger = logging.getLogger("db.queries")
+
+_WHITESPACE = re.compile(r"\s+")
+# Списки параметров/строк VALUES разной длины схлопываются, чтобы один и тот же запрос
+# с IN (...) на 3 и на 30 элементов считался одним
+_PARAM_LIST = re.compile(r"\(\s*(?:\$\d+|%\(\w+\)s|\?)(?:::\w+(?:\s\w+)*)?(?:\s*,\s*(?:\$\d+|%\(\w+\)s|\?)(?:::\w+(?:\s\w+)*)?)+\s*\)")
+_VALUES_ROWS = re.compile(r"(VALUES\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+_NUMBER = re.compile(r"\b\d+\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(statement: str) -> str:
+    """SQL без литералов и с одной строкой вместо списков параметров — ключ для группировки запросов."""
+    sql = _WHITESPACE.sub(" ", statement).strip()
+    sql = _STRING.sub("?", sql)
+    sql = _VALUES_ROWS.sub(r"\1, ...", sql)
+    sql = _PARAM_LIST.sub("(...)", sql)
+    return _NUMBER.sub("?", sql)
+
+
+def instrument_engine(engine: Engine, slow_query_ms: float):
+    """
+    Хуки на каждый SQL-запрос: время (гистограмма и доля в хендлере), счетчики запросов текущего апдейта
+    для поиска N+1 (см. MetricsMiddleware) и лог медленных запросов с апдейтом и хендлером.
+    """
+    slow_query_seconds = slow_query_ms / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_started
+        metrics.DB_QUERY_DURATION.observe(value=elapsed)
+
+        update = metrics.current_update()
+        if update is not None:
+            update.timings[metrics.DB] += elapsed
+            update.queries[normalize_sql(statement)] += 1
+
+        if elapsed >= slow_query_seconds:
+            metrics.DB_SLOW_QUERIES.inc()
+            if update is not None:
+                origin = f"update {update.update_id} ({update.handler})"
+            else:
+                origin = "background"
+            logger.warning(f"Slow query {elapsed * 1000:.0f} ms in {origin}: {normalize_sql(statement)}")
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Пул соединений, измеряющий время ожидания свободного соединения."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metrics.DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.DB_POOL_WAIT.observe(value=elapsed)
+            metrics.record_dependency(metrics.DB_POOL, elapsed)
+
+
+def register_pool_metrics(engine: Engine):
+    """Текущее состояние пула выдается в /metrics (размер, выдано, overflow, свободно)."""
+
+    def collect():
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            return
+        metrics.DB_POOL_SIZE.set(value=pool.size())
+        metrics.DB_POOL_CHECKED_OUT.set(value=pool.checkedout())
+        metrics.DB_POOL_OVERFLOW.set(value=max(pool.overflow(), 0))
+        metrics.DB_POOL_CHECKED_IN.set(value=pool.checkedin())
+
+    metrics.registry.add_collector(collect)
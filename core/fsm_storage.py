@@ -0,0 +1,200 @@
+# core/fsm_storage.py
+import asyncio
+import copy
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import JSON, case, cast, delete, select
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from bot_welcome.models.db_models import FSMRecord
+from core.cache import TTLCache
+from core.config import settings
+from core.db import AsyncSessionLocal
+
+
+class PostgresStorage(BaseStorage):
+    """
+    FSM-хранилище aiogram в PostgreSQL поверх общего async-движка.
+    Переживает рестарты и позволяет держать несколько реплик бота.
+
+    Чтение может идти через небольшой локальный write-through кэш (FSM_CACHE_TTL > 0) —
+    только когда апдейты одного пользователя не попадают в разные процессы (см. fsm_cache_ttl).
+    """
+
+    def __init__(
+        self,
+        session_pool: async_sessionmaker,
+        state_ttl: float,
+        cache_ttl: float,
+        cache_size: int,
+        key_builder: Optional[KeyBuilder] = None,
+        purge_interval: float = 600.0,
+    ):
+        self.session_pool = session_pool
+        self.state_ttl = state_ttl
+        self.key_builder = key_builder or DefaultKeyBuilder(
+            with_bot_id=True, with_business_connection_id=True, with_destiny=True
+        )
+        self._cache = TTLCache(ttl=cache_ttl, max_size=cache_size) if cache_ttl > 0 else None
+        self._purge_interval = purge_interval
+        self._last_purge = 0.0
+        self._purge_task: Optional[asyncio.Task] = None
+
+    # --- BaseStorage ---
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._write(key, "state", state.state if isinstance(state, State) else state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = await self._read(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(f"Data must be a dict or dict-like object, got {type(data).__name__}")
+        await self._write(key, "data", data)
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> Dict[str, Any]:
+        # Слияние на стороне БД (data || patch) одной командой, без чтения текущих данных
+        _, merged = await self._write(key, "data", data, merge=True)
+        return copy.deepcopy(merged)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data = await self._read(key)
+        # Копия: хендлер может менять вложенные структуры, не затрагивая кэш
+        return copy.deepcopy(data)
+
+    async def close(self) -> None:
+        if self._purge_task is not None and not self._purge_task.done():
+            await self._purge_task
+
+    # --- Чтение/запись ---
+
+    async def _read(self, key: StorageKey) -> tuple[Optional[str], Dict[str, Any]]:
+        record_key = self.key_builder.build(key)
+        if self._cache is None:
+            return await self._load(record_key)
+        return await self._cache.get_or_load(record_key, lambda: self._load(record_key))
+
+    async def _load(self, record_key: str) -> tuple[Optional[str], Dict[str, Any]]:
+        async with self.session_pool() as session:
+            result = await session.execute(
+                select(FSMRecord.state, FSMRecord.data)
+                .where(FSMRecord.key == record_key)
+                .where(FSMRecord.updated_at >= datetime.utcnow() - timedelta(seconds=self.state_ttl))
+            )
+            row = result.first()
+        if row is None:
+            return None, {}
+        return row.state, row.data or {}
+
+    async def _write(
+        self, key: StorageKey, column: str, value: Any, merge: bool = False
+    ) -> tuple[Optional[str], Dict[str, Any]]:
+        """
+        Записывает один столбец (state или data) одной командой INSERT ... ON CONFLICT DO UPDATE, без чтения:
+        параллельные set_state и set_data не затирают столбцы друг друга. Запись старше state_ttl считается
+        пустой (как при чтении) — ее второй столбец сбрасывается. merge=True — data сливается с сохраненной
+        (dict.update). Возвращает запись после изменения.
+        """
+        record_key = self.key_builder.build(key)
+        if column == "data":
+            # Данные хранятся как JSON: нормализуем их сразу (например, int-ключи словарей
+            # становятся строками), чтобы кэш и БД всегда отдавали одно и то же
+            value = json.loads(json.dumps(value))
+
+        now = datetime.utcnow()
+        expired = FSMRecord.updated_at < now - timedelta(seconds=self.state_ttl)
+        values = {"key": record_key, "state": None, "data": {}, "updated_at": now}
+        values[column] = value
+        statement = insert(FSMRecord).values(**values)
+        excluded = statement.excluded
+        if column == "state":
+            set_ = {"state": excluded.state, "data": case((expired, excluded.data), else_=FSMRecord.data)}
+        else:
+            data = excluded.data
+            if merge:
+                data = case(
+                    (expired, excluded.data),
+                    else_=cast(cast(FSMRecord.data, JSONB).op("||")(cast(excluded.data, JSONB)), JSON),
+                )
+            set_ = {"data": data, "state": case((expired, excluded.state), else_=FSMRecord.state)}
+        set_["updated_at"] = now
+
+        async with self.session_pool() as session:
+            result = await session.execute(
+                statement.on_conflict_do_update(index_elements=[FSMRecord.key], set_=set_)
+                .returning(FSMRecord.state, FSMRecord.data)
+            )
+            row = result.one()
+            state, data = row.state, row.data or {}
+            if state is None and not data:
+                # Пустая запись (после state.clear()) не хранится; строка заблокирована нашим UPSERT
+                await session.execute(delete(FSMRecord).where(FSMRecord.key == record_key))
+            await session.commit()
+
+        if self._cache is not None:
+            self._cache.set(record_key, (state, data))
+        self._maybe_purge()
+        return state, data
+
+    # --- Удаление простаивающих ключей ---
+
+    def _maybe_purge(self):
+        now = time.monotonic()
+        if now - self._last_purge < self._purge_interval:
+            return
+        if self._purge_task is not None and not self._purge_task.done():
+            return
+        self._last_purge = now
+        self._purge_task = asyncio.create_task(self.purge_expired())
+
+    async def purge_expired(self) -> int:
+        """Удаляет состояния, не менявшиеся дольше state_ttl."""
+        try:
+            async with self.session_pool() as session:
+                result = await session.execute(
+                    delete(FSMRecord).where(
+                        FSMRecord.updated_at < datetime.utcnow() - timedelta(seconds=self.state_ttl)
+                    )
+                )
+                await session.commit()
+            if result.rowcount:
+                logging.info(f"FSM storage: purged {result.rowcount} idle states.")
+            return result.rowcount
+        except Exception as e:
+            logging.error(f"FSM storage purge failed: {e}")
+            return 0
+
+
+def fsm_cache_ttl() -> float:
+    """
+    TTL локального кэша FSM. В режиме webhook апдейты одного пользователя может принять любой процесс
+    (WEBHOOK_WORKERS с SO_REUSEPORT, несколько реплик за балансировщиком) — кэш там отдавал бы
+    устаревшее состояние, поэтому выключается независимо от настройки.
+    """
+    if settings.FSM_CACHE_TTL > 0 and (settings.BOT_MODE == "webhook" or settings.WEBHOOK_WORKERS > 1):
+        logging.warning("FSM_CACHE_TTL is ignored in webhook mode: FSM read cache disabled.")
+        return 0
+    return settings.FSM_CACHE_TTL
+
+
+def create_fsm_storage() -> BaseStorage:
+    """Хранилище FSM согласно настройке FSM_STORAGE ('postgres' или 'memory' для локальной разработки)."""
+    if settings.FSM_STORAGE == "memory":
+        return MemoryStorage()
+    return PostgresStorage(
+        session_pool=AsyncSessionLocal,
+        state_ttl=settings.FSM_STATE_TTL,
+        cache_ttl=fsm_cache_ttl(),
+        cache_size=settings.FSM_CACHE_SIZE,
+    )
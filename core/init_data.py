@@ -11,7 +11,7 @@ async def insert_initial_data(session: AsyncSession):
     app_service = ApplicationService(session)
     content_service = ContentService(session)
 
-    python_recruiter = await app_service.get_recruiter_by_direction('python')
+    python_recruiter = await app_service.get_recruiter_by_direction('python', use_default=False)
     if not python_recruiter:
         await app_service.add_update_recruiter(
             direction='python',
@@ -20,7 +20,7 @@ async def insert_initial_data(session: AsyncSession):
         )
         logging.info("Inserted Python recruiter mapping.")
 
-    if not await app_service.get_recruiter_by_direction('java'):
+    if not await app_service.get_recruiter_by_direction('java', use_default=False):
         await app_service.add_update_recruiter(
             direction='java',
             tg_id=8888888888,
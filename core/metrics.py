@@ -0,0 +1,253 @@
+# core/metrics.py
+import contextvars
+import logging
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from aiohttp import web
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[LabelValues, float] = defaultdict(float)
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self.values[labels] += amount
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, k)} {v}" for k, v in self.values.items()]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[LabelValues, float] = defaultdict(float)
+
+    def set(self, *labels: str, value: float):
+        self.values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self.values[labels] += amount
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.values[labels] -= amount
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, k)} {v}" for k, v in self.values.items()]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        # Для каждого набора меток: счетчики по бакетам (не кумулятивные), сумма, количество
+        self.values: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, *labels: str, value: float):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [[0] * len(self.buckets), 0.0, 0]
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[0][index] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = []
+        for labels, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(self.label_names, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            bucket_labels = _format_labels(self.label_names, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса в текстовом формате Prometheus (без внешних зависимостей)."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Функция, обновляющая gauge-метрики непосредственно перед выдачей (глубина очередей и т.п.)."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logging.error(f"Metrics collector failed: {e}")
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# --- Метрики ---
+
+HANDLER_DURATION = registry.histogram(
+    "bot_handler_duration_seconds", "Handler latency.", ["bot", "handler"])
+HANDLER_RESULTS = registry.counter(
+    "bot_handler_total", "Processed updates by handler and result.", ["bot", "handler", "result"])
+HANDLER_TIME_SPLIT = registry.counter(
+    "bot_handler_dependency_seconds_total", "Handler time spent in DB, recruiting API and Telegram calls.",
+    ["bot", "handler", "dependency"])
+UPDATES_IN_FLIGHT = registry.gauge(
+    "bot_updates_in_flight", "Updates being processed right now.", ["bot"])
+
+DB_QUERY_DURATION = registry.histogram(
+    "db_query_duration_seconds", "SQL statement latency.")
+DB_SLOW_QUERIES = registry.counter(
+    "db_slow_queries_total", "SQL statements slower than DB_SLOW_QUERY_MS.")
+UPDATE_DB_QUERIES = registry.histogram(
+    "bot_update_db_queries", "SQL statements issued while handling one update.", ["bot", "handler"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55))
+DB_POOL_WAIT = registry.histogram(
+    "db_pool_wait_seconds", "Time to get a connection from the pool.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+DB_POOL_TIMEOUTS = registry.counter(
+    "db_pool_timeouts_total", "Pool checkouts that hit DB_POOL_TIMEOUT.")
+DB_POOL_SIZE = registry.gauge("db_pool_size", "Configured pool size.")
+DB_POOL_CHECKED_OUT = registry.gauge("db_pool_checked_out", "Connections in use.")
+DB_POOL_OVERFLOW = registry.gauge("db_pool_overflow", "Connections open above the pool size.")
+DB_POOL_CHECKED_IN = registry.gauge("db_pool_checked_in", "Idle connections in the pool.")
+UPDATE_DB_TIME = registry.histogram(
+    "bot_update_db_seconds", "Total SQL time while handling one update.", ["bot", "handler"])
+API_REQUEST_DURATION = registry.histogram(
+    "recruiting_api_request_duration_seconds", "Recruiting API request latency.", ["method", "status"])
+TELEGRAM_REQUEST_DURATION = registry.histogram(
+    "telegram_request_duration_seconds", "Telegram Bot API request latency.", ["method"])
+
+# Зависимости, на которые раскладывается время хендлера
+DB = "db"
+DB_POOL = "db_pool"  # ожидание свободного соединения
+API = "api"
+TELEGRAM = "telegram"
+
+
+@dataclass
+class UpdateContext:
+    """Данные текущего апдейта: какой хендлер его обработал и сколько времени ушло на зависимости."""
+    update_id: Optional[int] = None
+    handler: str = "unhandled"
+    timings: Dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    queries: Dict[str, int] = field(default_factory=lambda: defaultdict(int))  # нормализованный SQL -> сколько раз
+
+
+# Ставится MetricsMiddleware на время обработки апдейта
+_current_update: contextvars.ContextVar[Optional[UpdateContext]] = contextvars.ContextVar(
+    "current_update", default=None
+)
+
+
+def start_update(update_id: Optional[int] = None) -> Tuple[UpdateContext, contextvars.Token]:
+    context = UpdateContext(update_id=update_id)
+    return context, _current_update.set(context)
+
+
+def finish_update(token: contextvars.Token):
+    _current_update.reset(token)
+
+
+def current_update() -> Optional[UpdateContext]:
+    return _current_update.get()
+
+
+def record_dependency(dependency: str, seconds: float, context: Optional[UpdateContext] = None):
+    """Добавляет время вызова зависимости к апдейту (по умолчанию текущему; вне апдейта — ничего не делает)."""
+    context = context or _current_update.get()
+    if context is not None:
+        context.timings[dependency] += seconds
+
+
+@contextmanager
+def track_dependency(dependency: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_dependency(dependency, time.perf_counter() - started)
+
+
+# --- HTTP-эндпоинт ---
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+
+async def start_metrics_server(host: str, port: int) -> Optional[web.AppRunner]:
+    """Поднимает локальный /metrics (port=0 — выключено). Возвращает runner для остановки."""
+    if not port:
+        return None
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logging.info(f"Metrics endpoint on http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,181 @@
+# core/migrations.py
+"""
+Версионные миграции схемы БД.
+
+Скрипты лежат в пакете MIGRATIONS_PACKAGE и называются v<номер>_<описание>.py; в каждом есть
+async def upgrade(conn) и, для операций вне транзакции (CREATE INDEX CONCURRENTLY), TRANSACTIONAL = False.
+Примененные версии записываются в schema_migrations. Применение:
+
+    python -m core.migrations            # применить недостающие
+    python -m core.migrations --status   # показать версии
+"""
+import argparse
+import asyncio
+import importlib
+import logging
+import pkgutil
+import re
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from core.config import settings
+
+MIGRATIONS_PACKAGE = "bot_welcome.models.migrations"
+VERSION_TABLE = "schema_migrations"
+# Ключ pg_advisory_lock: миграции из нескольких процессов/реплик применяются по очереди
+LOCK_KEY = 7_301_925
+
+_MODULE_NAME = re.compile(r"v(\d+)_(\w+)")
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[AsyncConnection], Awaitable[None]]
+    transactional: bool = True
+
+
+def load_migrations(package: str = MIGRATIONS_PACKAGE) -> List[Migration]:
+    """Скрипты миграций пакета, по возрастанию версии."""
+    module = importlib.import_module(package)
+    migrations = {}
+    for info in pkgutil.iter_modules(module.__path__):
+        match = _MODULE_NAME.fullmatch(info.name)
+        if match is None:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f"Duplicate migration version {version}: {info.name}")
+        script = importlib.import_module(f"{package}.{info.name}")
+        migrations[version] = Migration(
+            version=version,
+            name=match.group(2),
+            upgrade=script.upgrade,
+            transactional=getattr(script, "TRANSACTIONAL", True),
+        )
+    return [migrations[version] for version in sorted(migrations)]
+
+
+async def applied_versions(conn: AsyncConnection) -> List[int]:
+    """Примененные версии (пусто, если таблицы версий еще нет)."""
+    if await conn.scalar(text("SELECT to_regclass(:table)"), {"table": VERSION_TABLE}) is None:
+        return []
+    result = await conn.execute(text(f"SELECT version FROM {VERSION_TABLE} ORDER BY version"))
+    return list(result.scalars())
+
+
+async def create_index_concurrently(conn: AsyncConnection, name: str, table: str, columns: str):
+    """
+    CREATE INDEX CONCURRENTLY без блокировки записи в таблицу (соединение должно быть в AUTOCOMMIT).
+    Индекс, оставшийся INVALID после прерванной сборки, удаляется и строится заново.
+    """
+    valid = await conn.scalar(
+        text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"), {"name": name}
+    )
+    if valid is False:
+        logging.warning(f"Index {name} is invalid (interrupted build), rebuilding.")
+        await conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+    await conn.execute(text(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "{table}" ({columns})'))
+
+
+def _migration_engine() -> AsyncEngine:
+    # Advisory lock держится на сессии соединения — через pgbouncer (transaction) нужен прямой адрес
+    return create_async_engine(settings.DATABASE_DIRECT_URL or settings.DATABASE_URL, poolclass=NullPool)
+
+
+async def migrate(target: Optional[int] = None) -> List[int]:
+    """Применяет недостающие миграции (до target включительно). Возвращает примененные версии."""
+    migrations = [m for m in load_migrations() if target is None or m.version <= target]
+    engine = _migration_engine()
+    done = []
+    try:
+        async with engine.connect() as lock_conn:
+            lock_conn = await lock_conn.execution_options(isolation_level="AUTOCOMMIT")
+            await lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": LOCK_KEY})
+            try:
+                await lock_conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+                    "version INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, "
+                    "applied_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'))"
+                ))
+                applied = set(await applied_versions(lock_conn))
+                for migration in migrations:
+                    if migration.version in applied:
+                        continue
+                    logging.info(f"Applying migration {migration.version} ({migration.name})...")
+                    await _apply(engine, migration)
+                    done.append(migration.version)
+            finally:
+                await lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LOCK_KEY})
+    finally:
+        await engine.dispose()
+    return done
+
+
+async def _apply(engine: AsyncEngine, migration: Migration):
+    record = text(f"INSERT INTO {VERSION_TABLE} (version, name) VALUES (:version, :name)")
+    params = {"version": migration.version, "name": migration.name}
+    if migration.transactional:
+        # Изменения схемы и запись версии — одна транзакция
+        async with engine.begin() as conn:
+            await migration.upgrade(conn)
+            await conn.execute(record, params)
+        return
+
+    # Вне транзакции шаги должны быть идемпотентными: после сбоя миграция запускается заново
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await migration.upgrade(conn)
+        await conn.execute(record, params)
+
+
+async def check_schema(engine: AsyncEngine):
+    """
+    Проверка при старте: в БД применены все миграции, известные коду (create_all больше не выполняется).
+    Сверяется каждая версия, а не только последняя: пропущенная промежуточная миграция тоже ошибка.
+    """
+    expected = {m.version: m.name for m in load_migrations()}
+    async with engine.connect() as conn:
+        applied = set(await applied_versions(conn))
+    missing = sorted(set(expected) - applied)
+    if missing:
+        names = ", ".join(f"{version} ({expected[version]})" for version in missing)
+        raise RuntimeError(
+            f"Database schema is missing migrations: {names}. "
+            f"Run migrations first: python -m core.migrations"
+        )
+    unknown = sorted(applied - set(expected))
+    if unknown:
+        logging.warning(f"Database has migrations unknown to the code: {unknown} (schema is newer than the code).")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Миграции схемы БД")
+    parser.add_argument("--status", action="store_true", help="показать примененные и ожидающие версии")
+    parser.add_argument("--target", type=int, default=None, help="применить миграции до этой версии")
+    args = parser.parse_args()
+
+    if args.status:
+        engine = _migration_engine()
+        try:
+            async with engine.connect() as conn:
+                applied = set(await applied_versions(conn))
+        finally:
+            await engine.dispose()
+        for migration in load_migrations():
+            mark = "applied" if migration.version in applied else "pending"
+            print(f"{migration.version:04d} {migration.name:<40} {mark}")
+        return
+
+    done = await migrate(args.target)
+    logging.info(f"Applied migrations: {done}" if done else "Schema is up to date.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
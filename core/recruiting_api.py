@@ -0,0 +1,92 @@
+# core/recruiting_api.py
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from core import metrics
+from core.config import settings
+
+
+class RecruitingAPIClient:
+    """Клиент рекрутинговой системы с одним долгоживущим пулом соединений на процесс."""
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int,
+        keepalive_timeout: float,
+        request_timeout: float,
+        connect_timeout: float,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"Content-Type": "application/json"}
+        self._pool_size = pool_size
+        self._keepalive_timeout = keepalive_timeout
+        self._timeout = aiohttp.ClientTimeout(total=request_timeout, connect=connect_timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Создается лениво: ClientSession должна появиться внутри работающего event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._pool_size,
+                keepalive_timeout=self._keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self._timeout,
+                headers=self.headers,
+            )
+        return self._session
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        payload: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> tuple[int, str]:
+        """
+        Выполняет запрос и возвращает (HTTP-статус, тело ответа).
+        Сетевые ошибки и таймауты пробрасываются как aiohttp.ClientError / asyncio.TimeoutError.
+        """
+        started = time.perf_counter()
+        status = "error"
+        try:
+            async with self._get_session().request(
+                method, f"{self.base_url}{path}", json=payload, headers=headers
+            ) as response:
+                status = str(response.status)
+                return response.status, await response.text()
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.API_REQUEST_DURATION.observe(method, status, value=elapsed)
+            metrics.record_dependency(metrics.API, elapsed)
+
+    async def create_application(self, payload: Dict[str, Any], idempotency_key: Optional[str] = None) -> tuple[int, str]:
+        """Создает карточку; повтор с тем же Idempotency-Key возвращает уже созданную."""
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        return await self.request("POST", "/api/applications", payload, headers=headers)
+
+    async def update_application_status(self, external_id: str, payload: Dict[str, Any]) -> tuple[int, str]:
+        return await self.request("PATCH", f"/api/applications/{external_id}/status", payload)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            # Даем коннектору корректно закрыть TCP/TLS-соединения
+            await asyncio.sleep(0.25)
+        self._session = None
+
+
+# Единственный клиент на процесс
+recruiting_api = RecruitingAPIClient(
+    base_url=settings.RECRUITING_API_URL,
+    pool_size=settings.RECRUITING_API_POOL_SIZE,
+    keepalive_timeout=settings.RECRUITING_API_KEEPALIVE,
+    request_timeout=settings.RECRUITING_API_TIMEOUT,
+    connect_timeout=settings.RECRUITING_API_CONNECT_TIMEOUT,
+)
@@ -0,0 +1,73 @@
+# core/render.py
+"""
+Отрисовка сообщений Telegram в MarkdownV2.
+
+Экранирование — replace только тех спецсимволов, которые есть в строке: на русском тексте это
+быстрее и str.translate (медленный путь для не-ASCII), и безусловного цикла replace
+(замеры — python -m benchmarks.render).
+Шаблоны разбираются один раз при импорте: статичный текст в них уже записан в MarkdownV2,
+а подставляемые значения экранируются при отрисовке. Готовую разметку (ссылки, вложенные
+шаблоны) передают как Markup — она вставляется без повторного экранирования.
+"""
+from string import Formatter
+from typing import Any, List, Optional, Tuple
+
+# Все символы, которые MarkdownV2 требует экранировать в обычном тексте; "\" — первым,
+# чтобы не удваивать добавленные экраны
+SPECIAL_CHARS = "\\_*[]()~`>#+-=|{}.!"
+_ESCAPES = tuple((char, "\\" + char) for char in SPECIAL_CHARS)
+# Внутри (...) ссылки экранируются только ")" и "\"
+_URL_ESCAPE_TABLE = str.maketrans({")": "\\)", "\\": "\\\\"})
+
+# Что показывать вместо пустого значения
+EMPTY = "Н/Д"
+
+
+class Markup(str):
+    """Строка, уже размеченная в MarkdownV2: escape() и шаблоны вставляют ее как есть."""
+
+
+def escape(value: Any, default: str = EMPTY) -> str:
+    """Текст для MarkdownV2: пустое значение -> default, пробелы по краям убираются."""
+    if isinstance(value, Markup):
+        return value
+    if value is None or value == "":
+        value = default
+    text = str(value).strip()
+    for char, escaped in _ESCAPES:
+        if char in text:
+            text = text.replace(char, escaped)
+    return text
+
+
+def escape_url(url: str) -> str:
+    return url.translate(_URL_ESCAPE_TABLE)
+
+
+def link(text: Any, url: str) -> Markup:
+    """Кликабельная ссылка [текст](url)."""
+    return Markup(f"[{escape(text)}]({escape_url(url)})")
+
+
+class Template:
+    """
+    Шаблон сообщения MarkdownV2 с полями {name}. Разбирается один раз в конструкторе;
+    render() только склеивает готовые куски с экранированными значениями.
+    Спецификации формата ({x:.1f}) не поддерживаются — значения форматируются до подстановки.
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        self._parts: List[Tuple[str, Optional[str]]] = []
+        for literal, field, spec, conversion in Formatter().parse(template):
+            if spec or conversion:
+                raise ValueError(f"Format specs are not supported in templates: {{{field}:{spec}}}")
+            self._parts.append((literal, field))
+
+    def render(self, **values: Any) -> Markup:
+        chunks = []
+        for literal, field in self._parts:
+            chunks.append(literal)
+            if field is not None:
+                chunks.append(escape(values[field]))
+        return Markup("".join(chunks))
@@ -0,0 +1,183 @@
+# core/resume_text.py
+"""
+Разбор резюме: извлечение текста (DOCX, PDF), теги навыков и оценка стажа.
+Функции выполняются в процессах пула анализа, поэтому модуль зависит только от стандартной
+библиотеки, core.text_matcher и pypdf (в requirements.txt; если его нет в окружении, PDF пропускаются
+с предупреждением в логе) и не читает настройки.
+"""
+import logging
+import re
+import zipfile
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+from xml.etree import ElementTree
+
+from core.text_matcher import PhraseMatcher
+
+try:
+    import pypdf
+except ImportError:  # pragma: no cover - окружение без зависимостей из requirements.txt
+    pypdf = None
+
+# Ограничения на один файл: защита от "zip-бомб" и огромных PDF
+MAX_DOCX_XML_SIZE = 20 * 1024 * 1024
+MAX_TEXT_CHARS = 200_000
+
+# Нормализованный тег -> варианты написания (в нижнем регистре)
+SKILL_ALIASES: Dict[str, Iterable[str]] = {
+    "python": ("python", "python3", "питон"),
+    "django": ("django",),
+    "fastapi": ("fastapi",),
+    "flask": ("flask",),
+    "java": ("java",),
+    "spring": ("spring", "spring boot"),
+    "kotlin": ("kotlin",),
+    "go": ("golang", "go lang"),
+    "c++": ("c++", "cpp"),
+    "c#": ("c#", "csharp", ".net", "dotnet"),
+    "javascript": ("javascript", "js", "ecmascript"),
+    "typescript": ("typescript", "ts"),
+    "react": ("react", "reactjs", "react.js"),
+    "vue": ("vue", "vuejs", "vue.js"),
+    "angular": ("angular",),
+    "node.js": ("node", "nodejs", "node.js"),
+    "php": ("php", "laravel", "symfony"),
+    "swift": ("swift",),
+    "sql": ("sql",),
+    "postgresql": ("postgresql", "postgres", "postgre"),
+    "mysql": ("mysql",),
+    "mongodb": ("mongodb", "mongo"),
+    "redis": ("redis",),
+    "kafka": ("kafka",),
+    "docker": ("docker",),
+    "kubernetes": ("kubernetes", "k8s"),
+    "linux": ("linux",),
+    "git": ("git",),
+    "ci/cd": ("ci/cd", "gitlab ci", "github actions", "jenkins"),
+    "aws": ("aws", "amazon web services"),
+    "machine learning": ("machine learning", "ml", "машинное обучение"),
+    "pandas": ("pandas",),
+    "figma": ("figma",),
+    "qa": ("qa", "тестирование", "testing"),
+    "selenium": ("selenium",),
+    "1c": ("1с", "1c"),
+}
+
+_SKILL_MATCHER = PhraseMatcher({alias: tag for tag, aliases in SKILL_ALIASES.items() for alias in aliases})
+
+_YEARS_WORDS = r"(?:год|года|лет|years?|yrs?)"
+_EXPLICIT_YEARS = (
+    re.compile(rf"(?:опыт\w*|стаж\w*|experience)\D{{0,40}}?(\d{{1,2}}(?:[.,]\d)?)\s*\+?\s*{_YEARS_WORDS}", re.IGNORECASE),
+    re.compile(rf"(\d{{1,2}}(?:[.,]\d)?)\s*\+?\s*{_YEARS_WORDS}\s+(?:of\s+)?(?:опыт\w*|experience)", re.IGNORECASE),
+)
+_PERIOD = re.compile(
+    r"(?:(\d{1,2})[./])?((?:19|20)\d{2})\s*(?:-|–|—|по|to)\s*"
+    r"(?:(?:(\d{1,2})[./])?((?:19|20)\d{2})|(н\.?\s*в\.?|наст\w*|сейчас|present|now|current\w*))",
+    re.IGNORECASE,
+)
+MAX_YEARS = 50.0
+
+
+def extract_text(path: str, file_name: str = "", max_pages: int = 30) -> str:
+    """Текст резюме по расширению файла; неподдерживаемый формат — пустая строка."""
+    name = (file_name or path).lower()
+    if name.endswith(".docx"):
+        return _docx_text(path)[:MAX_TEXT_CHARS]
+    if name.endswith(".pdf"):
+        if pypdf is None:
+            logging.warning(f"pypdf is not installed, PDF resume {file_name or path} is not analyzed.")
+            return ""
+        return _pdf_text(path, max_pages)[:MAX_TEXT_CHARS]
+    return ""
+
+
+def _docx_text(path: str) -> str:
+    with zipfile.ZipFile(path) as archive:
+        info = archive.getinfo("word/document.xml")
+        if info.file_size > MAX_DOCX_XML_SIZE:
+            return ""
+        root = ElementTree.fromstring(archive.read(info))
+    paragraphs = []
+    for paragraph in root.iter("{http://schemas.openxmlformats.org/wordprocessingml/2006/main}p"):
+        paragraphs.append("".join(
+            node.text or "" for node in paragraph.iter("{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t")
+        ))
+    return "\n".join(paragraphs)
+
+
+def _pdf_text(path: str, max_pages: int) -> str:
+    reader = pypdf.PdfReader(path)
+    parts = []
+    for page in reader.pages[:max_pages]:
+        parts.append(page.extract_text() or "")
+        if sum(len(part) for part in parts) > MAX_TEXT_CHARS:
+            break
+    return "\n".join(parts)
+
+
+def tag_skills(text: Optional[str]) -> List[str]:
+    """Нормализованные теги навыков, упомянутых в тексте (в порядке упоминания)."""
+    if not text:
+        return []
+    tags: Dict[str, None] = {}
+    for match in _SKILL_MATCHER.iter_matches(text):
+        tags.setdefault(match.value)
+    return list(tags)
+
+
+def estimate_years(text: Optional[str], today: Optional[date] = None) -> Optional[float]:
+    """
+    Оценка стажа в годах: максимум из явных упоминаний ("опыт 5 лет") и суммы периодов работы
+    ("03.2019 — н.в."), пересекающиеся периоды объединяются. None, если в тексте ничего не найдено.
+    """
+    if not text:
+        return None
+    today = today or date.today()
+
+    explicit = [
+        float(match.group(1).replace(",", "."))
+        for pattern in _EXPLICIT_YEARS
+        for match in pattern.finditer(text)
+    ]
+
+    periods = []
+    for start_month, start_year, end_month, end_year, ongoing in _PERIOD.findall(text):
+        start = int(start_year) + (int(start_month) - 1 if start_month and 1 <= int(start_month) <= 12 else 0) / 12
+        if ongoing:
+            end = today.year + (today.month - 1) / 12
+        else:
+            end = int(end_year) + (int(end_month) - 1 if end_month and 1 <= int(end_month) <= 12 else 11) / 12
+        if start <= end <= today.year + 1:
+            periods.append((start, end))
+
+    total = 0.0
+    current_start = current_end = None
+    for start, end in sorted(periods):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+
+    candidates = [value for value in explicit + [total] if 0 < value <= MAX_YEARS]
+    if not candidates:
+        return None
+    return round(max(candidates) * 2) / 2
+
+
+def warm_up() -> bool:
+    """Пустая задача: запускает процесс пула до первого файла."""
+    return True
+
+
+def analyze_resume_file(path: str, file_name: str = "", max_pages: int = 30) -> Dict[str, Any]:
+    """Точка входа для процесса пула: текст файла -> теги и стаж (результат сериализуется в JSON)."""
+    text = extract_text(path, file_name, max_pages)
+    return {
+        "skills": tag_skills(text),
+        "years": estimate_years(text),
+        "chars": len(text),
+    }
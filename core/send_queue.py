@@ -0,0 +1,363 @@
+# core/send_queue.py
+import asyncio
+import enum
+import itertools
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramRetryAfter,
+    TelegramNetworkError,
+    TelegramServerError,
+    TelegramAPIError,
+)
+from aiogram.methods import TelegramMethod
+
+from core import metrics
+from core.config import settings
+
+
+# Счетчики растут в момент события; глубина очереди — gauge, снимается при сборе метрик (внизу модуля)
+SEND_QUEUE_SENT = metrics.registry.counter(
+    "telegram_send_queue_sent_total", "Messages sent by the queue by lane.", ["lane"])
+SEND_QUEUE_DROPPED = metrics.registry.counter(
+    "telegram_send_queue_dropped_total", "Messages dropped by lane (queue full or retries exhausted).", ["lane"])
+
+
+class Priority(enum.IntEnum):
+    """Полосы очереди: меньшее значение отправляется раньше."""
+    QC = 0          # уведомления в QC-чат
+    CANDIDATE = 1   # сервисные сообщения кандидату (напоминания и т.п.)
+    WELCOME = 2     # приветствия новым участникам канала
+
+
+class TokenBucket:
+    """Классический token bucket: rate токенов в секунду, не больше capacity про запас."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Сколько секунд ждать до появления токена (0 — можно отправлять сейчас)."""
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+    def refund(self):
+        """Возвращает токен, взятый под отправку, которая не состоялась."""
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def is_idle(self) -> bool:
+        now = time.monotonic()
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.paused_until
+
+
+@dataclass(order=True)
+class _SendJob:
+    priority: int
+    seq: int
+    bot: Bot = field(compare=False)
+    method: TelegramMethod = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    max_retries: int = field(default=0, compare=False)
+    guard: Optional[Callable[[], Awaitable[bool]]] = field(default=None, compare=False)
+    attempts: int = field(default=0, compare=False)
+
+
+class TelegramSendQueue:
+    """
+    Очередь исходящих сообщений процесса с учетом лимитов Telegram:
+    глобальный bucket на бота (~30 сообщений/с), bucket на чат (~1 сообщение/с в личный чат,
+    ~20 сообщений/мин в группу), соблюдение retry_after и приоритетные полосы.
+    Лимиты считаются в процессе: если бот отправляет из нескольких процессов, каждому
+    достается своя доля (см. start), а retry_after от Telegram страхует остальное.
+    """
+
+    def __init__(
+        self,
+        global_rate: float,
+        per_chat_rate: float,
+        group_rate: float,
+        max_size: int,
+        workers: int,
+        max_retries: int,
+    ):
+        self.global_rate = self._base_global_rate = global_rate
+        self.per_chat_rate = self._base_per_chat_rate = per_chat_rate
+        self.group_rate = self._base_group_rate = group_rate
+        self.max_size = max_size
+        self.max_retries = max_retries
+        self._workers_count = workers
+
+        self._queue: "asyncio.PriorityQueue[_SendJob]" = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._global_buckets: Dict[int, TokenBucket] = {}
+        self._chat_buckets: Dict[Tuple[int, Any], TokenBucket] = {}
+        self._workers: list[asyncio.Task] = []
+        self._deferred: set[asyncio.TimerHandle] = set()
+        # Заданий в очереди (без отложенных) по полосам
+        self._lane_depth: Dict[str, int] = defaultdict(int)
+
+        # Метрики
+        self.sent: Dict[str, int] = defaultdict(int)
+        self.dropped: Dict[str, int] = defaultdict(int)
+        self.failed: Dict[str, int] = defaultdict(int)
+        self.retried = 0
+        self.rate_limited = 0
+
+    # --- Публичный API ---
+
+    def submit(
+        self,
+        bot: Bot,
+        method: TelegramMethod,
+        priority: Priority = Priority.WELCOME,
+        max_retries: Optional[int] = None,
+        guard: Optional[Callable[[], Awaitable[bool]]] = None,
+    ) -> asyncio.Future:
+        """
+        Ставит вызов метода Telegram в очередь и возвращает future с его результатом.
+        Если очередь переполнена, сообщение отбрасывается (future завершается с QueueFull).
+        max_retries=0 — без повторов (их делает вызывающий, например планировщик задач).
+        guard проверяется непосредственно перед отправкой: False — вызов не выполняется, результат None
+        (для правок, которые могли устареть, пока сообщение ждало в очереди).
+        """
+        future = asyncio.get_running_loop().create_future()
+        if self.depth() >= self.max_size:
+            self.dropped[priority.name] += 1
+            SEND_QUEUE_DROPPED.inc(priority.name)
+            future.set_exception(asyncio.QueueFull(f"Send queue is full ({self.max_size})"))
+            # Ошибка уже посчитана в метриках, не требуем от вызывающего ее забирать
+            future.exception()
+            return future
+
+        retries = self.max_retries if max_retries is None else max_retries
+        self._put(_SendJob(priority, next(self._seq), bot, method, future, retries, guard))
+
+        # Ожидание в очереди и отправка — это время Telegram для хендлера, который ждет результат
+        update = metrics.current_update()
+        if update is not None:
+            submitted = time.perf_counter()
+            future.add_done_callback(
+                lambda _: metrics.record_dependency(metrics.TELEGRAM, time.perf_counter() - submitted, update)
+            )
+        return future
+
+    def depth(self) -> int:
+        return self._queue.qsize() + len(self._deferred)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "depth": self.depth(),
+            "depth_by_lane": {lane: depth for lane, depth in self._lane_depth.items() if depth},
+            "deferred": len(self._deferred),
+            "sent": dict(self.sent),
+            "dropped": dict(self.dropped),
+            "failed": dict(self.failed),
+            "retried": self.retried,
+            "rate_limited": self.rate_limited,
+        }
+
+    async def start(self, processes: int = 1):
+        """
+        Запускает воркеры очереди. processes — сколько процессов одного бота отправляют параллельно
+        (webhook-воркеры, шарды): у каждого своя очередь, поэтому лимиты Telegram делятся между ними поровну.
+        """
+        if processes > 1:
+            self.global_rate = self._base_global_rate / processes
+            self.per_chat_rate = self._base_per_chat_rate / processes
+            self.group_rate = self._base_group_rate / processes
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self._workers_count)]
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """Дожидается отправки уже поставленных сообщений (не дольше drain_timeout) и останавливает воркеры."""
+        deadline = time.monotonic() + drain_timeout
+        while self.depth() and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+        for handle in self._deferred:
+            handle.cancel()
+        self._deferred.clear()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        if self._queue.qsize():
+            logging.warning(f"Send queue stopped with {self._queue.qsize()} unsent messages.")
+
+    # --- Внутреннее ---
+
+    def _global_bucket(self, bot: Bot) -> TokenBucket:
+        bucket = self._global_buckets.get(bot.id)
+        if bucket is None:
+            bucket = self._global_buckets[bot.id] = TokenBucket(self.global_rate, self.global_rate)
+        return bucket
+
+    def _chat_bucket(self, bot: Bot, chat_id: Any) -> TokenBucket:
+        key = (bot.id, chat_id)
+        bucket = self._chat_buckets.get(key)
+        if bucket is None:
+            if len(self._chat_buckets) > 10_000:
+                # Не даем словарю расти бесконечно: удаляем простаивающие чаты
+                for idle_key in [k for k, b in self._chat_buckets.items() if b.is_idle()]:
+                    del self._chat_buckets[idle_key]
+            # У групп и каналов id отрицательные, и лимит у них поминутный
+            rate = self.group_rate if isinstance(chat_id, int) and chat_id < 0 else self.per_chat_rate
+            bucket = self._chat_buckets[key] = TokenBucket(rate, 1)
+        return bucket
+
+    def _put(self, job: _SendJob):
+        self._lane_depth[Priority(job.priority).name] += 1
+        self._queue.put_nowait(job)
+
+    def _defer(self, job: _SendJob, delay: float):
+        """Возвращает задание в очередь через delay секунд, не блокируя воркер."""
+        loop = asyncio.get_running_loop()
+
+        def requeue():
+            self._deferred.discard(handle)
+            self._put(job)
+
+        handle = loop.call_later(delay, requeue)
+        self._deferred.add(handle)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            self._lane_depth[Priority(job.priority).name] -= 1
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                if not job.future.done():
+                    job.future.cancel()
+                raise
+            except Exception as e:
+                logging.error(f"Send queue worker error: {e}")
+                if not job.future.done():
+                    self._fail(job, e)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job: _SendJob):
+        lane = Priority(job.priority).name
+        if job.future.done():  # вызывающий отменил отправку
+            return
+
+        chat_id = getattr(job.method, "chat_id", None)
+        chat_bucket = self._chat_bucket(job.bot, chat_id) if chat_id is not None else None
+
+        # Чат занят — откладываем задание, воркер берет следующее.
+        # Токен чата резервируем сразу, до ожидания глобального bucket,
+        # иначе другой воркер успеет отправить в тот же чат
+        if chat_bucket is not None:
+            chat_delay = chat_bucket.delay()
+            if chat_delay > 0:
+                self._defer(job, chat_delay)
+                return
+            chat_bucket.consume()
+
+        # Guard — до глобального токена: отброшенная правка не тратит лимит бота, а токен чата возвращается
+        if job.guard is not None:
+            allowed = False
+            try:
+                allowed = await job.guard()
+            finally:
+                if not allowed and chat_bucket is not None:
+                    chat_bucket.refund()
+            if not allowed:
+                job.future.set_result(None)
+                return
+
+        global_bucket = self._global_bucket(job.bot)
+        while (global_delay := global_bucket.delay()) > 0:
+            await asyncio.sleep(global_delay)
+        global_bucket.consume()
+
+        try:
+            result = await job.bot(job.method)
+        except TelegramRetryAfter as e:
+            # Flood control: retry_after относится к чату, в который шла отправка, — замораживаем только его,
+            # остальные чаты и полосы продолжают отправку. Бот целиком — лишь для методов без чата
+            self.rate_limited += 1
+            if chat_bucket is not None:
+                chat_bucket.pause(e.retry_after)
+            else:
+                global_bucket.pause(e.retry_after)
+            self._retry_or_fail(job, e, e.retry_after)
+        except (TelegramNetworkError, TelegramServerError) as e:
+            self._retry_or_fail(job, e, min(2 ** job.attempts, 30))
+        except TelegramAPIError as e:
+            # Бот заблокирован, чат не найден и т.п. — повтор не поможет
+            self.failed[lane] += 1
+            logging.error(f"Telegram rejected {type(job.method).__name__} to {chat_id}: {e}")
+            self._fail(job, e)
+        else:
+            self.sent[lane] += 1
+            SEND_QUEUE_SENT.inc(lane)
+            job.future.set_result(result)
+
+    def _retry_or_fail(self, job: _SendJob, error: Exception, delay: float):
+        lane = Priority(job.priority).name
+        job.attempts += 1
+        if job.attempts > job.max_retries:
+            self.dropped[lane] += 1
+            SEND_QUEUE_DROPPED.inc(lane)
+            logging.error(f"Dropping {type(job.method).__name__} after {job.attempts} attempts: {error}")
+            self._fail(job, error)
+            return
+
+        self.retried += 1
+        self._defer(job, delay)
+
+    @staticmethod
+    def _fail(job: _SendJob, error: Exception):
+        job.future.set_exception(error)
+        # Ошибка уже залогирована очередью; отправитель "fire and forget" может ее не забирать
+        job.future.exception()
+
+
+# Единственная очередь на процесс (общая для всех экземпляров Bot в нем)
+send_queue = TelegramSendQueue(
+    global_rate=settings.SEND_QUEUE_GLOBAL_RATE,
+    per_chat_rate=settings.SEND_QUEUE_CHAT_RATE,
+    group_rate=settings.SEND_QUEUE_GROUP_RATE,
+    max_size=settings.SEND_QUEUE_MAX_SIZE,
+    workers=settings.SEND_QUEUE_WORKERS,
+    max_retries=settings.SEND_QUEUE_MAX_RETRIES,
+)
+
+SEND_QUEUE_DEPTH = metrics.registry.gauge("telegram_send_queue_depth", "Queued outgoing messages by lane.", ["lane"])
+
+
+def _collect_send_queue_metrics():
+    snapshot = send_queue.metrics()
+    for lane in Priority:
+        SEND_QUEUE_DEPTH.set(lane.name, value=snapshot["depth_by_lane"].get(lane.name, 0))
+
+
+metrics.registry.add_collector(_collect_send_queue_metrics)
@@ -0,0 +1,170 @@
+# core/sharding.py
+import asyncio
+import logging
+import multiprocessing
+import queue as queue_module
+import secrets
+from typing import Any, Callable, Dict, List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.exceptions import TelegramNetworkError, TelegramServerError
+from aiogram.methods import GetUpdates
+from aiogram.types import Update
+from aiohttp import web
+
+from core.config import settings
+
+# Сигнал воркеру шарда: дообработать очередь и завершиться
+STOP = None
+
+
+def dump_update(update: Update) -> Dict[str, Any]:
+    """
+    Апдейт aiogram обратно в "сырой" вид Telegram: ключи по алиасам ("from", а не "from_user"),
+    иначе update_user_id не находит пользователя и шардирует по update_id.
+    """
+    return update.model_dump(mode="json", by_alias=True, exclude_none=True)
+
+
+def update_user_id(update: Dict[str, Any]) -> Optional[int]:
+    """id пользователя-инициатора из "сырого" апдейта (без разбора в модели aiogram), иначе id чата."""
+    for key, event in update.items():
+        if key == "update_id" or not isinstance(event, dict):
+            continue
+        user = event.get("from") or event.get("user")
+        if user:
+            return user.get("id")
+        chat = event.get("chat")
+        if chat:
+            return chat.get("id")
+    return None
+
+
+class ShardedFrontend:
+    """
+    Фронтенд апдейтов: получает их (long polling или webhook) и раскладывает по N процессам-воркерам
+    по хэшу from_user.id. Все апдейты одного пользователя попадают в один воркер,
+    поэтому шаги FSM выполняются по порядку, а разные пользователи обрабатываются на разных ядрах.
+    """
+
+    def __init__(self, worker: Callable[[int, Any], None], shards: int, queue_size: int = 10000):
+        context = multiprocessing.get_context("spawn")
+        self.shards = shards
+        self.queues = [context.Queue(maxsize=queue_size) for _ in range(shards)]
+        self.processes = [
+            context.Process(target=worker, args=(index, shard_queue), name=f"shard-{index}")
+            for index, shard_queue in enumerate(self.queues)
+        ]
+        self.routed: List[int] = [0] * shards
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+
+    async def stop(self, timeout: float = 15.0):
+        loop = asyncio.get_running_loop()
+        for shard_queue in self.queues:
+            await loop.run_in_executor(None, shard_queue.put, STOP)
+        for process in self.processes:
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                logging.warning(f"{process.name} did not stop in {timeout}s, terminating.")
+                process.terminate()
+
+    def shard_for(self, update: Dict[str, Any]) -> int:
+        user_id = update_user_id(update)
+        return (user_id if user_id is not None else update.get("update_id", 0)) % self.shards
+
+    async def route(self, update: Dict[str, Any]):
+        index = self.shard_for(update)
+        try:
+            self.queues[index].put_nowait(update)
+        except queue_module.Full:
+            # Воркер не успевает — ждем места, не блокируя event loop (обратное давление на источник)
+            await asyncio.get_running_loop().run_in_executor(None, self.queues[index].put, update)
+        self.routed[index] += 1
+
+    async def poll(self, bot: Bot, allowed_updates: List[str], timeout: int = 30):
+        """Long polling в процессе фронтенда."""
+        offset: Optional[int] = None
+        backoff = 1.0
+        while True:
+            try:
+                updates = await bot(
+                    GetUpdates(offset=offset, timeout=timeout, allowed_updates=allowed_updates),
+                    request_timeout=timeout + 10,
+                )
+            except (TelegramNetworkError, TelegramServerError) as e:
+                logging.warning(f"getUpdates failed: {e}, retry in {backoff:.0f}s.")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+                continue
+
+            backoff = 1.0
+            for update in updates:
+                await self.route(dump_update(update))
+                offset = update.update_id + 1
+
+    async def serve_webhook(self, path: str, port: int):
+        """Webhook в процессе фронтенда: проверяет секрет, раскладывает апдейт и сразу отвечает 200."""
+
+        async def handle(request: web.Request) -> web.Response:
+            token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+            if not secrets.compare_digest(token, settings.WEBHOOK_SECRET):
+                return web.Response(status=401)
+            await self.route(await request.json())
+            return web.Response()
+
+        app = web.Application()
+        app.router.add_post(path, handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, settings.WEBHOOK_HOST, port).start()
+        logging.info(f"Sharded webhook frontend on {settings.WEBHOOK_HOST}:{port}{path}, {self.shards} shards")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+
+async def consume_shard(bot: Bot, dp: Dispatcher, shard_queue: Any, concurrency: int) -> int:
+    """
+    Цикл воркера шарда: разные пользователи обрабатываются параллельно (не больше concurrency апдейтов),
+    апдейты одного пользователя — строго по очереди. Возвращает число обработанных апдейтов.
+    """
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+    chains: Dict[Any, asyncio.Task] = {}
+    processed = 0
+
+    async def process(update: Dict[str, Any], previous: Optional[asyncio.Task]):
+        nonlocal processed
+        try:
+            if previous is not None:
+                # Ждем предыдущий апдейт пользователя; его ошибки нас не касаются
+                await asyncio.wait({previous})
+            await dp.feed_raw_update(bot, update)
+        except Exception as e:
+            logging.error(f"Update {update.get('update_id')} failed: {e}")
+        finally:
+            processed += 1
+            slots.release()
+
+    def forget(key: Any, task: asyncio.Task):
+        if chains.get(key) is task:
+            del chains[key]
+
+    while True:
+        await slots.acquire()
+        update = await loop.run_in_executor(None, shard_queue.get)
+        if update is STOP:
+            break
+
+        key = update_user_id(update)
+        task = asyncio.create_task(process(update, chains.get(key)))
+        chains[key] = task
+        task.add_done_callback(lambda t, k=key: forget(k, t))
+
+    if chains:
+        await asyncio.wait(set(chains.values()))
+    return processed
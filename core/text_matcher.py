@@ -0,0 +1,91 @@
+# core/text_matcher.py
+"""
+Поиск множества фраз в тексте за один проход (автомат Ахо — Корасик).
+Строится один раз по словарю фраза -> значение; поиск линеен по длине текста
+и не зависит от числа фраз. Только стандартная библиотека (используется и в процессах разбора резюме).
+"""
+from typing import Dict, Generic, Iterator, List, Mapping, NamedTuple, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class Match(NamedTuple):
+    start: int
+    end: int
+    phrase: str
+    value: object
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class PhraseMatcher(Generic[V]):
+    """
+    Регистронезависимый поиск целых слов и фраз: "java" не находится в "javascript",
+    а "c++" и ".net" находятся (граница проверяется только у букв и цифр на краях фразы).
+    """
+
+    def __init__(self, phrases: Mapping[str, V]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Для каждого состояния: фразы, заканчивающиеся в нем (включая суффиксы по fail-ссылкам)
+        self._out: List[List[Tuple[str, V]]] = [[]]
+        self._phrases = 0
+        for phrase, value in phrases.items():
+            phrase = " ".join(phrase.lower().split())
+            if phrase:
+                self._add(phrase, value)
+        self._build()
+
+    def __len__(self) -> int:
+        return self._phrases
+
+    def _add(self, phrase: str, value: V):
+        state = 0
+        for char in phrase:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        # Повтор фразы заменяет значение
+        if not self._out[state]:
+            self._phrases += 1
+        self._out[state] = [(phrase, value)]
+
+    def _build(self):
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[Match]:
+        """Все вхождения фраз (целыми словами) в порядке окончания."""
+        # Пробельные последовательности схлопываются, как и во фразах словаря
+        text = " ".join(text.lower().split())
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not out[state]:
+                continue
+            end = index + 1
+            for phrase, value in out[state]:
+                start = end - len(phrase)
+                if _is_word_char(phrase[0]) and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if _is_word_char(phrase[-1]) and end < len(text) and _is_word_char(text[end]):
+                    continue
+                yield Match(start, end, phrase, value)
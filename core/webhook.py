@@ -0,0 +1,77 @@
+# core/webhook.py
+import asyncio
+import logging
+import multiprocessing
+from typing import Callable
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from core.config import settings
+
+
+def webhook_url(path: str) -> str:
+    return f"{settings.WEBHOOK_BASE_URL.rstrip('/')}{path}"
+
+
+async def register_webhook(bot: Bot, dp: Dispatcher, path: str):
+    """
+    Регистрирует webhook в Telegram (делает один из воркеров).
+    allowed_updates ограничен типами апдейтов, на которые есть хендлеры в роутерах.
+    """
+    if not settings.WEBHOOK_SECRET:
+        raise RuntimeError("WEBHOOK_SECRET must be set in webhook mode.")
+
+    allowed_updates = dp.resolve_used_update_types()
+    await bot.set_webhook(
+        url=webhook_url(path),
+        secret_token=settings.WEBHOOK_SECRET,
+        allowed_updates=allowed_updates,
+        max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+    )
+    logging.info(f"Webhook set to {webhook_url(path)} for updates: {', '.join(allowed_updates)}")
+
+
+async def serve_webhook(bot: Bot, dp: Dispatcher, path: str, port: int, reuse_port: bool = False):
+    """
+    Принимает апдейты через aiohttp-сервер, пока задачу не отменят.
+    Запросы без правильного X-Telegram-Bot-Api-Secret-Token отклоняются.
+    С reuse_port несколько процессов слушают один порт, ядро распределяет соединения между ними.
+    """
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=settings.WEBHOOK_SECRET).register(app, path=path)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.WEBHOOK_HOST, port, reuse_port=reuse_port)
+    await site.start()
+    logging.info(f"Webhook server listening on {settings.WEBHOOK_HOST}:{port}{path}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def run_webhook_workers(worker: Callable[[int], None], workers: int):
+    """
+    Запускает workers процессов с функцией worker(index) и ждет их завершения.
+    worker должна быть функцией модульного уровня: процессы стартуют через spawn.
+    """
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=worker, args=(index,), name=f"webhook-worker-{index}")
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # SIGINT получает вся группа процессов; даем воркерам штатно завершиться
+        for process in processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
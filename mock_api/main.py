@@ -1,5 +1,5 @@
 # mock_api/main.py
-from fastapi import FastAPI, HTTPException, Body
+from fastapi import FastAPI, HTTPException, Body, Header
 from pydantic import BaseModel, Field
 from typing import Dict, Any, Optional
 import uuid
@@ -14,6 +14,8 @@ app = FastAPI(title="Mock Recruiting API", version="1.0.0")
 # Временное хранилище данных (для простоты мока)
 # {external_id: application_data}
 mock_database: Dict[str, Dict[str, Any]] = {}
+# {Idempotency-Key: external_id} — повтор запроса создания возвращает ту же заявку
+idempotency_keys: Dict[str, str] = {}
 
 
 # --- Pydantic Модели ---
@@ -52,9 +54,16 @@ class StatusUpdate(BaseModel):
 # --- Эндпоинты ---
 
 @app.post("/api/applications", status_code=201)
-async def create_application(app_data: ApplicationCreate):
+async def create_application(app_data: ApplicationCreate, idempotency_key: Optional[str] = Header(default=None)):
     """Эндпоинт для создания новой заявки (отклик кандидата)."""
+    if idempotency_key and idempotency_key in idempotency_keys:
+        external_id = idempotency_keys[idempotency_key]
+        logging.info(f"Mock API: Repeated create for key {idempotency_key}, returning {external_id}")
+        return {"id": external_id, "message": "Application already exists."}
+
     external_id = str(uuid.uuid4())
+    if idempotency_key:
+        idempotency_keys[idempotency_key] = external_id
 
     application_record = {
         "id": external_id,
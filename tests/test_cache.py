@@ -0,0 +1,96 @@
+# tests/test_cache.py
+import asyncio
+
+import pytest
+
+from core.cache import TTLCache
+
+
+def test_ttl_and_lru():
+    cache = TTLCache(ttl=60, max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)  # вытесняет b: к a обращались позже
+    assert cache.get("a") == 1 and cache.get("b") is None and cache.get("c") == 3
+
+    cache.set("short", 1, ttl=-1)
+    assert cache.get("short", "missing") == "missing"
+
+
+def test_concurrent_misses_load_once():
+    cache = TTLCache(ttl=60, max_size=10)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["value"] * 5
+    assert calls == [1]
+    assert cache.get("key") == "value"
+
+
+def test_cancelled_first_caller_does_not_cancel_other_waiters():
+    cache = TTLCache(ttl=60, max_size=10)
+
+    async def scenario():
+        started = asyncio.Event()
+        finish = asyncio.Event()
+
+        async def loader():
+            started.set()
+            await finish.wait()
+            return "value"
+
+        first = asyncio.create_task(cache.get_or_load("key", loader))
+        await started.wait()
+        second = asyncio.create_task(cache.get_or_load("key", loader))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.sleep(0)
+        finish.set()
+
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "value"
+    assert cache.get("key") == "value"
+
+
+def test_loader_error_reaches_all_waiters_and_is_not_cached():
+    cache = TTLCache(ttl=60, max_size=10)
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("db down")
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_load("key", failing) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert calls == [1] and all(isinstance(r, ValueError) for r in results)
+    assert cache.get("key") is None
+
+
+def test_invalidation_during_load_drops_stale_value():
+    cache = TTLCache(ttl=60, max_size=10)
+
+    async def scenario():
+        async def loader():
+            cache.invalidate(("content", "welcome"))
+            return "stale"
+
+        assert await cache.get_or_load(("content", "welcome"), loader) == "stale"
+
+    asyncio.run(scenario())
+    assert cache.get(("content", "welcome")) is None
+    assert cache.generation("content") == 1
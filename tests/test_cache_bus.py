@@ -0,0 +1,49 @@
+# tests/test_cache_bus.py
+import asyncio
+
+from core.cache_bus import InvalidationBus
+
+
+class HalfOpenConnection:
+    """Соединение, которое не получает ответов и не узнает об обрыве (как после обрыва NAT)."""
+
+    def __init__(self):
+        self.queries = 0
+
+    async def fetchval(self, query):
+        self.queries += 1
+        await asyncio.Event().wait()
+
+
+class HealthyConnection:
+    def __init__(self):
+        self.queries = 0
+
+    async def fetchval(self, query):
+        self.queries += 1
+        return 1
+
+
+def test_health_check_detects_half_open_connection():
+    bus = InvalidationBus(health_interval=0.01, health_timeout=0.01)
+    connection = HalfOpenConnection()
+
+    async def scenario():
+        await asyncio.wait_for(bus._watch(connection, asyncio.Event()), timeout=1)
+
+    asyncio.run(scenario())
+    assert connection.queries == 1
+
+
+def test_health_check_keeps_healthy_connection_until_lost():
+    bus = InvalidationBus(health_interval=0.01, health_timeout=0.01)
+    connection = HealthyConnection()
+
+    async def scenario():
+        lost = asyncio.Event()
+        asyncio.get_running_loop().call_later(0.1, lost.set)
+        await asyncio.wait_for(bus._watch(connection, lost), timeout=1)
+
+    asyncio.run(scenario())
+    assert connection.queries >= 3
+
@@ -0,0 +1,94 @@
+# tests/test_db_middleware.py
+import asyncio
+
+import pytest
+
+from bot_welcome.middlewares.db_middleware import DBSessionMiddleware, LazySession
+
+
+class FakeSession:
+    """AsyncSession без БД: записывает, чем закончилась транзакция."""
+
+    def __init__(self, log: list):
+        self.log = log
+        self.new = self.dirty = self.deleted = ()
+        self.active = False
+
+    def in_transaction(self) -> bool:
+        return self.active
+
+    def get_transaction(self):
+        return None
+
+    async def execute(self, statement):
+        self.active = True
+        self.log.append("execute")
+
+    async def commit(self):
+        self.active = False
+        self.log.append("commit")
+
+    async def rollback(self):
+        self.active = False
+        self.log.append("rollback")
+
+    async def close(self):
+        if self.active:
+            self.log.append("rollback")
+        self.active = False
+        self.log.append("close")
+
+
+def run_update(handler) -> list:
+    log = []
+    middleware = DBSessionMiddleware(session_pool=lambda: FakeSession(log))
+    asyncio.run(middleware(handler, object(), {}))
+    return log
+
+
+def test_commits_once_after_handler():
+    async def handler(event, data):
+        await data["session"].execute("UPDATE 1")
+        await data["session"].execute("UPDATE 2")
+
+    assert run_update(handler) == ["execute", "execute", "commit", "close"]
+
+
+def test_rolls_back_when_handler_fails():
+    async def handler(event, data):
+        await data["session"].execute("UPDATE 1")
+        raise RuntimeError("handler failed after replying")
+
+    log = []
+    middleware = DBSessionMiddleware(session_pool=lambda: FakeSession(log))
+    with pytest.raises(RuntimeError):
+        asyncio.run(middleware(handler, object(), {}))
+    # Ответ пользователю внутри хендлера ничего не фиксирует: откатывается вся единица работы
+    assert log == ["execute", "rollback", "close"]
+
+
+def test_no_connection_without_queries():
+    log = []
+    created = []
+    middleware = DBSessionMiddleware(session_pool=lambda: created.append(1) or FakeSession(log))
+
+    async def handler(event, data):
+        return "greeting"
+
+    assert asyncio.run(middleware(handler, object(), {})) == "greeting"
+    assert created == [] and log == []
+
+
+def test_explicit_release_then_reuse():
+    log = []
+    session = LazySession(lambda: FakeSession(log))
+
+    async def scenario():
+        await session.execute("UPDATE")
+        assert await session.release()
+        assert not await session.release()  # фиксировать нечего
+        await session.execute("SELECT")
+        await session.close()
+
+    asyncio.run(scenario())
+    assert log == ["execute", "commit", "execute", "rollback", "close"]
@@ -0,0 +1,129 @@
+# tests/test_fsm_storage.py
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql
+
+from bot_welcome.models.db_models import FSMRecord
+from core.fsm_storage import PostgresStorage
+
+KEY = StorageKey(bot_id=1, chat_id=2, user_id=2)
+
+
+# --- SQL без БД: какие команды уходят на запись ---
+
+class RecordingSession:
+    """Сессия без БД: сохраняет SQL каждой команды и отвечает заданной строкой."""
+
+    def __init__(self, log: list, row):
+        self.log = log
+        self.row = row
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        self.log.append(str(statement.compile(dialect=postgresql.dialect())))
+        return self
+
+    def one(self):
+        return self.row
+
+    async def commit(self):
+        self.log.append("COMMIT")
+
+
+class Row:
+    def __init__(self, state, data):
+        self.state = state
+        self.data = data
+
+
+def record_writes(write, row=Row("Form:name", {"a": 1})) -> list:
+    log = []
+    storage = PostgresStorage(
+        lambda: RecordingSession(log, row), state_ttl=3600, cache_ttl=0, cache_size=10, purge_interval=float("inf")
+    )
+    asyncio.run(write(storage))
+    return log
+
+
+def test_set_state_upserts_only_state_without_read():
+    log = record_writes(lambda storage: storage.set_state(KEY, "Form:name"))
+    assert len(log) == 2 and log[1] == "COMMIT"
+    assert not any(sql.startswith("SELECT") for sql in log)
+    assert "SET state = excluded.state" in log[0]
+    # data из запроса не берется: остается сохраненная (или сбрасывается у просроченной записи)
+    assert "ELSE fsm_storage.data END" in log[0]
+
+
+def test_update_data_merges_in_one_statement():
+    log = record_writes(lambda storage: storage.update_data(KEY, {"b": 2}))
+    assert len(log) == 2
+    assert "CAST(fsm_storage.data AS JSONB) || CAST(excluded.data AS JSONB)" in log[0]
+    assert "RETURNING fsm_storage.state, fsm_storage.data" in log[0]
+
+
+def test_empty_record_is_deleted_in_same_transaction():
+    log = record_writes(lambda storage: storage.set_state(KEY, None), row=Row(None, {}))
+    assert log[1].startswith("DELETE FROM fsm_storage") and log[2] == "COMMIT"
+
+
+# --- Настоящая БД: TEST_DATABASE_URL=postgresql+asyncpg://... ---
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+def test_postgres_storage_round_trip():
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async def scenario():
+        engine = create_async_engine(TEST_DATABASE_URL)
+        async with engine.begin() as connection:
+            await connection.run_sync(FSMRecord.__table__.create, checkfirst=True)
+        session_pool = async_sessionmaker(engine, expire_on_commit=False)
+        storage = PostgresStorage(session_pool, state_ttl=3600, cache_ttl=0, cache_size=10)
+        record_key = storage.key_builder.build(KEY)
+        try:
+            await storage.set_data(KEY, {})
+
+            # Параллельные записи разных столбцов не затирают друг друга
+            await asyncio.gather(storage.set_state(KEY, "Form:name"), storage.set_data(KEY, {"a": 1}))
+            assert await storage.get_state(KEY) == "Form:name"
+            assert await storage.get_data(KEY) == {"a": 1}
+
+            # Слияние как dict.update, int-ключи становятся строками (JSON)
+            assert await storage.update_data(KEY, {"b": {1: "x"}}) == {"a": 1, "b": {"1": "x"}}
+            await asyncio.gather(*(storage.update_data(KEY, {f"k{i}": i}) for i in range(10)))
+            assert len(await storage.get_data(KEY)) == 12
+
+            # Просроченная запись считается пустой и при записи
+            async with session_pool() as session:
+                await session.execute(
+                    update(FSMRecord).where(FSMRecord.key == record_key)
+                    .values(updated_at=datetime.utcnow() - timedelta(hours=2))
+                )
+                await session.commit()
+            assert await storage.update_data(KEY, {"c": 3}) == {"c": 3}
+            assert await storage.get_state(KEY) is None
+
+            # state.clear(): пустая запись удаляется
+            await storage.set_state(KEY, None)
+            await storage.set_data(KEY, {})
+            async with session_pool() as session:
+                assert await session.get(FSMRecord, record_key) is None
+        finally:
+            async with session_pool() as session:
+                await session.execute(FSMRecord.__table__.delete().where(FSMRecord.key == record_key))
+                await session.commit()
+            await engine.dispose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,42 @@
+# tests/test_migrations.py
+import asyncio
+import contextlib
+
+import pytest
+
+from core import migrations
+
+
+class FakeEngine:
+    @contextlib.asynccontextmanager
+    async def connect(self):
+        yield None
+
+
+def check(monkeypatch, applied):
+    async def applied_versions(conn):
+        return sorted(applied)
+
+    monkeypatch.setattr(migrations, "applied_versions", applied_versions)
+    asyncio.run(migrations.check_schema(FakeEngine()))
+
+
+def test_migrations_are_numbered_without_gaps():
+    versions = [m.version for m in migrations.load_migrations()]
+    assert versions == list(range(1, len(versions) + 1))
+
+
+def test_all_applied_passes(monkeypatch):
+    check(monkeypatch, [m.version for m in migrations.load_migrations()])
+
+
+def test_missing_intermediate_version_fails(monkeypatch):
+    versions = [m.version for m in migrations.load_migrations()]
+    with pytest.raises(RuntimeError, match=r"missing migrations: 4 \(scheduled_jobs\)"):
+        check(monkeypatch, [v for v in versions if v != 4])
+
+
+def test_newer_schema_only_warns(monkeypatch, caplog):
+    versions = [m.version for m in migrations.load_migrations()]
+    check(monkeypatch, versions + [versions[-1] + 1])
+    assert "unknown to the code" in caplog.text
@@ -0,0 +1,54 @@
+# tests/test_render.py
+import pytest
+
+from core.render import EMPTY, SPECIAL_CHARS, Markup, Template, escape, link
+
+# Эталон: однопроходное экранирование таблицей
+TRANSLATE_TABLE = str.maketrans({char: "\\" + char for char in SPECIAL_CHARS})
+
+
+@pytest.mark.parametrize("text", [
+    "my_recruiter",
+    "Senior Python-разработчик (FastAPI, asyncio)",
+    "ivan.ivanov+jobs@example.com",
+    "C:\\path\\to [file]",
+    "*bold* _italic_ `code` ~strike~ >quote #tag |pipe| {x}=1!",
+    "\\_",
+    "Иванов Иван Иванович",
+])
+def test_escape_matches_single_pass_translate(text):
+    assert escape(text) == text.translate(TRANSLATE_TABLE)
+
+
+def test_escape_does_not_double_escape_backslash():
+    assert escape("a\\.b") == "a\\\\\\.b"
+
+
+def test_escape_empty_and_non_string_values():
+    assert escape(None) == EMPTY
+    assert escape("") == EMPTY
+    assert escape("", default="—") == "—"
+    assert escape("  text  ") == "text"
+    assert escape(6.5) == "6\\.5"
+
+
+def test_markup_is_not_escaped_again():
+    markup = Markup("*bold*")
+    assert escape(markup) is markup
+    assert link("Вакансия (Python)", "https://example.com/a_(b)") == "[Вакансия \\(Python\\)](https://example.com/a_(b\\))"
+
+
+def test_template_escapes_fields_but_not_literals():
+    template = Template("*Статус:* {status} \\({count}\\)")
+    assert template.render(status="IN_PROGRESS", count=3) == "*Статус:* IN\\_PROGRESS \\(3\\)"
+    assert isinstance(template.render(status="x", count=1), Markup)
+
+
+def test_template_nested_markup():
+    inner = Template("*{name}*").render(name="a_b")
+    assert Template("{card}\n{note}").render(card=inner, note="1.5") == "*a\\_b*\n1\\.5"
+
+
+def test_template_rejects_format_specs():
+    with pytest.raises(ValueError):
+        Template("{years:.1f}")
@@ -0,0 +1,129 @@
+# tests/test_send_queue.py
+import asyncio
+import time
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from core.send_queue import Priority, TelegramSendQueue
+
+
+class FakeBot:
+    """Bot без сети: записывает отправки; для чатов из flooded один раз отвечает 429."""
+
+    def __init__(self, flooded=(), retry_after: int = 30):
+        self.id = 1
+        self.sent = []
+        self.flooded = set(flooded)
+        self.retry_after = retry_after
+
+    async def __call__(self, method):
+        if method.chat_id in self.flooded:
+            self.flooded.discard(method.chat_id)
+            raise TelegramRetryAfter(method, "Flood control exceeded", self.retry_after)
+        self.sent.append((method.chat_id, method.text))
+        return len(self.sent)
+
+
+def make_queue(**overrides) -> TelegramSendQueue:
+    options = dict(global_rate=1000, per_chat_rate=1000, group_rate=1000, max_size=100, workers=1, max_retries=3)
+    options.update(overrides)
+    return TelegramSendQueue(**options)
+
+
+def message(chat_id: int, text: str = "hi") -> SendMessage:
+    return SendMessage(chat_id=chat_id, text=text)
+
+
+def run(scenario):
+    async def wrapper():
+        queue = make_queue()
+        try:
+            return await scenario(queue)
+        finally:
+            await queue.stop(drain_timeout=0)
+
+    return asyncio.run(wrapper())
+
+
+def test_sends_by_priority():
+    bot = FakeBot()
+
+    async def scenario(queue):
+        futures = [
+            queue.submit(bot, message(1, "welcome"), Priority.WELCOME),
+            queue.submit(bot, message(2, "candidate"), Priority.CANDIDATE),
+            queue.submit(bot, message(-3, "qc"), Priority.QC),
+        ]
+        await queue.start()
+        await asyncio.gather(*futures)
+
+    run(scenario)
+    assert [text for _, text in bot.sent] == ["qc", "candidate", "welcome"]
+
+
+def test_retry_after_pauses_only_that_chat():
+    bot = FakeBot(flooded={-100})
+
+    async def scenario(queue):
+        await queue.start()
+        flooded = queue.submit(bot, message(-100, "qc card"), Priority.QC)
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        await asyncio.wait_for(queue.submit(bot, message(42, "welcome"), Priority.WELCOME), timeout=1)
+        assert time.monotonic() - started < 0.5
+        assert not flooded.done()  # ждет retry_after своего чата
+        assert queue.rate_limited == 1
+        assert queue._chat_bucket(bot, -100).delay() > 20
+        assert queue._global_bucket(bot).delay() == 0
+
+    run(scenario)
+    assert bot.sent == [(42, "welcome")]
+
+
+def test_guard_runs_before_taking_tokens():
+    bot = FakeBot()
+
+    async def reject():
+        return False
+
+    async def scenario(queue):
+        await queue.start()
+        result = await queue.submit(bot, message(-100), Priority.QC, guard=reject)
+        return result, queue._global_bucket(bot).tokens, queue._chat_bucket(bot, -100).tokens
+
+    result, global_tokens, chat_tokens = run(scenario)
+    assert result is None and bot.sent == []
+    assert global_tokens == pytest.approx(1000) and chat_tokens == 1
+
+
+def test_group_chats_use_group_rate_split_across_processes():
+    async def scenario():
+        queue = make_queue(global_rate=30, per_chat_rate=1, group_rate=1 / 6)
+        await queue.start(processes=2)
+        try:
+            bot = FakeBot()
+            return (
+                queue.global_rate,
+                queue._chat_bucket(bot, -100).rate,
+                queue._chat_bucket(bot, 100).rate,
+            )
+        finally:
+            await queue.stop(drain_timeout=0)
+
+    assert asyncio.run(scenario()) == (15, pytest.approx(1 / 12), 0.5)
+
+
+def test_full_queue_rejects_without_blocking():
+    bot = FakeBot()
+
+    async def scenario():
+        queue = make_queue(max_size=1)
+        queue.submit(bot, message(1))
+        rejected = queue.submit(bot, message(2))
+        assert isinstance(rejected.exception(), asyncio.QueueFull)
+        assert queue.dropped["WELCOME"] == 1
+        assert queue.metrics()["depth_by_lane"] == {"WELCOME": 1}
+
+    asyncio.run(scenario())
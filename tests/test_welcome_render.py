@@ -0,0 +1,94 @@
+# tests/test_welcome_render.py
+import asyncio
+
+import pytest
+
+from bot_welcome.handlers import user
+from bot_welcome.models.db_models import CachedVacancy, WelcomeContent
+from bot_welcome.services.content_service import VACANCIES_NAMESPACE, ContentService, content_cache
+
+
+class ContentSession:
+    """Сессия без БД: отдает одну запись приветствия и список вакансий, считает запросы."""
+
+    def __init__(self, welcome: WelcomeContent, vacancies: list):
+        self.welcome = welcome
+        self.vacancies = vacancies
+        self.queries = 0
+        self._rows = []
+
+    async def execute(self, statement):
+        self.queries += 1
+        entity = statement.column_descriptions[0]["entity"]
+        self._rows = [self.welcome] if entity is WelcomeContent else list(self.vacancies)
+        return self
+
+    def scalars(self):
+        return self
+
+    def first(self):
+        return self._rows[0] if self._rows else None
+
+    def all(self):
+        return self._rows
+
+    def expunge(self, obj):
+        pass
+
+
+def vacancy(post_id: int, title: str) -> CachedVacancy:
+    return CachedVacancy(
+        vacancy_title=title, telegram_link=f"https://t.me/c/{post_id}", post_id=post_id,
+        direction="dev", is_active=True,
+    )
+
+
+@pytest.fixture(autouse=True)
+def clean_caches():
+    content_cache.clear()
+    user.render_cache.clear()
+    yield
+    content_cache.clear()
+    user.render_cache.clear()
+
+
+def test_welcome_is_rendered_once_per_version():
+    session = ContentSession(WelcomeContent(id=1, welcome_text="Привет!", links_json=[]), [vacancy(1, "Python")])
+    service = ContentService(session)
+
+    text, keyboard = asyncio.run(user.get_rendered_welcome(service))
+    queries = session.queries
+    again_text, again_keyboard = asyncio.run(user.get_rendered_welcome(service))
+
+    assert text.startswith("Привет\\!\n\n")
+    assert "[Python](https://t.me/c/1)" in text
+    assert keyboard.inline_keyboard[0][0].text == "📋 Вакансии (1)"
+    assert again_text is text and again_keyboard is keyboard
+    assert session.queries == queries
+
+
+def test_vacancy_write_changes_version():
+    session = ContentSession(WelcomeContent(id=1, welcome_text="Привет", links_json=[]), [vacancy(1, "Python")])
+    service = ContentService(session)
+    text, _ = asyncio.run(user.get_rendered_welcome(service))
+
+    # Так кэш сбрасывает запись через ContentService (и сообщение от другого процесса)
+    session.vacancies.append(vacancy(2, "Go"))
+    content_cache.invalidate_namespace(VACANCIES_NAMESPACE)
+    new_text, keyboard = asyncio.run(user.get_rendered_welcome(service))
+
+    assert new_text is not text
+    assert "[Go](https://t.me/c/2)" in new_text
+    assert keyboard.inline_keyboard[0][0].text == "📋 Вакансии (2)"
+
+
+def test_new_welcome_content_gets_new_id():
+    session = ContentSession(WelcomeContent(id=1, welcome_text="Старый текст", links_json=[]), [])
+    service = ContentService(session)
+    asyncio.run(user.get_rendered_welcome(service))
+
+    session.welcome = WelcomeContent(id=2, welcome_text="Новый текст", links_json=[])
+    content_cache.invalidate(("welcome",))
+    text, _ = asyncio.run(user.get_rendered_welcome(service))
+
+    assert text.startswith("Новый текст")